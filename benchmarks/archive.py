@@ -0,0 +1,65 @@
+"""
+Compares parallel, type-aware release archiving with the single-threaded
+DEFLATE of every file it replaced.
+
+Usage:
+    python -m benchmarks.archive [<megabytes>]
+"""
+import os
+import sys
+import zipfile
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from cdflow_commands.zip_patch import _make_zipfile
+
+FILE_SIZE = 4 * 1024 * 1024
+
+
+def build_release(release_dir, megabytes):
+    # Roughly what a release holds: provider binaries, which compress
+    # moderately, terraform sources, and already-compressed assets.
+    for index in range(max(1, megabytes * 1024 * 1024 // FILE_SIZE)):
+        kind = ('binary', 'tf', 'gz')[index % 3]
+        filepath = os.path.join(release_dir, kind, f'{index}.{kind}')
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        if kind == 'binary':
+            content = (os.urandom(1024) + bytes(1024)) * (FILE_SIZE // 2048)
+        elif kind == 'tf':
+            content = b'resource "aws_s3_bucket" "b" {}\n' * (FILE_SIZE // 34)
+        else:
+            content = os.urandom(FILE_SIZE)
+        with open(filepath, 'wb') as f:
+            f.write(content)
+
+
+def make_zipfile_sequentially(base_name, base_dir):
+    with zipfile.ZipFile(
+        base_name + '.zip', 'w', compression=zipfile.ZIP_DEFLATED,
+    ) as zf:
+        for dirpath, dirnames, filenames in os.walk(
+            base_dir, followlinks=True,
+        ):
+            for name in sorted(dirnames) + filenames:
+                path = os.path.normpath(os.path.join(dirpath, name))
+                zf.write(path, path)
+    return base_name + '.zip'
+
+
+def main(megabytes=300):
+    with TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        build_release('release', megabytes)
+        for name, make_zipfile in (
+            ('sequential', make_zipfile_sequentially),
+            ('parallel', _make_zipfile),
+        ):
+            start = perf_counter()
+            archive = make_zipfile(os.path.join(temp_dir, name), 'release')
+            duration = perf_counter() - start
+            size = os.path.getsize(archive) // (1024 * 1024)
+            print(f'{name}: {megabytes}MB in {duration:.2f}s ({size}MB)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,59 @@
+"""
+Compares parallel release extraction with the sequential extract-and-chmod
+loop it replaced.
+
+Usage:
+    python -m benchmarks.extract [<files>] [<file_size>]
+"""
+import os
+import sys
+from stat import S_IFREG
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+from cdflow_commands.extract import extract_archive
+
+
+def build_archive(archive_path, files, file_size):
+    with ZipFile(archive_path, 'w', ZIP_DEFLATED) as archive:
+        for index in range(files):
+            zipinfo = ZipInfo(
+                f'.terraform/modules/{index % 50}/{index}.tf'
+            )
+            zipinfo.compress_type = ZIP_DEFLATED
+            zipinfo.external_attr = (S_IFREG | 0o644) << 16
+            archive.writestr(zipinfo, os.urandom(file_size // 2) * 2)
+
+
+def extract_sequentially(release_archive, destination):
+    for zipinfo in release_archive.infolist():
+        extracted_file_path = release_archive.extract(
+            zipinfo.filename, destination,
+        )
+        os.chmod(extracted_file_path, zipinfo.external_attr >> 16)
+
+
+def time_extraction(archive_path, destination, extract):
+    start = perf_counter()
+    with ZipFile(archive_path) as archive:
+        extract(archive, destination)
+    return perf_counter() - start
+
+
+def main(files=5000, file_size=16 * 1024):
+    with TemporaryDirectory() as temp_dir:
+        archive_path = os.path.join(temp_dir, 'release.zip')
+        build_archive(archive_path, files, file_size)
+        for name, extract in (
+            ('sequential', extract_sequentially),
+            ('parallel', extract_archive),
+        ):
+            duration = time_extraction(
+                archive_path, os.path.join(temp_dir, name), extract,
+            )
+            print(f'{name}: {files} files in {duration:.3f}s')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,57 @@
+"""
+Compares the time to import the CLI with the time to import boto3, which the
+CLI used to import (along with everything else) up front, and fails if the
+CLI takes more than <max_ratio> (default 0.5) of boto3's time.
+
+Import times are compared with boto3's rather than a fixed number of seconds
+so that the budget holds on slow or busy machines, and the fastest of
+<attempts> (default 5) imports of each is used.
+
+Usage:
+    python -m benchmarks.import_time [<attempts>] [<max_ratio>]
+"""
+import sys
+from subprocess import PIPE, run
+
+DEFAULT_ATTEMPTS = 5
+DEFAULT_MAX_RATIO = 0.5
+
+
+def import_time(module):
+    process = run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        stdout=PIPE, stderr=PIPE, check=True,
+    )
+    for line in process.stderr.decode('utf-8').splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Modules imported at the top level aren't indented, and their time
+        # includes their parent packages'.
+        if name.rstrip() == f' {module}':
+            return int(cumulative) / 1e6
+
+
+def fastest_import_time(module, attempts):
+    return min(import_time(module) for _ in range(attempts))
+
+
+def main(attempts=DEFAULT_ATTEMPTS, max_ratio=DEFAULT_MAX_RATIO):
+    cli_time = fastest_import_time('cdflow_commands.cli', attempts)
+    boto3_time = fastest_import_time('boto3.session', attempts)
+    ratio = cli_time / boto3_time
+    print(f'cdflow_commands.cli: {cli_time:.3f}s')
+    print(f'boto3.session: {boto3_time:.3f}s')
+    print(f'ratio: {ratio:.2f} (budget {max_ratio:.2f})')
+    if ratio > max_ratio:
+        print('cdflow_commands.cli is over its import time budget')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    sys.exit(main(
+        *[int(value) for value in arguments[:1]],
+        *[float(value) for value in arguments[1:2]],
+    ))
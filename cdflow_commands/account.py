@@ -1,6 +1,9 @@
 from collections import defaultdict
 from dataclasses import dataclass
 
+RELEASE_STORAGE_ARCHIVE = 'archive'
+RELEASE_STORAGE_CONTENT_ADDRESSED = 'content-addressed'
+
 
 @dataclass(frozen=True, order=True)
 class Account:
@@ -24,6 +27,11 @@ def replace_team(scheme, team):
         return scheme
 
 
+def _area(region):
+    # The geographic area of an AWS region, e.g. eu for eu-west-1.
+    return region.split('-')[0]
+
+
 class AccountScheme:
 
     DEFAULT_ENV_KEY = '*'
@@ -31,12 +39,14 @@ class AccountScheme:
     def __init__(
         self, raw_scheme, accounts, release_account, release_bucket,
         lambda_bucket, lambda_buckets, default_region, environment_mapping,
-        classic_metadata_handling, backend_s3_bucket, backend_s3_dynamodb_table
+        classic_metadata_handling, backend_s3_bucket,
+        backend_s3_dynamodb_table, release_buckets=None,
     ):
         self.raw_scheme = raw_scheme
         self.accounts = accounts
         self.release_account = release_account
         self.release_bucket = release_bucket
+        self.release_buckets = release_buckets or {}
         self.lambda_bucket = lambda_bucket
         self.lambda_buckets = lambda_buckets
         self.default_region = default_region
@@ -103,11 +113,61 @@ class AccountScheme:
             scheme.get('classic-metadata-handling', False),
             scheme.get('terraform-backend-s3-bucket', None),
             scheme.get('terraform-backend-s3-dynamodb-table', None),
+            scheme.get('release-buckets', {}),
         )
 
+    @property
+    def release_storage(self):
+        return self.raw_scheme.get('release-storage', RELEASE_STORAGE_ARCHIVE)
+
+    @property
+    def s3_transfer(self):
+        return self.raw_scheme.get('s3-transfer', {})
+
     @property
     def account_ids(self):
         return [account.id for account in self.accounts]
 
+    @property
+    def environments(self):
+        return sorted(
+            environment for environment in self._environment_mapping
+            if environment != self.DEFAULT_ENV_KEY
+        )
+
+    @property
+    def deployable_account_regions(self):
+        """The (account alias, region) pairs an environment can be deployed
+        to, which are the only ones whose platform config is read."""
+        return {
+            (account.alias, account.region)
+            for account in self._environment_mapping.values()
+        }
+
+    @property
+    def release_replica_buckets(self):
+        """The regional release buckets releases are copied to, by region."""
+        return {
+            region: bucket for region, bucket in self.release_buckets.items()
+            if bucket != self.release_bucket
+        }
+
+    def release_bucket_for_region(self, region):
+        """The release bucket closest to region and the region it's in: the
+        one in region, else one on the same continent, else the release
+        bucket in the release account's region."""
+        primary_region = self.release_account.region
+        buckets = {**self.release_replica_buckets}
+        buckets[primary_region] = self.release_bucket
+        if region in buckets:
+            return buckets[region], region
+        nearby = sorted(
+            bucket_region for bucket_region in buckets
+            if _area(bucket_region) == _area(region)
+        )
+        if primary_region in nearby or not nearby:
+            return self.release_bucket, primary_region
+        return buckets[nearby[0]], nearby[0]
+
     def account_for_environment(self, environment):
         return self._environment_mapping[environment]
@@ -0,0 +1,90 @@
+import json
+from hashlib import sha256
+from os import path
+from time import time
+
+from botocore.exceptions import ClientError
+
+from cdflow_commands.cache import cache_directory, file_lock, write_atomic
+from cdflow_commands.logger import logger
+
+CACHE_NAME = 'account-schemes'
+DEFAULT_TTL = 60
+NOT_MODIFIED_CODES = ('304', 'NotModified')
+
+_ttl = DEFAULT_TTL
+
+
+def set_ttl(ttl):
+    global _ttl
+    _ttl = ttl
+
+
+def get_ttl():
+    return _ttl
+
+
+def _not_modified(error):
+    return error.response.get('Error', {}).get('Code') in NOT_MODIFIED_CODES
+
+
+class AccountSchemeCache:
+
+    def __init__(self, directory, ttl=DEFAULT_TTL):
+        self._directory = directory
+        self._ttl = ttl
+
+    @classmethod
+    def create(cls):
+        return cls(cache_directory(CACHE_NAME), get_ttl())
+
+    def _path(self, name, extension):
+        return path.join(self._directory, f'{name}.{extension}')
+
+    def _read(self, name):
+        try:
+            with open(self._path(name, 'json')) as f:
+                cached = json.load(f)
+            return cached if {'etag', 'fetched', 'scheme'} <= cached.keys() \
+                else None
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _write(self, name, etag, scheme):
+        write_atomic(self._path(name, 'json'), json.dumps({
+            'etag': etag,
+            'fetched': time(),
+            'scheme': scheme,
+        }).encode('utf-8'))
+
+    def _get(self, s3_object, cached):
+        if cached is None:
+            return s3_object.get()
+        return s3_object.get(IfNoneMatch=cached['etag'])
+
+    def _revalidate(self, s3_resource, bucket, key, name, cached):
+        s3_object = s3_resource.Object(bucket, key)
+        try:
+            response = self._get(s3_object, cached)
+        except ClientError as e:
+            if cached is None or not _not_modified(e):
+                raise
+            logger.debug(f'Account scheme s3://{bucket}/{key} not modified')
+            self._write(name, cached['etag'], cached['scheme'])
+            return cached['scheme']
+        scheme = json.loads(response['Body'].read())
+        etag = response.get('ETag')
+        if isinstance(etag, str):
+            self._write(name, etag, scheme)
+        return scheme
+
+    def fetch(self, s3_resource, bucket, key):
+        name = sha256(f'{bucket}/{key}'.encode('utf-8')).hexdigest()
+        with file_lock(self._path(name, 'lock')):
+            cached = self._read(name)
+            if cached is not None and time() - cached['fetched'] < self._ttl:
+                logger.debug(
+                    f'Using cached account scheme s3://{bucket}/{key}'
+                )
+                return cached['scheme']
+            return self._revalidate(s3_resource, bucket, key, name, cached)
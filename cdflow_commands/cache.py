@@ -0,0 +1,47 @@
+import fcntl
+import os
+from contextlib import contextmanager
+from os import path
+from tempfile import NamedTemporaryFile
+
+from cdflow_commands.constants import CACHE_BASE_PATH, CACHE_BASE_PATH_ENV_VAR
+
+
+def cache_directory(name):
+    directory = path.join(
+        os.environ.get(CACHE_BASE_PATH_ENV_VAR, CACHE_BASE_PATH), name,
+    )
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return directory
+
+
+@contextmanager
+def file_lock(lock_path, shared=False, blocking=True):
+    # With blocking=False, BlockingIOError is raised if the lock is held.
+    operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    if not blocking:
+        operation |= fcntl.LOCK_NB
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def tree_size(directory):
+    return sum(
+        path.getsize(path.join(dirpath, filename))
+        for dirpath, _, filenames in os.walk(directory)
+        for filename in filenames
+        if not path.islink(path.join(dirpath, filename))
+    )
+
+
+def write_atomic(filepath, data, mode=0o600):
+    with NamedTemporaryFile(
+        dir=path.dirname(filepath), prefix='.tmp-', delete=False,
+    ) as temp_file:
+        temp_file.write(data)
+    os.chmod(temp_file.name, mode)
+    os.replace(temp_file.name, filepath)
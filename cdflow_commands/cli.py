@@ -14,45 +14,47 @@ Options:
     -c <component_name>, --component <component_name>
     -v, --verbose
     -p, --plan-only
+    --no-credential-cache
+    --account-scheme-cache-ttl <seconds>
+    --release-cache-size <megabytes>
+    --terraform-init-cache-size <megabytes>
+    --terraform-plugin-cache-size <megabytes>
+    --max-parallel <n>
+    --compression-level <level>
+    --s3-part-size <megabytes>
+    --s3-max-concurrency <n>
+    --docker-build-cache
 
 """
 import os
 import stat
 import logging
 import sys
-from shutil import rmtree, move, copytree, copy
+from shutil import rmtree, move, copy
 import glob
+from fnmatch import fnmatch
 from subprocess import check_output
 import pty
 import atexit
 from time import time
 from tempfile import TemporaryDirectory
 
-from boto3.session import Session
-
-from cdflow_commands.config import (
-    assume_role, get_component_name, load_manifest, build_account_scheme_s3,
-    build_account_scheme_file
+from cdflow_commands import (
+    clients, credential_cache, link, plugin_cache, release_cache,
+    terraform_cache,
 )
 from cdflow_commands.constants import (
     INFRASTRUCTURE_DEFINITIONS_PATH, ACCOUNT_SCHEME_FILE,
-    RELEASE_METADATA_FILE, PLATFORM_CONFIG_BASE_PATH, CONFIG_BASE_PATH
+    RELEASE_METADATA_FILE, PLATFORM_CONFIG_BASE_PATH, CONFIG_BASE_PATH,
+    TERRAFORM_WORKSPACE_ENV_VAR,
 )
-from cdflow_commands.deploy import Deploy
-from cdflow_commands.destroy import Destroy
 from cdflow_commands.exceptions import UnknownProjectTypeError, UserFacingError
 from cdflow_commands.logger import logger
-from cdflow_commands.plugins.ecs import ReleasePlugin as ECSReleasePlugin
-from cdflow_commands.plugins.aws_lambda import (
-    ReleasePlugin as LambdaReleasePlugin
-)
-from cdflow_commands.release import (
-    Release, fetch_release, find_latest_release_version,
-)
-from cdflow_commands.secrets import get_secrets
-from cdflow_commands.state import terraform_state, migrate_state
 from docopt import docopt
 
+# boto3, credstash and the command implementations are slow to import, so
+# they are imported by the commands that use them rather than here.
+
 
 def run(argv):
     try:
@@ -65,6 +67,11 @@ def run(argv):
             rmtree('.terraform/')
         except OSError:
             logger.debug('No path .terraform/ to remove')
+        plugin_cache.deactivate()
+        clients.log_stats()
+
+
+DEFAULT_MAX_PARALLEL = 4
 
 
 class NoopReleasePlugin:
@@ -105,8 +112,48 @@ def get_command_function(args):
 
 def _run(argv):
     args = docopt(__doc__, argv=argv)
+    _run_command(args)
+
+
+def configure_caches(args):
+    from cdflow_commands import account_scheme_cache
+    credential_cache.set_enabled(not args['--no-credential-cache'])
+    account_scheme_cache.set_ttl(int_option(
+        args, '--account-scheme-cache-ttl', account_scheme_cache.DEFAULT_TTL,
+    ))
+    release_cache.set_max_size_mb(int_option(
+        args, '--release-cache-size', release_cache.DEFAULT_MAX_SIZE_MB,
+    ))
+    terraform_cache.set_max_size_mb(int_option(
+        args, '--terraform-init-cache-size',
+        terraform_cache.DEFAULT_MAX_SIZE_MB,
+    ))
+    plugin_cache.set_max_size_mb(int_option(
+        args, '--terraform-plugin-cache-size',
+        plugin_cache.DEFAULT_MAX_SIZE_MB,
+    ))
+    plugin_cache.activate()
+
+
+def configure_transfers(args, manifest, account_scheme):
+    from cdflow_commands import transfer
+    transfer.configure(account_scheme.s3_transfer, manifest.s3_transfer, {
+        transfer.PART_SIZE_MB: int_option(args, '--s3-part-size', None),
+        transfer.MAX_CONCURRENCY: int_option(
+            args, '--s3-max-concurrency', None,
+        ),
+    })
+
+
+def _run_command(args):
+    from boto3.session import Session
+    from cdflow_commands.config import (
+        assume_role, build_account_scheme_s3, get_component_name,
+        load_manifest,
+    )
 
     conditionally_set_debug(args['--verbose'])
+    configure_caches(args)
 
     manifest = load_manifest()
     root_session = Session()
@@ -115,7 +162,7 @@ def _run(argv):
     component = get_component_name(args['--component'])
 
     account_scheme, old_scheme = build_account_scheme_s3(
-        root_session.resource('s3'), manifest.account_scheme_url,
+        clients.resource(root_session, 's3'), manifest.account_scheme_url,
         team, component,
     )
 
@@ -123,9 +170,12 @@ def _run(argv):
         account_scheme, old_scheme, args,
     )
 
+    configure_transfers(args, manifest, account_scheme)
+
     root_session = Session(region_name=account_scheme.default_region)
 
     if old_scheme:
+        from cdflow_commands.state import migrate_state
         logger.debug(
             f'Migrating state from {old_scheme.release_account.alias} '
             f'to {account_scheme.release_account.alias}'
@@ -159,6 +209,10 @@ def _run(argv):
 
 
 def run_release(_, release_account_session, account_scheme, manifest, args):
+    from cdflow_commands import zip_patch
+    from cdflow_commands.config import get_component_name
+    from cdflow_commands.release import Release
+    zip_patch.set_compression_level(compression_level(args))
     commit = check_output(
         ['git', 'rev-parse', 'HEAD']
     ).decode('utf-8').strip()
@@ -176,9 +230,14 @@ def run_release(_, release_account_session, account_scheme, manifest, args):
     )
 
     if manifest.type == 'docker':
-        plugin = ECSReleasePlugin(release, account_scheme)
+        from cdflow_commands.plugins.ecs import ReleasePlugin
+        plugin = ReleasePlugin(
+            release, account_scheme,
+            build_cache=args['--docker-build-cache'],
+        )
     elif manifest.type == 'lambda':
-        plugin = LambdaReleasePlugin(release, account_scheme)
+        from cdflow_commands.plugins.aws_lambda import ReleasePlugin
+        plugin = ReleasePlugin(release, account_scheme)
     elif manifest.type == 'infrastructure':
         plugin = NoopReleasePlugin()
     else:
@@ -192,6 +251,10 @@ def run_release(_, release_account_session, account_scheme, manifest, args):
 def run_shell(
     root_session, release_account_session, account_scheme, manifest, args
 ):
+    from cdflow_commands.config import get_component_name
+    from cdflow_commands.deploy import Deploy
+    from cdflow_commands.release import fetch_release
+    from cdflow_commands.state import terraform_state
     environment = args['<environment>']
     component_name = get_component_name(args['--component'])
     version = args['<version>']
@@ -231,6 +294,8 @@ def run_shell(
             with fetch_release(
                 release_account_session, account_scheme, manifest.team,
                 component_name, version,
+                release_region([environment], account_scheme),
+                editable=True,
             ) as path_to_release:
                 logger.debug('Unpacked release: {}'.format(path_to_release))
                 path_to_release = os.path.join(
@@ -265,6 +330,7 @@ def run_shell(
             manifest.tfstate_filename, account_scheme, manifest.team,
         )
         state.init(True if not version else False)
+        select_workspace(state)
 
         deploy = Deploy(
             environment,
@@ -309,7 +375,20 @@ def move_path_to_working_dir(working_directory, path_to_move):
 
 
 def copy_path_to_working_dir(working_directory, path_to_copy):
-    copytree(path_to_copy, working_directory)
+    # Files may be edited from the shell, so they're cloned where the
+    # filesystem supports it but never hardlinked to the originals.
+    linker = link.TreeLinker(methods=link.CLONE_METHODS)
+    linker.link_tree(path_to_copy, working_directory, follow_symlinks=True)
+    logger.debug(
+        f'Staged {path_to_copy}, cloning {linker.bytes_linked} bytes and '
+        f'copying {linker.bytes_copied} bytes'
+    )
+
+
+def select_workspace(state):
+    # So that terraform commands run in the shell use the state's workspace.
+    if state.workspace is not None:
+        os.environ[TERRAFORM_WORKSPACE_ENV_VAR] = state.workspace
 
 
 def write_plan_helper_script(plan_args):
@@ -350,6 +429,10 @@ export PS1="terraform # "
 def run_non_release_command(
     root_session, release_account_session, account_scheme, manifest, args
 ):
+    from cdflow_commands.config import get_component_name
+    from cdflow_commands.release import (
+        fetch_release, find_latest_release_version,
+    )
     assert args['deploy'] or args['destroy']
 
     component_name = get_component_name(args['--component'])
@@ -364,7 +447,9 @@ def run_non_release_command(
 
     with fetch_release(
         release_account_session, account_scheme, manifest.team, component_name,
-        version,
+        version, release_region(
+            command_environments(args, account_scheme), account_scheme,
+        ),
     ) as path_to_release:
         logger.debug('Unpacked release: {}'.format(path_to_release))
         path_to_release = os.path.join(
@@ -379,21 +464,116 @@ def run_non_release_command(
 def assume_infrastructure_account_role(
     account_scheme, environment, root_session
 ):
+    from cdflow_commands.config import assume_role
     account = account_scheme.account_for_environment(environment)
     logger.debug(f'Assuming role {account.role} in {account.id}')
 
     return assume_role(root_session, account)
 
 
+def command_environments(args, account_scheme):
+    if args['deploy']:
+        return resolve_environments(args['<environment>'], account_scheme)
+    return [args['<environment>']]
+
+
+def release_region(environments, account_scheme):
+    """The region to fetch a release for environments close to, when they're
+    all in one."""
+    regions = {
+        account_scheme.account_for_environment(environment).region
+        for environment in environments
+    }
+    if len(regions) == 1:
+        return regions.pop()
+    return None
+
+
+def resolve_environments(environments_arg, account_scheme):
+    environments = []
+    for pattern in environments_arg.split(','):
+        for environment in _expand_environment_pattern(
+            pattern, account_scheme
+        ):
+            if environment not in environments:
+                environments.append(environment)
+    return environments
+
+
+def _expand_environment_pattern(pattern, account_scheme):
+    if not any(character in pattern for character in '*?['):
+        return [pattern]
+    matches = [
+        environment for environment in account_scheme.environments
+        if fnmatch(environment, pattern)
+    ]
+    if not matches:
+        raise UserFacingError(f'No environments match {pattern}')
+    return matches
+
+
 def run_non_release_command_on_release(
     args, path_to_release, manifest, component_name, root_session,
     release_account_session
 ):
+    from cdflow_commands.config import build_account_scheme_file
     account_scheme = build_account_scheme_file(os.path.join(
         path_to_release, ACCOUNT_SCHEME_FILE
     ), manifest.team)
-    environment = args['<environment>']
 
+    environments = command_environments(args, account_scheme)
+
+    if len(environments) > 1:
+        run_parallel_deploy(
+            args, path_to_release, account_scheme, manifest,
+            component_name, root_session, release_account_session,
+            environments,
+        )
+    else:
+        run_non_release_command_for_environment(
+            args, path_to_release, account_scheme, manifest,
+            component_name, root_session, release_account_session,
+            environments[0],
+        )
+
+
+def run_parallel_deploy(
+    args, path_to_release, account_scheme, manifest, component_name,
+    root_session, release_account_session, environments,
+):
+    from cdflow_commands.parallel import run_in_parallel
+
+    def deploy_to(environment):
+        def task():
+            working_copy = f'{path_to_release}-{environment}'
+            logger.debug(f'Linking release to {working_copy}')
+            link.TreeLinker(must_copy=release_cache.must_copy).link_tree(
+                path_to_release, working_copy,
+            )
+            run_non_release_command_for_environment(
+                args, working_copy, account_scheme, manifest,
+                component_name, root_session, release_account_session,
+                environment,
+            )
+        return task
+
+    max_workers = int_option(args, '--max-parallel', DEFAULT_MAX_PARALLEL)
+    logger.info(
+        f'Deploying to {", ".join(environments)} '
+        f'with up to {max_workers} in parallel'
+    )
+    failed = run_in_parallel(
+        [(env, deploy_to(env)) for env in environments],
+        max_workers,
+    )
+    if failed:
+        raise UserFacingError(f'Deploy failed for {", ".join(failed)}')
+
+
+def run_non_release_command_for_environment(
+    args, path_to_release, account_scheme, manifest, component_name,
+    root_session, release_account_session, environment,
+):
     infrastructure_account_session = assume_infrastructure_account_role(
         account_scheme, environment, root_session
     )
@@ -420,6 +600,9 @@ def run_deploy(
     path_to_release, account_scheme, metadata_account_session,
     infrastructure_account_session, manifest, args, environment, component_name
 ):
+    from cdflow_commands.deploy import Deploy
+    from cdflow_commands.secrets import get_secrets
+    from cdflow_commands.state import terraform_state
     state = terraform_state(
         path_to_release, INFRASTRUCTURE_DEFINITIONS_PATH,
         metadata_account_session, environment, component_name,
@@ -436,7 +619,8 @@ def run_deploy(
 
     deploy = Deploy(
         environment, path_to_release, secrets,
-        account_scheme, infrastructure_account_session
+        account_scheme, infrastructure_account_session,
+        workspace=state.workspace,
     )
     deploy.run(args['--plan-only'])
 
@@ -445,6 +629,9 @@ def run_destroy(
     path_to_release, account_scheme, metadata_account_session,
     infrastructure_account_session, manifest, args, environment, component_name
 ):
+    from cdflow_commands.destroy import Destroy
+    from cdflow_commands.secrets import get_secrets
+    from cdflow_commands.state import terraform_state
     state = terraform_state(
         path_to_release, INFRASTRUCTURE_DEFINITIONS_PATH,
         metadata_account_session, environment, component_name,
@@ -461,7 +648,8 @@ def run_destroy(
 
     destroy = Destroy(
         environment, path_to_release, secrets,
-        account_scheme, infrastructure_account_session
+        account_scheme, infrastructure_account_session,
+        workspace=state.workspace,
     )
 
     logger.info(
@@ -471,6 +659,27 @@ def run_destroy(
     destroy.run(args['--plan-only'])
 
 
+def int_option(args, option, default):
+    if args[option] is None:
+        return default
+    try:
+        return int(args[option])
+    except ValueError:
+        raise UserFacingError(f'{option} must be a number: {args[option]}')
+
+
+def compression_level(args):
+    from cdflow_commands import zip_patch
+    level = int_option(
+        args, '--compression-level', zip_patch.DEFAULT_COMPRESSION_LEVEL,
+    )
+    if not 0 <= level <= 9:
+        raise UserFacingError(
+            f'--compression-level must be between 0 and 9: {level}'
+        )
+    return level
+
+
 def conditionally_set_debug(verbose):
     if verbose:
         logger.setLevel(logging.DEBUG)
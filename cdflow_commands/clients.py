@@ -0,0 +1,71 @@
+import os
+from collections import namedtuple
+from threading import RLock, get_ident
+from time import perf_counter
+from weakref import WeakKeyDictionary
+
+from cdflow_commands.logger import logger
+
+PoolStats = namedtuple('PoolStats', ['built', 'seconds'])
+
+_lock = RLock()
+_pool = WeakKeyDictionary()
+_built = 0
+_seconds = 0.0
+
+
+def _build(session, key, factory, service_name, region_name):
+    global _built, _seconds
+    with _lock:
+        session_pool = _pool.setdefault(session, {})
+        if key not in session_pool:
+            start = perf_counter()
+            if region_name is None:
+                session_pool[key] = factory(service_name)
+            else:
+                session_pool[key] = factory(
+                    service_name, region_name=region_name,
+                )
+            _built += 1
+            _seconds += perf_counter() - start
+        return session_pool[key]
+
+
+def client(session, service_name, region_name=None):
+    # boto3 clients are thread safe, so one per service and region is shared
+    # across the whole process.
+    return _build(
+        session, ('client', service_name, region_name),
+        session.client, service_name, region_name,
+    )
+
+
+def resource(session, service_name, region_name=None):
+    # boto3 resources are not thread safe, so each thread gets its own.
+    return _build(
+        session, ('resource', service_name, region_name, get_ident()),
+        session.resource, service_name, region_name,
+    )
+
+
+def _reset_after_fork():
+    # Clients hold open connections, which must not be shared with a forked
+    # child process.
+    global _lock
+    _lock = RLock()
+    _pool.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def stats():
+    with _lock:
+        return PoolStats(_built, _seconds)
+
+
+def log_stats():
+    pool_stats = stats()
+    logger.debug(
+        f'Built {pool_stats.built} AWS clients in {pool_stats.seconds:.2f}s'
+    )
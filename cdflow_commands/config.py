@@ -6,6 +6,9 @@ from subprocess import CalledProcessError, check_output
 import yaml
 from boto3.session import Session
 
+from cdflow_commands import (
+    account_scheme_cache, clients, credential_cache,
+)
 from cdflow_commands.account import AccountScheme
 from cdflow_commands.exceptions import (
     UserFacingError, UserFacingFixedMessageError
@@ -38,6 +41,7 @@ Manifest = namedtuple('Manifest', [
         'type',
         'tfstate_filename',
         'multi_region',
+        's3_transfer',
     ]
 )
 
@@ -51,16 +55,32 @@ def load_manifest():
             manifest_data['type'],
             manifest_data.get('tfstate-filename', 'terraform.tfstate'),
             manifest_data.get('multi-region', False),
+            manifest_data.get('s3-transfer', {}),
         )
 
 
 def assume_role(root_session, account):
-    sts = root_session.client('sts')
+    role_arn = f'arn:aws:iam::{account.id}:role/{account.role}'
+    if credential_cache.is_enabled():
+        credentials = credential_cache.CredentialCache.create().get_or_assume(
+            root_session, role_arn,
+            lambda: _assume_role_credentials(root_session, role_arn),
+        )
+    else:
+        credentials = _assume_role_credentials(root_session, role_arn)
+    return Session(
+        credentials['AccessKeyId'],
+        credentials['SecretAccessKey'],
+        credentials['SessionToken'],
+        account.region,
+    )
+
+
+def _assume_role_credentials(root_session, role_arn):
+    sts = clients.client(root_session, 'sts')
     session_name = get_role_session_name(sts)
     logger.debug(
-        "Assuming role arn:aws:iam::{}:role/{} with session {}".format(
-            account.id, account.role, session_name
-        )
+        "Assuming role {} with session {}".format(role_arn, session_name)
     )
     session_duration = get_session_duration(sts)
     logger.debug(
@@ -68,16 +88,11 @@ def assume_role(root_session, account):
     )
 
     response = sts.assume_role(
-        RoleArn=f'arn:aws:iam::{account.id}:role/{account.role}',
+        RoleArn=role_arn,
         RoleSessionName=session_name,
         DurationSeconds=session_duration,
     )
-    return Session(
-        response['Credentials']['AccessKeyId'],
-        response['Credentials']['SecretAccessKey'],
-        response['Credentials']['SessionToken'],
-        account.region,
-    )
+    return response['Credentials']
 
 
 def env_with_aws_credetials(env, boto_session):
@@ -139,9 +154,9 @@ def parse_s3_url(s3_url):
 
 
 def fetch_account_scheme(s3_resource, bucket, key):
-    s3_object = s3_resource.Object(bucket, key)
-    f = s3_object.get()['Body']
-    return json.loads(f.read())
+    return account_scheme_cache.AccountSchemeCache.create().fetch(
+        s3_resource, bucket, key,
+    )
 
 
 def build_account_scheme_s3(s3_resource, s3_url, team, component_name):
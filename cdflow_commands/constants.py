@@ -7,6 +7,8 @@ GLOBAL_CONFIG_FILE = path.join(CONFIG_BASE_PATH, 'common.json')
 PLATFORM_CONFIG_BASE_PATH = 'platform-config'
 
 TERRAFORM_BINARY = 'terraform'
+# Selects the workspace for terraform commands without `workspace select`.
+TERRAFORM_WORKSPACE_ENV_VAR = 'TF_WORKSPACE'
 INFRASTRUCTURE_DEFINITIONS_PATH = 'infra'
 
 CDFLOW_BASE_PATH = '/cdflow'
@@ -18,3 +20,6 @@ ACCOUNT_SCHEME_FILE = 'account-scheme.json'
 TERRAFORM_PLAN_EXIT_CODE_SUCCESS_NO_CHANGES = 0
 TERRAFORM_PLAN_EXIT_CODE_ERROR = 1
 TERRAFORM_PLAN_EXIT_CODE_SUCCESS_CHANGES_PRESENT = 2
+
+CACHE_BASE_PATH_ENV_VAR = 'CDFLOW_CACHE_DIR'
+CACHE_BASE_PATH = path.join(path.expanduser('~'), '.cache', 'cdflow')
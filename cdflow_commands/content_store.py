@@ -0,0 +1,271 @@
+import gzip
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from os import path
+from shutil import copyfile, copyfileobj
+from stat import S_IMODE
+from tempfile import NamedTemporaryFile
+
+from cdflow_commands.exceptions import CDFlowError
+from cdflow_commands.logger import logger
+from cdflow_commands.transfer import (
+    TransferLog, max_concurrency, transfer_config,
+)
+from cdflow_commands.zip_patch import STORED_EXTENSIONS, _archive_paths
+
+MANIFEST_FORMAT = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+# Blobs may be gzipped; this is recorded in object metadata rather than as
+# Content-Encoding, which HTTP clients may decode transparently.
+ENCODING_METADATA_KEY = 'cdflow-encoding'
+
+
+class InvalidManifestError(CDFlowError):
+    pass
+
+
+def _hash_file(filepath):
+    digest = sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _manifest_entry(root, filepath):
+    entry = {
+        'path': path.relpath(filepath, root),
+        'mode': S_IMODE(os.stat(filepath).st_mode),
+    }
+    if not path.isdir(filepath):
+        entry['sha256'] = _hash_file(filepath)
+        entry['size'] = path.getsize(filepath)
+    return entry
+
+
+def build_manifest(root, base_dir_name, metadata):
+    """Describe the tree at root/base_dir_name with the same members as its
+    release archive, and map the hash of each file to a path it's at."""
+    entries = [
+        _manifest_entry(root, filepath)
+        for filepath in _archive_paths(path.join(root, base_dir_name))
+    ]
+    blobs = {
+        entry['sha256']: path.join(root, entry['path'])
+        for entry in entries if 'sha256' in entry
+    }
+    return {
+        'format': MANIFEST_FORMAT,
+        'metadata': metadata,
+        'entries': entries,
+    }, blobs
+
+
+def _stored_blobs(s3_client, bucket, blob_prefix):
+    paginator = s3_client.get_paginator('list_objects_v2')
+    return {
+        item['Key'][len(blob_prefix):]
+        for page in paginator.paginate(Bucket=bucket, Prefix=blob_prefix)
+        for item in page.get('Contents', [])
+    }
+
+
+def _gzip(filepath, compressed, compression_level):
+    # mtime and filename are left out of the header so that the same file
+    # always compresses to the same blob.
+    with open(filepath, 'rb') as f, gzip.GzipFile(
+        filename='', mode='wb', compresslevel=compression_level,
+        fileobj=compressed, mtime=0,
+    ) as gzipped:
+        copyfileobj(f, gzipped, HASH_CHUNK_SIZE)
+    compressed.flush()
+    return compressed.tell()
+
+
+def _put_blob(s3_client, bucket, key, filepath, encoding):
+    s3_client.upload_file(
+        filepath, bucket, key,
+        ExtraArgs={'Metadata': {ENCODING_METADATA_KEY: encoding}},
+        Config=transfer_config(),
+    )
+
+
+def _upload_blob(s3_client, bucket, key, filepath, compression_level, log):
+    size = path.getsize(filepath)
+    if path.splitext(filepath)[1].lower() not in STORED_EXTENSIONS:
+        with NamedTemporaryFile(suffix='.gz') as compressed:
+            compressed_size = _gzip(filepath, compressed, compression_level)
+            if compressed_size < size:
+                _put_blob(s3_client, bucket, key, compressed.name, 'gzip')
+                log(compressed_size)
+                return
+    _put_blob(s3_client, bucket, key, filepath, 'identity')
+    log(size)
+
+
+def upload_tree(
+    s3_client, bucket, blob_prefix, manifest_key, manifest, blobs,
+    compression_level,
+):
+    """Upload the blobs that aren't stored yet, then the manifest."""
+    stored = _stored_blobs(s3_client, bucket, blob_prefix)
+    new_blobs = sorted(set(blobs) - stored)
+    with TransferLog(f'Uploaded {len(new_blobs)} new blobs') as log, \
+            ThreadPoolExecutor(max_workers=max_concurrency()) as executor:
+        for _ in executor.map(
+            lambda digest: _upload_blob(
+                s3_client, bucket, f'{blob_prefix}{digest}', blobs[digest],
+                compression_level, log,
+            ),
+            new_blobs,
+        ):
+            pass
+    logger.debug(f'{len(blobs) - len(new_blobs)} blobs already stored')
+    s3_client.put_object(
+        Bucket=bucket, Key=manifest_key,
+        Body=json.dumps(manifest).encode('utf-8'),
+        ContentType='application/json',
+    )
+
+
+def copy_tree(
+    source_bucket, s3_client, bucket, blob_prefix, manifest_key, manifest,
+):
+    """Copy the blobs of a manifest that bucket doesn't have yet from
+    source_bucket, then the manifest, server-side."""
+    digests = {entry['sha256'] for entry in manifest['entries']
+               if 'sha256' in entry}
+    new_blobs = sorted(digests - _stored_blobs(s3_client, bucket, blob_prefix))
+
+    def copy(key):
+        s3_client.copy_object(
+            CopySource={'Bucket': source_bucket, 'Key': key},
+            Bucket=bucket, Key=key,
+        )
+
+    with ThreadPoolExecutor(max_workers=max_concurrency()) as executor:
+        for _ in executor.map(
+            copy, [f'{blob_prefix}{digest}' for digest in new_blobs],
+        ):
+            pass
+    logger.debug(f'Copied {len(new_blobs)} new blobs to {bucket}')
+    copy(manifest_key)
+
+
+def _target_path(destination, relative_path):
+    target = path.normpath(path.join(destination, relative_path))
+    if path.isabs(relative_path) or \
+            not target.startswith(path.join(destination, '')):
+        raise InvalidManifestError(
+            f'Invalid path in manifest: {relative_path}'
+        )
+    return target
+
+
+class _BlobWriter:
+    """Decompresses and hashes a blob as it is downloaded into a file.
+
+    It can't seek, so the transfer manager writes the parts to it in order.
+    """
+
+    def __init__(self, f, gzipped):
+        self._file = f
+        self._decompressor = (
+            zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+        )
+        self._digest = sha256()
+
+    def _append(self, data):
+        self._digest.update(data)
+        self._file.write(data)
+
+    def write(self, data):
+        if self._decompressor is not None:
+            data = self._decompressor.decompress(data)
+        self._append(data)
+
+    def finish(self):
+        """Write what's left of the blob and return its hash."""
+        if self._decompressor is not None:
+            self._append(self._decompressor.flush())
+        return self._digest.hexdigest()
+
+
+def _download_blob(s3_client, bucket, key, digest, target):
+    head = s3_client.head_object(Bucket=bucket, Key=key)
+    with open(target, 'wb') as f:
+        blob = _BlobWriter(
+            f, head['Metadata'].get(ENCODING_METADATA_KEY) == 'gzip',
+        )
+        s3_client.download_fileobj(
+            bucket, key, blob, Config=transfer_config(),
+        )
+        if blob.finish() != digest:
+            raise InvalidManifestError(f'{key} does not match its hash')
+    return head['ContentLength']
+
+
+def _write_files(s3_client, bucket, blob_prefix, digest, targets, log):
+    log(_download_blob(
+        s3_client, bucket, f'{blob_prefix}{digest}', digest, targets[0],
+    ))
+    for target in targets[1:]:
+        copyfile(targets[0], target)
+
+
+def _files_by_blob(entries, destination):
+    files = {}
+    for entry in entries:
+        if 'sha256' in entry:
+            files.setdefault(entry['sha256'], []).append(
+                _target_path(destination, entry['path']),
+            )
+    return files
+
+
+def _create_directories(entries, destination):
+    for entry in entries:
+        target = _target_path(destination, entry['path'])
+        os.makedirs(
+            target if 'sha256' not in entry else path.dirname(target),
+            exist_ok=True,
+        )
+
+
+def _restore_modes(entries, destination):
+    # Directories last and deepest first, so that a read-only directory
+    # doesn't stop the modes of its contents being restored.
+    files = [entry for entry in entries if 'sha256' in entry]
+    directories = sorted(
+        (entry for entry in entries if 'sha256' not in entry),
+        key=lambda entry: entry['path'], reverse=True,
+    )
+    for entry in files + directories:
+        os.chmod(_target_path(destination, entry['path']), entry['mode'])
+
+
+def download_tree(s3_client, bucket, blob_prefix, manifest_key, destination):
+    """Rebuild the tree described by a manifest, downloading each distinct
+    blob once and in parallel."""
+    manifest = json.loads(
+        s3_client.get_object(Bucket=bucket, Key=manifest_key)['Body'].read()
+    )
+    if manifest.get('format') != MANIFEST_FORMAT:
+        raise InvalidManifestError(
+            f'Unsupported manifest format in {manifest_key}'
+        )
+    entries = manifest['entries']
+    _create_directories(entries, destination)
+    with TransferLog(f'Downloaded blobs for {manifest_key}') as log, \
+            ThreadPoolExecutor(max_workers=max_concurrency()) as executor:
+        for _ in executor.map(
+            lambda item: _write_files(
+                s3_client, bucket, blob_prefix, item[0], item[1], log,
+            ),
+            _files_by_blob(entries, destination).items(),
+        ):
+            pass
+    _restore_modes(entries, destination)
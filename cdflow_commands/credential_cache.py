@@ -0,0 +1,91 @@
+import json
+from datetime import datetime, timedelta, timezone
+from hashlib import sha256
+from os import path
+
+from cdflow_commands.cache import cache_directory, file_lock, write_atomic
+from cdflow_commands.logger import logger
+
+CACHE_NAME = 'credentials'
+EXPIRY_MARGIN = timedelta(minutes=30)
+
+_enabled = True
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def _utc(expiration):
+    if expiration.tzinfo is None:
+        return expiration.replace(tzinfo=timezone.utc)
+    return expiration
+
+
+class CredentialCache:
+
+    def __init__(self, directory, expiry_margin=EXPIRY_MARGIN):
+        self._directory = directory
+        self._expiry_margin = expiry_margin
+
+    @classmethod
+    def create(cls):
+        return cls(cache_directory(CACHE_NAME))
+
+    def _key(self, root_session, role_arn):
+        credentials = root_session.get_credentials()
+        if credentials is None:
+            return None
+        return sha256(
+            f'{credentials.access_key}\n{role_arn}'.encode('utf-8')
+        ).hexdigest()
+
+    def _is_fresh(self, expiration):
+        return (
+            _utc(expiration) - self._expiry_margin
+            > datetime.now(timezone.utc)
+        )
+
+    def _read(self, key):
+        try:
+            with open(path.join(self._directory, f'{key}.json')) as f:
+                cached = json.load(f)
+            expiration = datetime.fromisoformat(cached['Expiration'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if not self._is_fresh(expiration):
+            return None
+        return dict(cached, Expiration=expiration)
+
+    def _write(self, key, credentials):
+        expiration = credentials.get('Expiration')
+        if not isinstance(expiration, datetime) \
+                or not self._is_fresh(expiration):
+            return
+        write_atomic(
+            path.join(self._directory, f'{key}.json'),
+            json.dumps({
+                'AccessKeyId': credentials['AccessKeyId'],
+                'SecretAccessKey': credentials['SecretAccessKey'],
+                'SessionToken': credentials['SessionToken'],
+                'Expiration': _utc(expiration).isoformat(),
+            }).encode('utf-8'),
+        )
+
+    def get_or_assume(self, root_session, role_arn, assume):
+        key = self._key(root_session, role_arn)
+        if key is None:
+            return assume()
+        with file_lock(path.join(self._directory, f'{key}.lock')):
+            credentials = self._read(key)
+            if credentials is not None:
+                logger.debug(f'Using cached credentials for {role_arn}')
+                return credentials
+            credentials = assume()
+            self._write(key, credentials)
+            return credentials
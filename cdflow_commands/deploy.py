@@ -8,7 +8,8 @@ from time import time
 from cdflow_commands.config import env_with_aws_credetials
 from cdflow_commands.constants import (
     CONFIG_BASE_PATH, GLOBAL_CONFIG_FILE_NAME, INFRASTRUCTURE_DEFINITIONS_PATH,
-    PLATFORM_CONFIG_BASE_PATH, RELEASE_METADATA_FILE, TERRAFORM_BINARY
+    PLATFORM_CONFIG_BASE_PATH, RELEASE_METADATA_FILE, TERRAFORM_BINARY,
+    TERRAFORM_WORKSPACE_ENV_VAR,
 )
 from cdflow_commands.exceptions import UserFacingError
 from cdflow_commands.logger import logger
@@ -27,7 +28,7 @@ class Deploy:
         self, environment, release_path, secrets, account_scheme, boto_session,
         infra_path=INFRASTRUCTURE_DEFINITIONS_PATH,
         config_base_path=CONFIG_BASE_PATH,
-        interactive=False,
+        interactive=False, workspace=None,
     ):
         self._environment = environment
         self._release_path = release_path
@@ -37,6 +38,7 @@ class Deploy:
         self._infra_path = infra_path
         self._config_base_path = config_base_path
         self._interactive = interactive
+        self._workspace = workspace
 
     def run(self, plan_only=False):
         plan_exit_code = self._plan()
@@ -47,6 +49,12 @@ class Deploy:
         if not plan_only:
             self._apply()
 
+    def _terraform_env(self):
+        env = env_with_aws_credetials(os.environ, self._boto_session)
+        if self._workspace is not None:
+            env[TERRAFORM_WORKSPACE_ENV_VAR] = self._workspace
+        return env
+
     def _print_obfuscated_output(self, out):
         secrets_values = self._secrets.get('secrets', {}).values()
         if out:
@@ -81,9 +89,7 @@ class Deploy:
 
             process = Popen(
                 command, cwd=self._release_path,
-                env=env_with_aws_credetials(
-                    os.environ, self._boto_session
-                ),
+                env=self._terraform_env(),
                 stdout=PIPE, stderr=PIPE
             )
 
@@ -100,9 +106,7 @@ class Deploy:
         check_call(
             self._build_parameters('apply'),
             cwd=self._release_path,
-            env=env_with_aws_credetials(
-                os.environ, self._boto_session
-            )
+            env=self._terraform_env(),
         )
 
     @property
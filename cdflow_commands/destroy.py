@@ -9,6 +9,7 @@ from cdflow_commands.config import env_with_aws_credetials
 from cdflow_commands.constants import (
     CONFIG_BASE_PATH, GLOBAL_CONFIG_FILE, INFRASTRUCTURE_DEFINITIONS_PATH,
     PLATFORM_CONFIG_BASE_PATH, RELEASE_METADATA_FILE, TERRAFORM_BINARY,
+    TERRAFORM_WORKSPACE_ENV_VAR,
     TERRAFORM_PLAN_EXIT_CODE_SUCCESS_NO_CHANGES,
     TERRAFORM_PLAN_EXIT_CODE_ERROR,
     TERRAFORM_PLAN_EXIT_CODE_SUCCESS_CHANGES_PRESENT
@@ -28,12 +29,14 @@ class Destroy:
 
     def __init__(
         self, environment, release_path, secrets, account_scheme, boto_session,
+        workspace=None,
     ):
         self._environment = environment
         self._release_path = release_path
         self._secrets = secrets
         self._account_scheme = account_scheme
         self._boto_session = boto_session
+        self._workspace = workspace
 
     def run(self, plan_only=False):
         plan_exit_code = self._plan()
@@ -47,6 +50,12 @@ class Destroy:
         if plan_exit_code == TERRAFORM_PLAN_EXIT_CODE_SUCCESS_CHANGES_PRESENT:
             self._apply()
 
+    def _terraform_env(self):
+        env = env_with_aws_credetials(os.environ, self._boto_session)
+        if self._workspace is not None:
+            env[TERRAFORM_WORKSPACE_ENV_VAR] = self._workspace
+        return env
+
     def _print_obfuscated_output(self, out):
         secrets_values = self._secrets.get('secrets', {}).values()
         if out:
@@ -84,9 +93,7 @@ class Destroy:
 
             process = Popen(
                 command, cwd=self._release_path,
-                env=env_with_aws_credetials(
-                    os.environ, self._boto_session
-                ),
+                env=self._terraform_env(),
                 stdout=PIPE, stderr=PIPE
             )
 
@@ -103,9 +110,7 @@ class Destroy:
         check_call(
             self._build_parameters('apply'),
             cwd=self._release_path,
-            env=env_with_aws_credetials(
-                os.environ, self._boto_session
-            )
+            env=self._terraform_env(),
         )
 
     @property
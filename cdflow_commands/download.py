@@ -0,0 +1,115 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from cdflow_commands.logger import logger
+from cdflow_commands.transfer import TransferLog, max_concurrency, part_size
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class DownloadProgress:
+    """Records which parts of a download have been written to disk, so that
+    an interrupted download can be resumed rather than started again."""
+
+    def __init__(self, progress_path, etag, size, part_size):
+        self._path = progress_path
+        self._header = json.dumps({
+            'etag': etag, 'size': size, 'part_size': part_size,
+        })
+        self._lock = Lock()
+        self.completed = self._load()
+
+    def _load(self):
+        try:
+            with open(self._path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return None
+        if not lines or lines[0] != self._header:
+            return None
+        return {int(line) for line in lines[1:] if line.isdigit()}
+
+    def start(self):
+        self.completed = set()
+        with open(self._path, 'w') as f:
+            f.write(f'{self._header}\n')
+
+    def mark_completed(self, part):
+        with self._lock:
+            self.completed.add(part)
+            with open(self._path, 'a') as f:
+                f.write(f'{part}\n')
+
+    def remove(self):
+        os.remove(self._path)
+
+
+def _open_part_file(part_path, size, resume):
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o600)
+    if not resume:
+        os.ftruncate(fd, 0)
+        os.ftruncate(fd, size)
+    return fd
+
+
+def _download_part(s3_client, bucket, key, etag, size, fd, part, log):
+    start = part * part_size()
+    end = min(start + part_size(), size) - 1
+    body = s3_client.get_object(
+        Bucket=bucket, Key=key, Range=f'bytes={start}-{end}', IfMatch=etag,
+    )['Body']
+    offset = start
+    for chunk in iter(lambda: body.read(CHUNK_SIZE), b''):
+        os.pwrite(fd, chunk, offset)
+        offset += len(chunk)
+        log(len(chunk))
+
+
+def _download_parts(s3_client, bucket, key, etag, size, fd, progress):
+    parts = [
+        part for part in range(-(-size // part_size()))
+        if part not in progress.completed
+    ]
+
+    def download(part):
+        _download_part(s3_client, bucket, key, etag, size, fd, part, log)
+        progress.mark_completed(part)
+
+    with TransferLog(f'Downloaded s3://{bucket}/{key}') as log, \
+            ThreadPoolExecutor(max_workers=max_concurrency()) as executor:
+        for _ in executor.map(download, parts):
+            pass
+
+
+def download_file(s3_client, bucket, key, destination):
+    """Download an S3 object to destination with concurrent ranged GETs.
+
+    Parts are streamed straight to a .part file next to destination, so
+    memory use is bounded by the chunk size rather than the object size.
+    """
+    head = s3_client.head_object(Bucket=bucket, Key=key)
+    size, etag = head['ContentLength'], head['ETag']
+    progress = DownloadProgress(
+        f'{destination}.progress', etag, size, part_size(),
+    )
+    resume = progress.completed is not None
+    if resume:
+        logger.debug(
+            f'Resuming download of s3://{bucket}/{key} with '
+            f'{len(progress.completed)} parts already downloaded'
+        )
+    else:
+        progress.start()
+    part_path = f'{destination}.part'
+    fd = _open_part_file(part_path, size, resume)
+    try:
+        _download_parts(s3_client, bucket, key, etag, size, fd, progress)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    # Once the .part file is renamed there is nothing left to resume, so the
+    # progress must not outlive it.
+    progress.remove()
+    os.replace(part_path, destination)
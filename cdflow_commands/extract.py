@@ -0,0 +1,104 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+from stat import S_IMODE
+from zipfile import ZipFile
+
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+# Below this many files per worker, opening another handle on the archive
+# and starting a thread costs more than it saves.
+MIN_FILES_PER_WORKER = 64
+
+
+def _target_path(destination, member):
+    # The same sanitisation ZipFile.extract applies to member names.
+    arcname = path.splitdrive(member.filename.replace('/', path.sep))[1]
+    invalid = ('', path.curdir, path.pardir)
+    return path.join(destination, *(
+        part for part in arcname.split(path.sep) if part not in invalid
+    ))
+
+
+def _default_modes():
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask, 0o777 & ~umask
+
+
+def _create_directories(members, destination):
+    directories = set()
+    for member in members:
+        target = _target_path(destination, member)
+        directories.add(target if member.is_dir() else path.dirname(target))
+    for directory in sorted(directories):
+        os.makedirs(directory, exist_ok=True)
+
+
+def _split(files, workers):
+    batches = [[] for _ in range(workers)]
+    by_size = sorted(files, key=lambda member: member.file_size, reverse=True)
+    for index, member in enumerate(by_size):
+        batches[index % workers].append(member)
+    return batches
+
+
+def _extract_batch(archive, batch, destination):
+    return [
+        (archive.extract(member, destination), member.external_attr >> 16)
+        for member in batch
+    ]
+
+
+def _extract_files(release_archive, files, destination, max_workers):
+    workers = max(1, min(
+        max_workers, len(files) // MIN_FILES_PER_WORKER,
+    ))
+    if workers == 1:
+        return _extract_batch(release_archive, files, destination)
+    batches = _split(files, workers)
+
+    def extract(index):
+        if index == 0:
+            return _extract_batch(release_archive, batches[0], destination)
+        with ZipFile(release_archive.filename) as archive:
+            return _extract_batch(archive, batches[index], destination)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return [
+            extracted
+            for batch in executor.map(extract, range(workers))
+            for extracted in batch
+        ]
+
+
+def _restore_modes(extracted, default_mode):
+    for filepath, mode in extracted:
+        if S_IMODE(mode) != default_mode:
+            os.chmod(filepath, mode)
+
+
+def extract_archive(release_archive, destination, max_workers=MAX_WORKERS):
+    """Extract every member of release_archive, restoring unix modes.
+
+    Directories are created up front so files can be extracted by several
+    threads, each with its own handle on the archive. Modes are restored
+    once everything is extracted, skipping files whose mode is already what
+    they were created with, and directories last, so that a read-only
+    directory does not stop its contents being written.
+    """
+    members = release_archive.infolist()
+    _create_directories(members, destination)
+    files = [member for member in members if not member.is_dir()]
+    directories = [member for member in members if member.is_dir()]
+    extracted = _extract_files(
+        release_archive, files, destination, max_workers,
+    )
+    default_file_mode, default_directory_mode = _default_modes()
+    _restore_modes(extracted, default_file_mode)
+    _restore_modes(sorted(
+        (
+            (_target_path(destination, member), member.external_attr >> 16)
+            for member in directories
+        ),
+        reverse=True,
+    ), default_directory_mode)
@@ -0,0 +1,124 @@
+import errno
+import fcntl
+import os
+from os import path
+from shutil import copy2, copymode
+
+# ioctl request for a copy-on-write clone of a whole file (linux/fs.h).
+FICLONE = 0x40049409
+
+# Errors meaning "this filesystem (pair) can't do that", as opposed to a
+# genuine failure to read or write the file.
+UNSUPPORTED = {
+    errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EPERM,
+    errno.EMLINK, errno.ENOSYS,
+}
+
+
+def reflink(source, destination):
+    with open(source, 'rb') as source_file, \
+            open(destination, 'wb') as destination_file:
+        fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+    copymode(source, destination)
+
+
+def hardlink(source, destination):
+    os.link(source, destination)
+
+
+def copy(source, destination):
+    copy2(source, destination)
+
+
+LINK_METHODS = (reflink, hardlink, copy)
+# For trees that may be edited, which must not share files with the source.
+CLONE_METHODS = (reflink, copy)
+
+
+def _remove(filepath):
+    try:
+        os.remove(filepath)
+    except FileNotFoundError:
+        pass
+
+
+class TreeLinker:
+    """Recreates trees of files using the cheapest method available.
+
+    Files are cloned copy-on-write where the filesystem supports it,
+    hardlinked where it doesn't, and copied when source and destination are
+    on different filesystems. The first method that works is remembered so
+    unsupported methods are only tried once. Files for which must_copy
+    returns True are always copied, for files that may be modified in place.
+    """
+
+    def __init__(self, methods=LINK_METHODS, must_copy=None):
+        self._methods = list(methods)
+        self._must_copy = must_copy or (lambda relative_path: False)
+        self.bytes_linked = 0
+        self.bytes_copied = 0
+
+    def _link_with_fallback(self, source, destination):
+        while True:
+            method = self._methods[0]
+            try:
+                method(source, destination)
+                return method
+            except OSError as e:
+                if e.errno not in UNSUPPORTED or method is copy:
+                    raise
+                _remove(destination)
+                self._methods.pop(0)
+
+    def link_file(self, source, destination, relative_path=None):
+        size = path.getsize(source)
+        if self._must_copy(relative_path or path.basename(source)):
+            copy(source, destination)
+            method = copy
+        else:
+            method = self._link_with_fallback(source, destination)
+        if method is copy:
+            self.bytes_copied += size
+        else:
+            self.bytes_linked += size
+
+    def _link_entry(
+        self, source_dir, destination_dir, relative_dir, name,
+        follow_symlinks,
+    ):
+        source = path.join(source_dir, name)
+        destination = path.join(destination_dir, name)
+        if path.islink(source) and not follow_symlinks:
+            os.symlink(os.readlink(source), destination)
+        elif path.isfile(source):
+            self.link_file(
+                path.realpath(source) if follow_symlinks else source,
+                destination, path.normpath(path.join(relative_dir, name)),
+            )
+
+    def _entries(self, dirpath, dirnames, filenames, follow_symlinks):
+        if follow_symlinks:
+            return filenames
+        return filenames + [
+            d for d in dirnames if path.islink(path.join(dirpath, d))
+        ]
+
+    def link_tree(self, source, destination, follow_symlinks=False):
+        """Recreate source at destination. Symlinks are recreated, or with
+        follow_symlinks replaced by what they point to, like copytree."""
+        for dirpath, dirnames, filenames in os.walk(
+            source, followlinks=follow_symlinks,
+        ):
+            relative_dir = path.relpath(dirpath, source)
+            destination_dir = path.normpath(
+                path.join(destination, relative_dir)
+            )
+            os.makedirs(destination_dir, exist_ok=True)
+            copymode(dirpath, destination_dir)
+            for name in self._entries(
+                dirpath, dirnames, filenames, follow_symlinks,
+            ):
+                self._link_entry(
+                    dirpath, destination_dir, relative_dir, name,
+                    follow_symlinks,
+                )
@@ -0,0 +1,134 @@
+import os
+import zipfile
+from hashlib import sha256
+from os import path
+from stat import S_IXUSR
+
+from cdflow_commands.zip_patch import STORED_EXTENSIONS
+
+CHUNK_SIZE = 1024 * 1024
+# Members get a fixed timestamp and one of two modes, so that the same files
+# always make the same package.
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+FILE_MODE = 0o100644
+EXECUTABLE_FILE_MODE = 0o100755
+UNIX_SYSTEM = 3
+
+
+def _source_files(source_dir):
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            yield path.join(dirpath, filename)
+
+
+def _mode(filepath):
+    if os.stat(filepath).st_mode & S_IXUSR:
+        return EXECUTABLE_FILE_MODE
+    return FILE_MODE
+
+
+def _hash_file(filepath):
+    digest = sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def package_hash(source_dir):
+    """A hash of the names, modes and contents of the files a ZipStream of
+    source_dir contains."""
+    digest = sha256()
+    for filepath in _source_files(source_dir):
+        digest.update('{}\0{:o}\0{}\0'.format(
+            path.relpath(filepath, source_dir), _mode(filepath),
+            _hash_file(filepath),
+        ).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class _Buffer:
+    # The file ZipFile writes to. It has no seek, so ZipFile writes each
+    # member's sizes after its data rather than going back to the header.
+
+    def __init__(self):
+        self._data = bytearray()
+        self._position = 0
+
+    @property
+    def size(self):
+        return len(self._data)
+
+    def write(self, data):
+        self._data += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def take(self, size):
+        if size < 0:
+            size = len(self._data)
+        data = bytes(self._data[:size])
+        del self._data[:size]
+        return data
+
+
+class ZipStream:
+    """A zip of the files under source_dir, as a file-like object that
+    compresses the files as it is read, so that it can be uploaded without
+    writing the archive to disk or holding all of it in memory."""
+
+    def __init__(self, source_dir, compression_level):
+        self._source_dir = source_dir
+        self._compression_level = compression_level
+        self._files = _source_files(source_dir)
+        self._buffer = _Buffer()
+        self._zip = zipfile.ZipFile(self._buffer, 'w')
+        self._member = None
+        self._finished = False
+
+    def read(self, size=-1):
+        while not self._finished and (size < 0 or self._buffer.size < size):
+            self._write_chunk()
+        return self._buffer.take(size)
+
+    def _open_member(self, filepath):
+        zinfo = zipfile.ZipInfo(
+            path.relpath(filepath, self._source_dir), FIXED_DATE_TIME,
+        )
+        zinfo.create_system = UNIX_SYSTEM
+        zinfo.external_attr = _mode(filepath) << 16
+        zinfo.file_size = path.getsize(filepath)
+        if path.splitext(filepath)[1].lower() not in STORED_EXTENSIONS:
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            zinfo._compresslevel = self._compression_level
+        return open(filepath, 'rb'), self._zip.open(zinfo, 'w')
+
+    def _write_chunk(self):
+        if self._member is None:
+            filepath = next(self._files, None)
+            if filepath is None:
+                self._zip.close()
+                self._finished = True
+                return
+            self._member = self._open_member(filepath)
+        source, member = self._member
+        chunk = source.read(CHUNK_SIZE)
+        if chunk:
+            member.write(chunk)
+        else:
+            member.close()
+            source.close()
+            self._member = None
+
+    def close(self):
+        if self._member is not None:
+            for f in self._member:
+                f.close()
+            self._member = None
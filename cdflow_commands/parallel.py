@@ -0,0 +1,82 @@
+import os
+import sys
+import traceback
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+from tempfile import TemporaryFile
+
+from cdflow_commands.exceptions import UserFacingError
+from cdflow_commands.logger import logger
+
+# Tasks run in forked processes so that each gets its own working directory,
+# environment and stdout/stderr, which terraform subprocesses inherit.
+_context = get_context('fork')
+
+STDOUT_FILENO = 1
+STDERR_FILENO = 2
+
+
+def _run_task(task):
+    try:
+        task()
+    except UserFacingError as e:
+        logger.error(e)
+        return 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def _run_captured(task, output):
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(output.fileno(), STDOUT_FILENO)
+    os.dup2(output.fileno(), STDERR_FILENO)
+    sys.stdout = open(STDOUT_FILENO, 'w', buffering=1, closefd=False)
+    sys.stderr = open(STDERR_FILENO, 'w', buffering=1, closefd=False)
+    exit_code = _run_task(task)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # Skip the parent's atexit handlers and context managers (e.g. removal
+    # of the fetched release) that were inherited by the fork.
+    os._exit(exit_code)
+
+
+def _print_prefixed(label, output):
+    output.seek(0)
+    for line in output.read().decode('utf-8', 'replace').splitlines():
+        sys.stdout.write(f'[{label}] {line}\n')
+    sys.stdout.flush()
+    output.close()
+
+
+def _start(label, task):
+    output = TemporaryFile()
+    process = _context.Process(target=_run_captured, args=(task, output))
+    process.start()
+    logger.info(f'Started {label}')
+    return process, output
+
+
+def run_in_parallel(tasks, max_workers):
+    """Run (label, callable) tasks in up to max_workers processes.
+
+    Each task's output is printed as a block prefixed with its label once it
+    finishes. Returns the labels of the tasks that failed.
+    """
+    pending = list(tasks)
+    running = {}
+    failed = []
+    while pending or running:
+        while pending and len(running) < max_workers:
+            label, task = pending.pop(0)
+            process, output = _start(label, task)
+            running[process.sentinel] = (label, process, output)
+        for sentinel in wait(list(running)):
+            label, process, output = running.pop(sentinel)
+            process.join()
+            _print_prefixed(label, output)
+            if process.exitcode != 0:
+                failed.append(label)
+    return failed
@@ -0,0 +1,181 @@
+import fcntl
+import os
+import re
+from contextlib import contextmanager
+from os import path
+from shutil import rmtree
+
+from cdflow_commands.cache import cache_directory, file_lock, tree_size
+from cdflow_commands.logger import logger
+
+CACHE_NAME = 'terraform-plugins'
+DEFAULT_MAX_SIZE_MB = 2048
+PLUGIN_CACHE_ENV_VAR = 'TF_PLUGIN_CACHE_DIR'
+
+# Plugins are stored under <os>_<arch> directories: as files directly in them
+# for terraform 0.12, and as one package directory per provider version
+# (<host>/<namespace>/<type>/<version>/<os>_<arch>) from 0.13.
+PLATFORM_DIRECTORY = re.compile(r'^[a-z0-9]+_[a-z0-9]+$')
+
+_max_size_mb = DEFAULT_MAX_SIZE_MB
+_active = None
+
+
+def set_max_size_mb(max_size_mb):
+    global _max_size_mb
+    _max_size_mb = max_size_mb
+
+
+def is_enabled():
+    return _max_size_mb > 0
+
+
+def _plugins_in_platform_directory(directory, relative_dir):
+    return {
+        path.join(relative_dir, filename): path.getsize(
+            path.join(directory, relative_dir, filename),
+        )
+        for filename in os.listdir(path.join(directory, relative_dir))
+        if path.isfile(path.join(directory, relative_dir, filename))
+    }
+
+
+def plugins(directory):
+    """Map each plugin in the cache, by path relative to it, to its size."""
+    found = {}
+    for dirpath, dirnames, _ in os.walk(directory):
+        if not PLATFORM_DIRECTORY.match(path.basename(dirpath)):
+            continue
+        relative_dir = path.relpath(dirpath, directory)
+        if relative_dir == path.basename(dirpath):
+            found.update(
+                _plugins_in_platform_directory(directory, relative_dir),
+            )
+        else:
+            found[relative_dir] = tree_size(dirpath)
+        dirnames[:] = []
+    return found
+
+
+def _installed_plugins(cached, working_directory):
+    installed = path.join(working_directory, '.terraform')
+    return {
+        plugin for plugin in cached
+        if any(
+            path.lexists(path.join(installed, subdirectory, plugin))
+            for subdirectory in ('plugins', 'providers')
+        )
+    }
+
+
+class PluginCache:
+    """A terraform plugin cache directory shared by every cdflow process.
+
+    terraform init doesn't guarantee the cache is safe for concurrent use,
+    so inits that may use it are serialised with a lock. Every process
+    using the cache holds a shared lock on it until it finishes, and the
+    least recently used plugins are only evicted by a process that finds no
+    other is using the cache.
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self._max_size = max_size
+        self._in_use = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def create(cls):
+        return cls(cache_directory(CACHE_NAME), _max_size_mb * 1024 * 1024)
+
+    def open(self):
+        self._in_use = open(path.join(self.directory, 'in-use.lock'), 'a')
+        fcntl.flock(self._in_use.fileno(), fcntl.LOCK_SH)
+
+    def close(self):
+        self._in_use.close()
+        self._in_use = None
+
+    @contextmanager
+    def initialising(self, working_directory):
+        with file_lock(path.join(self.directory, 'init.lock')):
+            before = plugins(self.directory)
+            yield
+            after = plugins(self.directory)
+        installed = _installed_plugins(after, working_directory)
+        for plugin in installed:
+            os.utime(path.join(self.directory, plugin))
+        downloaded = installed - set(before)
+        self.misses += len(downloaded)
+        self.hits += len(installed) - len(downloaded)
+
+    def log_stats(self):
+        if self.hits + self.misses == 0:
+            return
+        logger.debug(
+            f'Terraform plugin cache: {self.hits} hits, {self.misses} misses '
+            f'({self.hits / (self.hits + self.misses):.0%} hit rate)'
+        )
+
+    def _evict_plugin(self, plugin):
+        plugin_path = path.join(self.directory, plugin)
+        if path.isdir(plugin_path):
+            rmtree(plugin_path, ignore_errors=True)
+        else:
+            os.remove(plugin_path)
+        logger.debug(f'Evicted {plugin} from terraform plugin cache')
+
+    def _evict_least_recently_used(self):
+        cached = plugins(self.directory)
+        total = sum(cached.values())
+        for plugin in sorted(cached, key=lambda plugin: path.getmtime(
+            path.join(self.directory, plugin),
+        )):
+            if total <= self._max_size:
+                break
+            self._evict_plugin(plugin)
+            total -= cached[plugin]
+
+    def evict(self):
+        try:
+            fcntl.flock(
+                self._in_use.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB,
+            )
+        except BlockingIOError:
+            logger.debug('Terraform plugin cache in use, not evicting')
+            return
+        self._evict_least_recently_used()
+
+
+def activate():
+    """Point terraform subprocesses at the shared plugin cache, unless it is
+    disabled or the user has configured their own."""
+    global _active
+    if not is_enabled() or PLUGIN_CACHE_ENV_VAR in os.environ:
+        return
+    _active = PluginCache.create()
+    _active.open()
+    os.environ[PLUGIN_CACHE_ENV_VAR] = _active.directory
+
+
+def deactivate():
+    global _active
+    if _active is None:
+        return
+    _active.log_stats()
+    _active.evict()
+    _active.close()
+    os.environ.pop(PLUGIN_CACHE_ENV_VAR, None)
+    _active = None
+
+
+@contextmanager
+def initialising(working_directory, get_plugins=True):
+    """Wrap a terraform init run in working_directory, which may download
+    plugins into the cache if get_plugins is set."""
+    if _active is None or not get_plugins:
+        yield
+    else:
+        with _active.initialising(working_directory):
+            yield
@@ -1,8 +1,25 @@
 import os
-from zipfile import ZipFile
-from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 
+from botocore.exceptions import ClientError
+
+from cdflow_commands import clients
 from cdflow_commands.logger import logger
+from cdflow_commands.package import ZipStream, package_hash
+from cdflow_commands.transfer import TransferLog, transfer_config
+from cdflow_commands.zip_patch import get_compression_level
+
+PACKAGE_HASH_METADATA_KEY = 'cdflow_package_sha256'
+
+
+def _copy_extra_args(source_hash):
+    # Managed copies that are split into parts don't carry the source's
+    # metadata over, so it is always set on the copy.
+    return {
+        'Metadata': {PACKAGE_HASH_METADATA_KEY: source_hash},
+        'MetadataDirective': 'REPLACE',
+    }
 
 
 class ReleasePlugin:
@@ -20,62 +37,46 @@ class ReleasePlugin:
             self._source_dir = 'src'
 
     @property
-    def _lambda_s3_key(self):
-        key = '{}/{}-{}.zip'.format(
-            self._component_name, self._component_name, self._version
-        )
+    def _lambda_s3_key_prefix(self):
+        prefix = '{}/{}-'.format(self._component_name, self._component_name)
         if not self._account_scheme.classic_metadata_handling:
-            key = f'{self._team}/{key}'
-        return key
+            prefix = f'{self._team}/{prefix}'
+        return prefix
+
+    @property
+    def _lambda_s3_key(self):
+        return f'{self._lambda_s3_key_prefix}{self._version}.zip'
 
     @property
     def _boto_s3_client(self):
-        return self._boto_session.client('s3')
+        return clients.client(self._boto_session, 's3')
 
     def create(self):
-        zipped_folder = self._zip_up_component()
         if self._multi_region:
-            metadata = self._upload_zip_to_buckets(
-                self._account_scheme.lambda_buckets, zipped_folder.filename
-            )
-        else:
-            metadata = self._upload_zip_to_bucket(
-                self._account_scheme.lambda_bucket, zipped_folder.filename
+            return self._upload_zip_to_buckets(
+                self._account_scheme.lambda_buckets,
             )
-        self._remove_zipped_folder(zipped_folder.filename)
-        return metadata
+        return self._upload_zip_to_bucket(self._account_scheme.lambda_bucket)
 
-    @contextmanager
-    def _change_dir(self, path):
-        top_level = os.getcwd()
-        os.chdir(path)
-        yield
-        os.chdir(top_level)
-
-    def _zip_up_component(self):
-        logger.info('Zipping up ./{} folder'.format(self._source_dir))
-        with ZipFile(self._source_dir + '.zip', 'w') as zipped_folder:
-            with self._change_dir(self._source_dir):
-                for dirname, subdirs, files in os.walk('.'):
-                    for filename in files:
-                        zipped_folder.write(os.path.join(dirname, filename))
-        return zipped_folder
-
-    def _upload_zip_to_bucket(self, bucket_name, filename):
-        logger.info('Uploading {} to s3 bucket ({}) with key: {}'.format(
-            filename, bucket_name, self._lambda_s3_key
-        ))
-        self._boto_s3_client.upload_file(
-            filename,
-            bucket_name,
-            self._lambda_s3_key
+    def _upload_zip_to_bucket(self, bucket_name):
+        logger.info(
+            'Zipping up ./{} and uploading to s3 bucket ({}) with key: {}'
+            .format(self._source_dir, bucket_name, self._lambda_s3_key)
         )
+        self._publish_package(self._boto_s3_client, bucket_name)
         return {
             's3_bucket': bucket_name,
             's3_key': self._lambda_s3_key,
         }
 
-    def _upload_zip_to_buckets(self, buckets, filename):
+    def _primary_region(self, buckets):
+        # The package is uploaded once, to the default region's bucket where
+        # there is one, and copied from there to the other regions.
+        if self._account_scheme.default_region in buckets:
+            return self._account_scheme.default_region
+        return sorted(buckets)[0]
+
+    def _upload_zip_to_buckets(self, buckets):
         metadata = {
             's3_key': self._lambda_s3_key,
             # this is a map tfvar that currently only allows scalar values
@@ -83,20 +84,116 @@ class ReleasePlugin:
             # (the same applies to the "s3_bucket." psuedo-map below)
             's3_bucket_regions_csv': ','.join(sorted(buckets.keys()))
         }
-        for region, bucket_name in buckets.items():
-            logger.info(
-                'Uploading {} to s3 bucket ({} in {}) with key: {}'.format(
-                    filename, bucket_name, region, self._lambda_s3_key
-                )
-            )
-            self._boto_session.client('s3', region_name=region).upload_file(
-                filename,
-                bucket_name,
+        primary_region = self._primary_region(buckets)
+        primary_client = clients.client(
+            self._boto_session, 's3', region_name=primary_region,
+        )
+        logger.info(
+            'Zipping up ./{} and uploading to s3 bucket ({} in {}) with key: '
+            '{}'.format(
+                self._source_dir, buckets[primary_region], primary_region,
                 self._lambda_s3_key
             )
+        )
+        source_hash = self._publish_package(
+            primary_client, buckets[primary_region],
+        )
+        self._copy_to_regions(
+            primary_client, buckets[primary_region], {
+                region: bucket_name for region, bucket_name in buckets.items()
+                if region != primary_region
+            }, source_hash,
+        )
+        for region, bucket_name in buckets.items():
             metadata[f's3_bucket.{region}'] = bucket_name
         return metadata
 
-    def _remove_zipped_folder(self, filename):
-        logger.info('Removing local zipped package: {}'.format(filename))
-        os.remove(filename)
+    def _copy_to_regions(
+        self, source_client, source_bucket, buckets, source_hash,
+    ):
+        def copy(region):
+            logger.info('Copying {} to s3 bucket ({} in {})'.format(
+                self._lambda_s3_key, buckets[region], region,
+            ))
+            clients.client(self._boto_session, 's3', region_name=region).copy(
+                {'Bucket': source_bucket, 'Key': self._lambda_s3_key},
+                buckets[region],
+                self._lambda_s3_key,
+                ExtraArgs=_copy_extra_args(source_hash),
+                SourceClient=source_client,
+                Config=transfer_config(),
+            )
+
+        if not buckets:
+            return
+        with ThreadPoolExecutor(max_workers=len(buckets)) as executor:
+            for _ in executor.map(copy, sorted(buckets)):
+                pass
+
+    def _stored_package_hash(self, s3_client, bucket_name, key):
+        try:
+            response = s3_client.head_object(Bucket=bucket_name, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+                raise
+            return None
+        return response['Metadata'].get(PACKAGE_HASH_METADATA_KEY)
+
+    def _latest_package_key(self, s3_client, bucket_name):
+        paginator = s3_client.get_paginator('list_objects_v2')
+        packages = [
+            item
+            for page in paginator.paginate(
+                Bucket=bucket_name, Prefix=self._lambda_s3_key_prefix,
+            )
+            for item in page.get('Contents', [])
+            if item['Key'].endswith('.zip')
+            and item['Key'] != self._lambda_s3_key
+        ]
+        if not packages:
+            return None
+        return max(packages, key=lambda item: item['LastModified'])['Key']
+
+    def _publish_package(self, s3_client, bucket_name):
+        # Packages are deterministic, so a release whose source is unchanged
+        # reuses the package already uploaded for an earlier version.
+        source_hash = package_hash(self._source_dir)
+        if self._stored_package_hash(
+            s3_client, bucket_name, self._lambda_s3_key,
+        ) == source_hash:
+            logger.info(f'{self._lambda_s3_key} is already up to date')
+            return source_hash
+        latest_key = self._latest_package_key(s3_client, bucket_name)
+        if latest_key is not None and self._stored_package_hash(
+            s3_client, bucket_name, latest_key,
+        ) == source_hash:
+            logger.info(f'Package unchanged, copying it from {latest_key}')
+            s3_client.copy(
+                {'Bucket': bucket_name, 'Key': latest_key},
+                bucket_name,
+                self._lambda_s3_key,
+                ExtraArgs=_copy_extra_args(source_hash),
+                Config=transfer_config(),
+            )
+            return source_hash
+        self._upload_package(s3_client, bucket_name, source_hash)
+        return source_hash
+
+    def _upload_package(self, s3_client, bucket_name, source_hash):
+        # The package is zipped as it is uploaded, in a multipart upload if
+        # it is larger than a part.
+        with closing(ZipStream(
+            self._source_dir, get_compression_level(),
+        )) as package, TransferLog(
+            f'Uploaded s3://{bucket_name}/{self._lambda_s3_key}',
+        ) as log:
+            s3_client.upload_fileobj(
+                package,
+                bucket_name,
+                self._lambda_s3_key,
+                ExtraArgs={'Metadata': {
+                    PACKAGE_HASH_METADATA_KEY: source_hash,
+                }},
+                Config=transfer_config(),
+                Callback=log,
+            )
@@ -1,12 +1,14 @@
 import json
 from base64 import b64decode
+from concurrent.futures import ThreadPoolExecutor
 from os import path
 from os.path import expanduser
 from os.path import isfile
-from subprocess import CalledProcessError, check_call
+from subprocess import DEVNULL, CalledProcessError, check_call
 
 from botocore.exceptions import ClientError
 
+from cdflow_commands import clients
 from cdflow_commands.exceptions import UserFacingError
 from cdflow_commands.logger import logger
 
@@ -15,15 +17,79 @@ class OnDockerBuildError(UserFacingError):
     pass
 
 
+class ImageNotFoundError(UserFacingError):
+    pass
+
+
+class BuildxNotFoundError(UserFacingError):
+    pass
+
+
 class ReleasePlugin:
 
     ON_BUILD_HOOK = './on-docker-build'
+    # Tags moved to each released image, in addition to its version.
+    RELEASE_TAGS = ('latest',)
+    BUILD_CACHE_TAG = 'buildcache'
 
-    def __init__(self, release, account_scheme):
+    def __init__(self, release, account_scheme, build_cache=False):
         self._release = release
         self._account_scheme = account_scheme
+        # The registry cache needs ECR, so it's only used for released
+        # (versioned) images.
+        self._build_cache = build_cache and bool(release.version)
 
     def create(self):
+        if self._release.version and self._reuse_commit_image():
+            return {'image_id': self._image_name}
+
+        self._docker_login_dockerhub_if_configured()
+
+        if self._build_cache:
+            self._check_buildx()
+            self._prepare_ecr()
+            self._build()
+        elif self._release.version:
+            # Preparing ECR doesn't depend on the image, so it's done while
+            # the image builds. Errors from the build take precedence.
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                ecr_prepared = executor.submit(self._prepare_ecr)
+                self._build()
+                ecr_prepared.result()
+        else:
+            self._build()
+
+        if self._release.version:
+            self._docker_push(self._image_name)
+            self._tag_image(self.RELEASE_TAGS + (self._commit_tag,))
+
+        return {'image_id': self._image_name}
+
+    def _reuse_commit_image(self):
+        # An image already built from this commit, e.g. by a retried
+        # release, is tagged with the new version rather than rebuilt.
+        image = self._find_image(self._commit_tag)
+        if image is None:
+            return False
+        if path.exists(self.ON_BUILD_HOOK):
+            logger.warning(
+                'Image for commit {} found in ECR, but rebuilding it so that '
+                '{} runs against the build'.format(
+                    self._release._commit, self.ON_BUILD_HOOK,
+                )
+            )
+            return False
+        logger.info(
+            'Image for commit {} found in ECR, skipping docker build'.format(
+                self._release._commit,
+            )
+        )
+        self._put_image_tags(
+            image, (self._release.version,) + self.RELEASE_TAGS,
+        )
+        return True
+
+    def _docker_login_dockerhub_if_configured(self):
         users_docker_config = expanduser("~") + "/.docker/config.json"
         logger.info(
             'Looking for a docker config at \'{}\''.format(
@@ -34,23 +100,50 @@ class ReleasePlugin:
             logger.info('docker config found, attempting docker login')
             self._docker_login_dockerhub()
 
-        check_call([
-            'docker', 'build',
-            '-t', self._image_name, '.'
-        ])
-
+    def _build(self):
+        self._docker_build()
         self._on_docker_build()
 
-        if self._release.version:
-            if self._account_scheme.classic_metadata_handling:
-                self._ensure_ecr_repo_exists()
-                self._ensure_ecr_policy_set()
-            self._docker_login_ecr()
-            self._docker_push(self._image_name)
-            self._docker_tag_latest()
-            self._docker_push(self._latest_image_name)
+    def _check_buildx(self):
+        # Docker clients before 19.03, or without the buildx plugin, can't
+        # import and export the cache.
+        try:
+            check_call(
+                ['docker', 'buildx', 'version'],
+                stdout=DEVNULL, stderr=DEVNULL,
+            )
+        except (CalledProcessError, FileNotFoundError):
+            raise BuildxNotFoundError(
+                '--docker-build-cache needs docker buildx, which this docker '
+                'client does not have'
+            )
 
-        return {'image_id': self._image_name}
+    def _prepare_ecr(self):
+        if self._account_scheme.classic_metadata_handling:
+            self._ensure_ecr_repo_exists()
+            self._ensure_ecr_policy_set()
+        self._docker_login_ecr()
+
+    def _docker_build(self):
+        if not self._build_cache:
+            check_call([
+                'docker', 'build',
+                '-t', self._image_name, '.'
+            ])
+            return
+        cache = 'type=registry,ref={}:{}'.format(
+            self._image_repository, self.BUILD_CACHE_TAG,
+        )
+        # mode=max caches the layers of every build stage, and ECR needs
+        # the cache stored as an OCI image manifest.
+        check_call([
+            'docker', 'buildx', 'build',
+            '--cache-from', cache,
+            '--cache-to',
+            f'{cache},mode=max,image-manifest=true,oci-mediatypes=true',
+            '--load',
+            '-t', self._image_name, '.'
+        ])
 
     def _on_docker_build(self):
         if path.exists(self.ON_BUILD_HOOK):
@@ -67,25 +160,27 @@ class ReleasePlugin:
             logger.debug('AWS region on client: {}'.format(
                 self._release.boto_session.region_name
             ))
-            self._ecr_client = self._release.boto_session.client('ecr')
+            self._ecr_client = clients.client(
+                self._release.boto_session, 'ecr',
+            )
         return self._ecr_client
 
     @property
-    def _image_name(self):
-        return '{}.dkr.ecr.{}.amazonaws.com/{}:{}'.format(
+    def _image_repository(self):
+        return '{}.dkr.ecr.{}.amazonaws.com/{}'.format(
             self._account_scheme.release_account.id,
             self._account_scheme.release_account.region,
             self._release.component_name,
-            self._release.version or 'dev'
         )
 
     @property
-    def _latest_image_name(self):
-        return '{}.dkr.ecr.{}.amazonaws.com/{}:{}'.format(
-            self._account_scheme.release_account.id,
-            self._account_scheme.release_account.region,
-            self._release.component_name,
-            'latest'
+    def _commit_tag(self):
+        return f'commit-{self._release._commit}'
+
+    @property
+    def _image_name(self):
+        return '{}:{}'.format(
+            self._image_repository, self._release.version or 'dev'
         )
 
     def _ensure_ecr_repo_exists(self):
@@ -173,7 +268,48 @@ class ReleasePlugin:
     def _docker_push(self, image_name):
         check_call(['docker', 'push', image_name])
 
-    def _docker_tag_latest(self):
-        check_call([
-            'docker', 'tag', self._image_name, self._latest_image_name
-        ])
+    def _find_image(self, tag):
+        try:
+            images = self._boto_ecr_client.batch_get_image(
+                registryId=self._account_scheme.release_account.id,
+                repositoryName=self._release.component_name,
+                imageIds=[{'imageTag': tag}],
+            )['images']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'RepositoryNotFoundException':
+                raise
+            return None
+        return images[0] if images else None
+
+    def _tag_image(self, tags):
+        # Tags are added to the pushed image's manifest in ECR, rather than
+        # with docker tag and another push.
+        image = self._find_image(self._release.version)
+        if image is None:
+            raise ImageNotFoundError(
+                f'Pushed image {self._image_name} not found in ECR'
+            )
+        self._put_image_tags(image, tags)
+
+    def _put_image_tags(self, image, tags):
+        for tag in tags:
+            self._put_image_tag(image, tag)
+
+    def _put_image_tag(self, image, tag):
+        logger.info(f'Tagging image in {self._image_repository} as {tag}')
+        extra_args = {}
+        if 'imageManifestMediaType' in image:
+            extra_args['imageManifestMediaType'] = \
+                image['imageManifestMediaType']
+        try:
+            self._boto_ecr_client.put_image(
+                registryId=self._account_scheme.release_account.id,
+                repositoryName=self._release.component_name,
+                imageManifest=image['imageManifest'],
+                imageTag=tag,
+                **extra_args,
+            )
+        except ClientError as e:
+            # The tag is already on this image.
+            if e.response['Error']['Code'] != 'ImageAlreadyExistsException':
+                raise
@@ -1,23 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from io import BytesIO
+from functools import partial
+from hashlib import sha256
 import json
 from operator import attrgetter
 import os
-from os import chmod, getcwd, path, mkdir, makedirs, listdir
-from os.path import isdir, isfile
-from shutil import copytree, make_archive, copyfile
+from os import getcwd, path, mkdir, makedirs, remove
+from os.path import isfile
+from shutil import make_archive
 import shutil
 from tempfile import TemporaryDirectory
 from time import time
 from zipfile import ZipFile
-from re import match, search
 
+from botocore.exceptions import ClientError
+
+from cdflow_commands import (
+    clients, plugin_cache, release_cache, terraform_cache, zip_patch,
+)
+from cdflow_commands.account import RELEASE_STORAGE_CONTENT_ADDRESSED
+from cdflow_commands.cache import cache_directory, file_lock
 from cdflow_commands.constants import (
     CONFIG_BASE_PATH, INFRASTRUCTURE_DEFINITIONS_PATH,
     PLATFORM_CONFIG_BASE_PATH, RELEASE_METADATA_FILE, TERRAFORM_BINARY,
     ACCOUNT_SCHEME_FILE
 )
+from cdflow_commands.content_store import (
+    build_manifest, copy_tree, download_tree, upload_tree,
+)
+from cdflow_commands.download import download_file
+from cdflow_commands.extract import extract_archive
+from cdflow_commands.link import CLONE_METHODS, LINK_METHODS, TreeLinker
 from cdflow_commands.logger import logger
+from cdflow_commands.transfer import TransferLog, transfer_config
 from cdflow_commands.process import check_call
 from cdflow_commands.zip_patch import _make_zipfile
 
@@ -25,66 +40,186 @@ from cdflow_commands.zip_patch import _make_zipfile
 shutil.unregister_archive_format('zip')
 shutil.register_archive_format('zip', _make_zipfile)
 
+DOWNLOAD_CACHE_NAME = 'downloads'
+MANIFEST_EXTENSION = '.manifest.json'
+
+
+def _object_exists(s3_client, bucket, key):
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+            raise
+        return False
+    return True
+
+
+def _release_location(boto_session, account_scheme, region, keys):
+    """The bucket, its region and the key to fetch a release from: the first
+    of keys in the release bucket closest to region, else in the release
+    bucket, whose last key is fetched without checking it exists."""
+    buckets = [(account_scheme.release_bucket, None)]
+    if region is not None:
+        closest = account_scheme.release_bucket_for_region(region)
+        if closest[0] != account_scheme.release_bucket:
+            # Releases made before the bucket was added aren't in it.
+            buckets.insert(0, closest)
+    candidates = [
+        (bucket, bucket_region, key)
+        for bucket, bucket_region in buckets for key in keys
+    ]
+    for bucket, bucket_region, key in candidates[:-1]:
+        s3_client = clients.client(
+            boto_session, 's3', region_name=bucket_region,
+        )
+        if _object_exists(s3_client, bucket, key):
+            return bucket, bucket_region, key
+    return candidates[-1]
+
+
+def _release_source(
+    boto_session, account_scheme, team_name, component_name, version, region,
+):
+    """The bucket and key of a release, a client for the bucket, and a
+    function that extracts the release into a directory."""
+    archive_key, manifest_key, blob_prefix = _release_keys(
+        account_scheme, team_name, component_name, version,
+    )
+    keys = [archive_key]
+    if account_scheme.release_storage == RELEASE_STORAGE_CONTENT_ADDRESSED:
+        # Releases made before the switch to content addressed storage are
+        # still archives.
+        keys.insert(0, manifest_key)
+    bucket, bucket_region, key = _release_location(
+        boto_session, account_scheme, region, keys,
+    )
+    s3_client = clients.client(boto_session, 's3', region_name=bucket_region)
+    if key == manifest_key:
+        return bucket, key, s3_client, partial(
+            download_tree, s3_client, bucket, blob_prefix, key,
+        )
+    return bucket, key, s3_client, partial(
+        download_and_extract_release, boto_session, bucket, key,
+        region_name=bucket_region,
+    )
+
 
 @contextmanager
 def fetch_release(
     boto_session, account_scheme, team_name, component_name, version,
+    region=None, editable=False,
 ):
-    if account_scheme.classic_metadata_handling:
-        release_key = format_release_key_classic(component_name, version)
-    else:
-        release_key = format_release_key(team_name, component_name, version)
-    release_archive = download_release(
-        boto_session, account_scheme.release_bucket, release_key,
+    """Fetch a release, from the release bucket closest to region if there
+    are regional release buckets. An editable release shares no files with
+    the release cache, so that changes to it can't reach the cache."""
+    bucket, release_key, s3_client, extract = _release_source(
+        boto_session, account_scheme, team_name, component_name, version,
+        region,
     )
+    logger.debug(f'Fetching s3://{bucket}/{release_key}')
     with TemporaryDirectory(prefix='{}/release-{}'.format(getcwd(), time())) \
             as path_to_release:
-        for zipinfo in release_archive.infolist():
-            extract_file(release_archive, zipinfo, path_to_release)
+        if release_cache.is_enabled():
+            etag = s3_client.head_object(
+                Bucket=bucket, Key=release_key,
+            )['ETag']
+            release_cache.ReleaseCache.create().materialise(
+                f'{bucket}/{release_key}', etag, path_to_release, extract,
+                CLONE_METHODS if editable else LINK_METHODS,
+            )
+        else:
+            extract(path_to_release)
         yield path_to_release
 
 
+def download_and_extract_release(
+    boto_session, bucket, key, destination, region_name=None,
+):
+    with download_release(
+        boto_session, bucket, key, region_name,
+    ) as release_archive:
+        extract_archive(release_archive, destination)
+
+
+def _read_latest_release_pointer(s3_client, bucket, key):
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+            raise
+        return None
+    return json.loads(response['Body'].read())['version']
+
+
+def _list_latest_release_version(s3_resource, bucket, key_prefix):
+    component_releases = s3_resource.Bucket(bucket).objects.filter(
+        Prefix=key_prefix,
+    )
+    ordered_releases = sorted(
+        component_releases,
+        key=attrgetter('last_modified'),
+        reverse=True,
+    )
+    latest_release = ordered_releases[0].key[len(key_prefix):]
+    for extension in ('.zip', MANIFEST_EXTENSION):
+        if latest_release.endswith(extension):
+            return latest_release[:-len(extension)]
+    return latest_release
+
+
 def find_latest_release_version(
     boto_session, account_scheme, team_name, component_name,
 ):
-    s3 = boto_session.resource('s3')
-    bucket = s3.Bucket(account_scheme.release_bucket)
     if account_scheme.classic_metadata_handling:
         key_prefix = format_release_key_prefix_classic(component_name)
+        latest_key = format_latest_release_key_classic(component_name)
     else:
         key_prefix = format_release_key_prefix(team_name, component_name)
-    component_releases = bucket.objects.filter(Prefix=key_prefix)
-    ordered_releases = sorted(
-        component_releases,
-        key=attrgetter('last_modified'),
-        reverse=True,
+        latest_key = format_latest_release_key(team_name, component_name)
+    version = _read_latest_release_pointer(
+        clients.client(boto_session, 's3'), account_scheme.release_bucket,
+        latest_key,
+    )
+    if version is not None:
+        return version
+    logger.debug(f'No {latest_key} pointer, listing releases instead')
+    return _list_latest_release_version(
+        clients.resource(boto_session, 's3'), account_scheme.release_bucket,
+        key_prefix,
     )
-    latest_release = ordered_releases[0].key
-    version = latest_release[len(key_prefix):][:-len('.zip')]
-    return version
 
 
-def extract_file(release_archive, zipinfo, extract_path):
-    extracted_file_path = release_archive.extract(
-        zipinfo.filename, extract_path
-    )
-    file_mode = zipinfo.external_attr >> 16
-    chmod(extracted_file_path, file_mode)
+def _remove_if_exists(filepath):
+    try:
+        remove(filepath)
+    except FileNotFoundError:
+        pass
 
 
-def download_release(boto_session, release_bucket, key):
-    s3_resource = boto_session.resource('s3')
-    f = BytesIO()
-    s3_object = s3_resource.Object(release_bucket, key)
-    s3_object.download_fileobj(f)
-    f.seek(0)
-    return ZipFile(f)
+@contextmanager
+def download_release(boto_session, release_bucket, key, region_name=None):
+    download_path = path.join(
+        cache_directory(DOWNLOAD_CACHE_NAME),
+        sha256(f'{release_bucket}/{key}'.encode('utf-8')).hexdigest() + '.zip',
+    )
+    with file_lock(f'{download_path}.lock'):
+        logger.debug(f'Downloading s3://{release_bucket}/{key}')
+        download_file(
+            clients.client(boto_session, 's3', region_name=region_name),
+            release_bucket, key, download_path,
+        )
+        release_archive = ZipFile(download_path)
+        try:
+            yield release_archive
+        finally:
+            release_archive.close()
+            _remove_if_exists(download_path)
 
 
-def format_release_key(team_name, component_name, version):
+def format_release_key(team_name, component_name, version, extension='.zip'):
     return (
         f'{format_release_key_prefix(team_name, component_name)}'
-        f'{version}.zip'
+        f'{version}{extension}'
     )
 
 
@@ -92,10 +227,10 @@ def format_release_key_prefix(team_name, component_name):
     return f'{team_name}/{component_name}/{component_name}-'
 
 
-def format_release_key_classic(component_name, version):
+def format_release_key_classic(component_name, version, extension='.zip'):
     return (
         f'{format_release_key_prefix_classic(component_name)}'
-        f'{version}.zip'
+        f'{version}{extension}'
     )
 
 
@@ -103,24 +238,75 @@ def format_release_key_prefix_classic(component_name):
     return f'{component_name}/{component_name}-'
 
 
-def _copy_platform_config_files(source_dir, dest_dir):
-    makedirs(dest_dir, exist_ok=True)
-    for config in listdir(source_dir):
-        source = os.path.join(source_dir, config)
-        dest = os.path.join(dest_dir, config)
-        if search(r'\.json$', source) and isfile(source):
-            copyfile(source, dest)
+# The latest release of each component is recorded in a small object next to
+# its releases, outside the release key prefix so that it is never listed as
+# a release itself.
+def format_latest_release_key(team_name, component_name):
+    return f'{team_name}/{component_name}/latest.json'
+
+
+def format_latest_release_key_classic(component_name):
+    return f'{component_name}/latest.json'
+
+
+# Content addressed releases store each file once, as a blob named by its
+# hash, and a manifest for each version listing the files in it.
+def format_blob_key_prefix(team_name, component_name):
+    return f'{team_name}/{component_name}/blobs/'
 
 
-def _copy_platform_config(source_dir, dest_dir):
-    for item in listdir(source_dir):
-        if not match(r'^\w+$', item):
-            continue
-        source = os.path.join(source_dir, item)
-        if not isdir(source):
-            continue
-        dest = os.path.join(dest_dir, item)
-        _copy_platform_config_files(source, dest)
+def format_blob_key_prefix_classic(component_name):
+    return f'{component_name}/blobs/'
+
+
+def _release_keys(account_scheme, team_name, component_name, version):
+    """The release archive key, release manifest key and blob key prefix."""
+    if account_scheme.classic_metadata_handling:
+        return (
+            format_release_key_classic(component_name, version),
+            format_release_key_classic(
+                component_name, version, MANIFEST_EXTENSION,
+            ),
+            format_blob_key_prefix_classic(component_name),
+        )
+    return (
+        format_release_key(team_name, component_name, version),
+        format_release_key(
+            team_name, component_name, version, MANIFEST_EXTENSION,
+        ),
+        format_blob_key_prefix(team_name, component_name),
+    )
+
+
+def _platform_config_files(platform_config_paths, account_regions):
+    # Later platform config paths take precedence over earlier ones.
+    files = {}
+    for platform_config_path in platform_config_paths:
+        for alias, region in account_regions:
+            source = os.path.join(
+                platform_config_path, alias, f'{region}.json',
+            )
+            if isfile(source):
+                files[(alias, region)] = source
+    return files
+
+
+def _copy_platform_config(
+    platform_config_paths, dest_dir, account_regions, linker,
+):
+    """Add the platform config for each account and region a deploy of the
+    release can use, rather than every file under the platform config
+    paths."""
+    files = _platform_config_files(platform_config_paths, account_regions)
+    for (alias, region), source in sorted(files.items()):
+        makedirs(os.path.join(dest_dir, alias), exist_ok=True)
+        linker.link_file(
+            source, os.path.join(dest_dir, alias, f'{region}.json'),
+        )
+    logger.debug(
+        f'Copied platform config for {len(files)} of '
+        f'{len(account_regions)} accounts and regions to {dest_dir}'
+    )
 
 
 class Release:
@@ -140,6 +326,9 @@ class Release:
         self.component_name = component_name
         self.account_scheme = account_scheme
         self.multi_region = multi_region
+        # Files are only read once staged, so the release tree is built
+        # from links to them where the filesystem allows.
+        self._linker = TreeLinker()
 
     def create(self, plugin):
         with TemporaryDirectory() as temp_dir:
@@ -160,6 +349,10 @@ class Release:
                     configuration
                     """.format(CONFIG_BASE_PATH))
             self._copy_platform_configs(base_dir)
+            logger.debug(
+                f'Staged release files, linking {self._linker.bytes_linked} '
+                f'bytes and copying {self._linker.bytes_copied} bytes'
+            )
 
             extra_data = plugin.create()
 
@@ -169,12 +362,18 @@ class Release:
 
             self._add_account_scheme(base_dir)
 
-            release_archive = make_archive(
-                base_dir, 'zip', temp_dir,
-                '{}-{}'.format(self.component_name, self.version),
-            )
-
-            self._upload_archive(release_archive)
+            if self.account_scheme.release_storage == \
+                    RELEASE_STORAGE_CONTENT_ADDRESSED:
+                manifest = self._upload_tree(temp_dir)
+                self._replicate(partial(self._copy_tree, manifest))
+            else:
+                release_archive = make_archive(
+                    base_dir, 'zip', temp_dir,
+                    '{}-{}'.format(self.component_name, self.version),
+                )
+                self._upload_archive(release_archive)
+                self._replicate(self._copy_archive)
+            self._update_latest_release_pointer()
 
     def _add_account_scheme(self, base_dir):
         with open(path.join(base_dir, ACCOUNT_SCHEME_FILE), 'w') as f:
@@ -203,49 +402,145 @@ class Release:
         mkdir(base_dir)
         return base_dir
 
-    def _upload_archive(self, release_archive):
-        s3_resource = self.boto_session.resource('s3')
+    @property
+    def _release_keys(self):
+        return _release_keys(
+            self.account_scheme, self._team, self.component_name,
+            self.version,
+        )
+
+    @property
+    def _release_key(self):
+        archive_key, manifest_key, _ = self._release_keys
+        if self.account_scheme.release_storage == \
+                RELEASE_STORAGE_CONTENT_ADDRESSED:
+            return manifest_key
+        return archive_key
+
+    @property
+    def _latest_release_key(self):
         if self.account_scheme.classic_metadata_handling:
-            release_key = format_release_key_classic(
-                self.component_name, self.version,
-            )
-        else:
-            release_key = format_release_key(
-                self._team, self.component_name, self.version,
+            return format_latest_release_key_classic(self.component_name)
+        return format_latest_release_key(self._team, self.component_name)
+
+    def _update_latest_release_pointer(self):
+        clients.client(self.boto_session, 's3').put_object(
+            Bucket=self._release_bucket,
+            Key=self._latest_release_key,
+            Body=json.dumps({
+                'version': self.version,
+                'key': self._release_key,
+            }).encode('utf-8'),
+            ContentType='application/json',
+        )
+
+    def _upload_tree(self, temp_dir):
+        _, manifest_key, blob_prefix = self._release_keys
+        manifest, blobs = build_manifest(
+            temp_dir, '{}-{}'.format(self.component_name, self.version), {
+                'cdflow_image_digest': os.environ['CDFLOW_IMAGE_DIGEST'],
+            },
+        )
+        upload_tree(
+            clients.client(self.boto_session, 's3'), self._release_bucket,
+            blob_prefix, manifest_key, manifest, blobs,
+            zip_patch.get_compression_level(),
+        )
+        return manifest
+
+    def _copy_tree(self, manifest, s3_client, bucket):
+        _, manifest_key, blob_prefix = self._release_keys
+        copy_tree(
+            self._release_bucket, s3_client, bucket, blob_prefix,
+            manifest_key, manifest,
+        )
+
+    def _copy_archive(self, s3_client, bucket):
+        # Archives large enough to be copied in parts would otherwise lose
+        # their image digest.
+        s3_client.copy(
+            {'Bucket': self._release_bucket, 'Key': self._release_key},
+            bucket,
+            self._release_key,
+            ExtraArgs={
+                'Metadata': self._archive_metadata(),
+                'MetadataDirective': 'REPLACE',
+            },
+            SourceClient=clients.client(self.boto_session, 's3'),
+            Config=transfer_config(),
+        )
+
+    def _replicate(self, copy):
+        # Regional release buckets are filled by server-side copies from the
+        # release bucket, before the release is recorded as the latest.
+        buckets = self.account_scheme.release_replica_buckets
+
+        def replicate(region):
+            logger.info('Copying {} to s3 bucket ({} in {})'.format(
+                self._release_key, buckets[region], region,
+            ))
+            copy(
+                clients.client(self.boto_session, 's3', region_name=region),
+                buckets[region],
             )
+
+        if not buckets:
+            return
+        with ThreadPoolExecutor(max_workers=len(buckets)) as executor:
+            for _ in executor.map(replicate, sorted(buckets)):
+                pass
+
+    def _archive_metadata(self):
+        return {'cdflow_image_digest': os.environ['CDFLOW_IMAGE_DIGEST']}
+
+    def _upload_archive(self, release_archive):
+        s3_resource = clients.resource(self.boto_session, 's3')
         s3_object = s3_resource.Object(
             self._release_bucket,
-            release_key,
-        )
-        s3_object.upload_file(
-            release_archive,
-            ExtraArgs={'Metadata': {
-                'cdflow_image_digest': os.environ['CDFLOW_IMAGE_DIGEST'],
-            }},
+            self._release_key,
         )
+        with TransferLog(
+            f'Uploaded s3://{self._release_bucket}/{self._release_key}',
+        ) as log:
+            s3_object.upload_file(
+                release_archive,
+                ExtraArgs={'Metadata': self._archive_metadata()},
+                Config=transfer_config(),
+                Callback=log,
+            )
 
     def _run_terraform_init(self, base_dir, infra_dir):
-        logger.debug(
-            'Getting Terraform modules defined in {}'.format(infra_dir)
-        )
-        check_call([
-            TERRAFORM_BINARY, 'init', infra_dir
-        ], cwd=base_dir)
+        def run_init():
+            logger.debug(
+                'Getting Terraform modules defined in {}'.format(infra_dir)
+            )
+            with plugin_cache.initialising(base_dir):
+                check_call([
+                    TERRAFORM_BINARY, 'init', infra_dir
+                ], cwd=base_dir)
+
+        if terraform_cache.is_enabled():
+            terraform_cache.TerraformInitCache.create().init(
+                base_dir, infra_dir, run_init,
+            )
+        else:
+            run_init()
 
     def _copy_platform_configs(self, base_dir):
         path_in_release = '{}/{}'.format(base_dir, PLATFORM_CONFIG_BASE_PATH)
-        for platform_config_path in self._platform_config_paths:
-            logger.debug('Copying {} to {}'.format(
-                platform_config_path, path_in_release
-            ))
-            _copy_platform_config(platform_config_path, path_in_release)
+        _copy_platform_config(
+            self._platform_config_paths, path_in_release,
+            self.account_scheme.deployable_account_regions, self._linker,
+        )
 
     def _copy_app_config_files(self, base_dir):
         path_in_release = '{}/{}'.format(base_dir, CONFIG_BASE_PATH)
         logger.debug('Copying {} to {}'.format(
             CONFIG_BASE_PATH, path_in_release
         ))
-        copytree(CONFIG_BASE_PATH, path_in_release)
+        self._linker.link_tree(
+            CONFIG_BASE_PATH, path_in_release, follow_symlinks=True,
+        )
 
     def _copy_infra_files(self, base_dir):
         path_in_release = '{}/{}'.format(
@@ -254,4 +549,7 @@ class Release:
         logger.debug('Copying {} to {}'.format(
             INFRASTRUCTURE_DEFINITIONS_PATH, path_in_release
         ))
-        copytree(INFRASTRUCTURE_DEFINITIONS_PATH, path_in_release)
+        self._linker.link_tree(
+            INFRASTRUCTURE_DEFINITIONS_PATH, path_in_release,
+            follow_symlinks=True,
+        )
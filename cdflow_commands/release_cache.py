@@ -0,0 +1,53 @@
+from os import path
+
+from cdflow_commands.cache import cache_directory
+from cdflow_commands.link import LINK_METHODS
+from cdflow_commands.logger import logger
+from cdflow_commands.tree_cache import TreeCache, entry_name
+
+CACHE_NAME = 'releases'
+DEFAULT_MAX_SIZE_MB = 2048
+
+_max_size_mb = DEFAULT_MAX_SIZE_MB
+
+
+def set_max_size_mb(max_size_mb):
+    global _max_size_mb
+    _max_size_mb = max_size_mb
+
+
+def is_enabled():
+    return _max_size_mb > 0
+
+
+def must_copy(relative_path):
+    # terraform rewrites the files at the top of .terraform (backend config,
+    # selected workspace) in place, which must not reach the cached copy.
+    return path.dirname(relative_path) == '.terraform'
+
+
+class ReleaseCache:
+    """Extracted releases, keyed by release key and S3 ETag."""
+
+    def __init__(self, directory, max_size):
+        self._cache = TreeCache(directory, max_size, must_copy=must_copy)
+
+    @classmethod
+    def create(cls):
+        return cls(cache_directory(CACHE_NAME), _max_size_mb * 1024 * 1024)
+
+    def materialise(
+        self, release_key, etag, destination, populate, methods=LINK_METHODS,
+    ):
+        """Link the release into destination, calling populate(directory)
+        to extract it into the cache first if it isn't cached."""
+        hit = self._cache.materialise(
+            entry_name(release_key, etag), destination, populate,
+            {'release_key': release_key, 'etag': etag}, methods,
+        )
+        if hit:
+            logger.debug(f'Release {release_key} found in release cache')
+        self.evict()
+
+    def evict(self):
+        self._cache.evict()
@@ -1,6 +1,7 @@
 import credstash
 from botocore.exceptions import ClientError
 
+from cdflow_commands import clients
 from cdflow_commands.logger import logger
 
 
@@ -15,20 +16,32 @@ def get_secrets(env_name, team, component_name, boto_session):
     prefix = 'deploy.{}.{}.'.format(env_name, component_name)
     table_name = 'credstash-{}'.format(team)
 
+    secret_names = _component_secrets_for_environment(
+        table_name,
+        boto_session.region_name,
+        prefix,
+        aws_credentials
+    )
+    if not secret_names:
+        return {}
+
+    dynamodb = clients.resource(
+        boto_session, 'dynamodb', region_name=boto_session.region_name,
+    )
+    kms = clients.client(
+        boto_session, 'kms', region_name=boto_session.region_name,
+    )
+
     return {
         name[len(prefix):]: credstash.getSecret(
             name,
             table=table_name,
             region=boto_session.region_name,
+            dynamodb=dynamodb,
+            kms=kms,
             **aws_credentials
         )
-        for name
-        in _component_secrets_for_environment(
-            table_name,
-            boto_session.region_name,
-            prefix,
-            aws_credentials
-        )
+        for name in secret_names
     }
 
 
@@ -1,4 +1,5 @@
 import atexit
+import os
 from hashlib import sha1
 from os import unlink
 from os.path import join
@@ -7,11 +8,14 @@ from textwrap import dedent
 
 from botocore.exceptions import ClientError
 
-from cdflow_commands.constants import TERRAFORM_BINARY
+from cdflow_commands import clients, plugin_cache
+from cdflow_commands.constants import (
+    TERRAFORM_BINARY, TERRAFORM_WORKSPACE_ENV_VAR,
+)
 from cdflow_commands.config import assume_role
 from cdflow_commands.exceptions import CDFlowError
 from cdflow_commands.logger import logger
-from cdflow_commands.process import check_call, check_output
+from cdflow_commands.process import check_call
 
 TFSTATE_NAME_PREFIX = 'cdflow-tfstate'
 TFSTATE_TAG_NAME = 'is-cdflow-tfstate-bucket'
@@ -33,6 +37,9 @@ def remove_file(filepath):
 
 class TerraformStateClassic:
 
+    # State is kept per environment in its own key, not in workspaces.
+    workspace = None
+
     def __init__(
         self,
         boto_session,
@@ -97,22 +104,26 @@ class TerraformStateClassic:
         )
 
         credentials = self.boto_session.get_credentials()
-        check_call(
-            [
-                TERRAFORM_BINARY, 'init',
-                f'-get={"true" if get_terraform_modules else "false"}',
-                f'-get-plugins={"true" if get_terraform_modules else "false"}',
-                f'-backend-config=bucket={self.bucket}',
-                f'-backend-config=region={self.boto_session.region_name}',
-                f'-backend-config=key={self.state_file_key}',
-                f'-backend-config=dynamodb_table={self.dynamodb_table}',
-                f'-backend-config=access_key={credentials.access_key}',
-                f'-backend-config=secret_key={credentials.secret_key}',
-                f'-backend-config=token={credentials.token}',
-                self.working_directory,
-            ],
-            cwd=self.base_directory,
-        )
+        with plugin_cache.initialising(
+            self.base_directory, get_terraform_modules,
+        ):
+            check_call(
+                [
+                    TERRAFORM_BINARY, 'init',
+                    f'-get={"true" if get_terraform_modules else "false"}',
+                    '-get-plugins='
+                    f'{"true" if get_terraform_modules else "false"}',
+                    f'-backend-config=bucket={self.bucket}',
+                    f'-backend-config=region={self.boto_session.region_name}',
+                    f'-backend-config=key={self.state_file_key}',
+                    f'-backend-config=dynamodb_table={self.dynamodb_table}',
+                    f'-backend-config=access_key={credentials.access_key}',
+                    f'-backend-config=secret_key={credentials.secret_key}',
+                    f'-backend-config=token={credentials.token}',
+                    self.working_directory,
+                ],
+                cwd=self.base_directory,
+            )
 
 
 class TerraformState:
@@ -159,6 +170,19 @@ class TerraformState:
     def workspace_key_prefix(self):
         return join(self.team_name, self.component_name)
 
+    @property
+    def workspace(self):
+        return self.environment_name
+
+    @property
+    def workspace_state_key(self):
+        # Where the S3 backend keeps the state of a workspace other than
+        # the default one.
+        return join(
+            self.workspace_key_prefix, self.workspace,
+            self.tfstate_filename,
+        )
+
     def write_backend_config(self, backend_file):
         logger.debug(f'Writing backend config to {backend_file.name}')
         backend_file.write(dedent('''
@@ -172,7 +196,16 @@ class TerraformState:
         )
         atexit.register(remove_file, backend_file.name)
 
-    def terraform_init(self, get=False):
+    def _terraform_env(self, workspace=None):
+        env = {
+            name: value for name, value in os.environ.items()
+            if name != TERRAFORM_WORKSPACE_ENV_VAR
+        }
+        if workspace is not None:
+            env[TERRAFORM_WORKSPACE_ENV_VAR] = workspace
+        return env
+
+    def terraform_init(self, get=False, workspace=None):
         credentials = self.boto_session.get_credentials()
         logger.debug(
             f'Initialising in {self.boto_session.region_name} '
@@ -181,58 +214,50 @@ class TerraformState:
             f'tfstate file: {self.tfstate_filename}, '
             f'dynamodb table: {self.dynamodb_table}'
         )
-        check_call(
-            [
-                TERRAFORM_BINARY, 'init',
-                f'-get={"true" if get else "false"}',
-                f'-get-plugins={"true" if get else "false"}',
-                f'-backend-config=bucket={self.bucket}',
-                f'-backend-config=region={self.boto_session.region_name}',
-                f'-backend-config=key={self.tfstate_filename}',
-                (
-                    '-backend-config=workspace_key_prefix='
-                    f'{self.workspace_key_prefix}'
-                ),
-                f'-backend-config=dynamodb_table={self.dynamodb_table}',
-                f'-backend-config=access_key={credentials.access_key}',
-                f'-backend-config=secret_key={credentials.secret_key}',
-                f'-backend-config=token={credentials.token}',
-                self.working_directory,
-            ],
-            cwd=self.base_directory,
-        )
+        with plugin_cache.initialising(self.base_directory, get):
+            check_call(
+                [
+                    TERRAFORM_BINARY, 'init',
+                    f'-get={"true" if get else "false"}',
+                    f'-get-plugins={"true" if get else "false"}',
+                    f'-backend-config=bucket={self.bucket}',
+                    f'-backend-config=region={self.boto_session.region_name}',
+                    f'-backend-config=key={self.tfstate_filename}',
+                    (
+                        '-backend-config=workspace_key_prefix='
+                        f'{self.workspace_key_prefix}'
+                    ),
+                    f'-backend-config=dynamodb_table={self.dynamodb_table}',
+                    f'-backend-config=access_key={credentials.access_key}',
+                    f'-backend-config=secret_key={credentials.secret_key}',
+                    f'-backend-config=token={credentials.token}',
+                    self.working_directory,
+                ],
+                cwd=self.base_directory,
+                env=self._terraform_env(workspace),
+            )
 
     def workspace_exists(self):
-        workspace_data = check_output(
-            [
-                TERRAFORM_BINARY, 'workspace', 'list', self.working_directory,
-            ],
-            cwd=self.base_directory,
+        # The S3 backend lists workspaces from the keys under
+        # workspace_key_prefix, so they're looked up directly rather than
+        # with `terraform workspace list`.
+        response = clients.client(self.boto_session, 's3').list_objects_v2(
+            Bucket=self.bucket, Prefix=self.workspace_state_key,
         )
-        existing_workspaces = {
-            w.strip() for w in workspace_data.decode('utf-8').split('\n')
-        }
-
-        return self.environment_name in existing_workspaces
-
-    def terraform_new_workspace(self):
-        check_call(
-            [
-                TERRAFORM_BINARY, 'workspace',
-                'new', self.environment_name,
-                self.working_directory,
-            ],
-            cwd=self.base_directory,
+        return any(
+            item['Key'] == self.workspace_state_key
+            for item in response.get('Contents', [])
         )
 
-    def terraform_select_workspace(self):
+    def terraform_new_workspace(self):
         check_call(
             [
                 TERRAFORM_BINARY, 'workspace',
-                'select', self.environment_name,
+                'new', self.workspace,
                 self.working_directory,
             ],
             cwd=self.base_directory,
+            env=self._terraform_env(),
         )
 
     def init(self, get_terraform_modules=False):
@@ -242,14 +267,14 @@ class TerraformState:
         ) as backend_file:
             self.write_backend_config(backend_file)
 
-        self.terraform_init(get_terraform_modules)
-
         if self.workspace_exists():
             logger.debug(
-                f'Workspace exists, selecting {self.environment_name}'
+                f'Workspace exists, selecting {self.environment_name} with '
+                f'{TERRAFORM_WORKSPACE_ENV_VAR}'
             )
-            self.terraform_select_workspace()
+            self.terraform_init(get_terraform_modules, self.workspace)
         else:
+            self.terraform_init(get_terraform_modules)
             logger.debug(
                 f'Creating new workspace {self.environment_name}'
             )
@@ -257,7 +282,7 @@ class TerraformState:
 
 
 def get_bucket_prefixes(session, bucket_name):
-    client = session.client('s3')
+    client = clients.client(session, 's3')
     paginator = client.get_paginator('list_objects_v2')
     result = paginator.paginate(Bucket=bucket_name, Delimiter='/')
     return [prefix['Prefix'] for prefix in result.search('CommonPrefixes')]
@@ -287,7 +312,7 @@ def migrate_state(
     release_account_session = assume_role(
         root_session, account_scheme.release_account,
     )
-    release_s3 = release_account_session.resource('s3')
+    release_s3 = clients.resource(release_account_session, 's3')
 
     for account in old_scheme.accounts:
         logger.debug(f'Looking for state in account {account.alias}')
@@ -296,7 +321,7 @@ def migrate_state(
         prefixes = get_bucket_prefixes(session, state_bucket)
         logger.debug(f'State bucket {state_bucket} has prefixes: {prefixes}')
 
-        s3 = session.resource('s3')
+        s3 = clients.resource(session, 's3')
 
         for env in [p.strip('/') for p in prefixes]:
             migrated_flag = release_s3.Object(
@@ -351,10 +376,7 @@ class LockTableFactory:
 
     @property
     def _client(self):
-        client = getattr(self, '_dbclient', None)
-        if not client:
-            client = self._dbclient = self._boto_session.client('dynamodb')
-        return client
+        return clients.client(self._boto_session, 'dynamodb')
 
     def _try_to_get_table(self):
         response = self._client.describe_table(
@@ -410,10 +432,7 @@ class S3BucketFactory:
 
     @property
     def _boto_s3_client(self):
-        client = getattr(self, '_s3client', None)
-        if not client:
-            client = self._s3client = self._boto_session.client('s3')
-        return client
+        return clients.client(self._boto_session, 's3')
 
     def get_bucket_name(self, bucket_name_prefix=TFSTATE_NAME_PREFIX):
 
@@ -0,0 +1,115 @@
+import os
+import platform
+from hashlib import sha256
+from os import path
+from shutil import copymode
+from subprocess import check_output
+
+from cdflow_commands.cache import cache_directory
+from cdflow_commands.constants import TERRAFORM_BINARY
+from cdflow_commands.link import TreeLinker
+from cdflow_commands.logger import logger
+from cdflow_commands.tree_cache import TreeCache, entry_name
+
+CACHE_NAME = 'terraform-init'
+DEFAULT_MAX_SIZE_MB = 2048
+
+_max_size_mb = DEFAULT_MAX_SIZE_MB
+
+
+def set_max_size_mb(max_size_mb):
+    global _max_size_mb
+    _max_size_mb = max_size_mb
+
+
+def is_enabled():
+    return _max_size_mb > 0
+
+
+def terraform_version():
+    return check_output(
+        [TERRAFORM_BINARY, 'version'],
+    ).decode('utf-8').splitlines()[0]
+
+
+def _relative_files(directory):
+    return {
+        path.relpath(path.join(dirpath, filename), directory)
+        for dirpath, dirnames, filenames in os.walk(directory)
+        for filename in filenames + [
+            d for d in dirnames if path.islink(path.join(dirpath, d))
+        ]
+    }
+
+
+def hash_sources(directory):
+    digest = sha256()
+    for relative_path in sorted(_relative_files(directory)):
+        if '.terraform' in relative_path.split(path.sep):
+            continue
+        digest.update(f'{relative_path}\0'.encode('utf-8'))
+        filepath = path.join(directory, relative_path)
+        if path.islink(filepath):
+            digest.update(os.readlink(filepath).encode('utf-8'))
+        else:
+            with open(filepath, 'rb') as f:
+                digest.update(sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def _link_new_files(base_dir, existing_files, destination):
+    linker = TreeLinker()
+    for relative_path in sorted(_relative_files(base_dir) - existing_files):
+        source = path.join(base_dir, relative_path)
+        target = path.join(destination, relative_path)
+        target_dir = path.dirname(target)
+        if not path.isdir(target_dir):
+            os.makedirs(target_dir)
+            copymode(path.dirname(source), target_dir)
+        # Symlinks into terraform's plugin cache are followed, so that the
+        # cached files don't depend on what that cache still holds.
+        if not path.exists(source):
+            os.symlink(os.readlink(source), target)
+        elif path.isdir(source):
+            linker.link_tree(path.realpath(source), target)
+        else:
+            linker.link_file(path.realpath(source), target, relative_path)
+
+
+class TerraformInitCache:
+    """The files terraform init adds to a release (modules, providers and
+    their lock file), keyed by the infrastructure sources they were
+    initialised from and the terraform version."""
+
+    def __init__(self, directory, max_size, version):
+        self._cache = TreeCache(directory, max_size)
+        self._version = version
+
+    @classmethod
+    def create(cls):
+        return cls(
+            cache_directory(CACHE_NAME), _max_size_mb * 1024 * 1024,
+            terraform_version(),
+        )
+
+    def init(self, base_dir, infra_dir, run_init):
+        """Seed base_dir with what run_init() added last time infra_dir had
+        the same contents, or call it and cache what it adds."""
+        sources_hash = hash_sources(path.join(base_dir, infra_dir))
+        entry = entry_name(
+            sources_hash, self._version, platform.system(),
+            platform.machine(),
+        )
+        if self._cache.link(entry, base_dir):
+            logger.debug(f'Terraform init for {infra_dir} found in cache')
+        else:
+            existing_files = _relative_files(base_dir)
+            run_init()
+            self._cache.store(
+                entry,
+                lambda directory: _link_new_files(
+                    base_dir, existing_files, directory,
+                ),
+                {'sources_hash': sources_hash, 'version': self._version},
+            )
+        self._cache.evict()
@@ -0,0 +1,90 @@
+from threading import Lock
+from time import perf_counter
+
+from boto3.s3.transfer import TransferConfig
+
+from cdflow_commands.exceptions import UserFacingError
+from cdflow_commands.logger import logger
+
+DEFAULT_PART_SIZE_MB = 8
+DEFAULT_MAX_CONCURRENCY = 10
+
+# Settings read from the s3-transfer section of the account scheme and
+# cdflow.yml, and the CLI options that override them.
+PART_SIZE_MB = 'part-size-mb'
+MAX_CONCURRENCY = 'max-concurrency'
+
+_settings = {
+    PART_SIZE_MB: DEFAULT_PART_SIZE_MB,
+    MAX_CONCURRENCY: DEFAULT_MAX_CONCURRENCY,
+}
+
+
+def _validate(name, value):
+    if type(value) is not int or value < 1:
+        raise UserFacingError(
+            f'S3 transfer setting {name} must be a positive number: {value}'
+        )
+    return value
+
+
+def configure(*sources):
+    """Set the S3 transfer settings from the defaults and each source in
+    turn, so that later sources take precedence."""
+    settings = {
+        PART_SIZE_MB: DEFAULT_PART_SIZE_MB,
+        MAX_CONCURRENCY: DEFAULT_MAX_CONCURRENCY,
+    }
+    for source in sources:
+        for name, value in (source or {}).items():
+            if name not in settings:
+                raise UserFacingError(f'Unknown S3 transfer setting: {name}')
+            if value is not None:
+                settings[name] = _validate(name, value)
+    _settings.update(settings)
+
+
+def part_size():
+    return _settings[PART_SIZE_MB] * 1024 * 1024
+
+
+def max_concurrency():
+    return _settings[MAX_CONCURRENCY]
+
+
+def transfer_config():
+    return TransferConfig(
+        multipart_threshold=part_size(),
+        multipart_chunksize=part_size(),
+        max_concurrency=max_concurrency(),
+        use_threads=max_concurrency() > 1,
+    )
+
+
+class TransferLog:
+    """Counts the bytes moved by a transfer, as a boto3 transfer callback
+    or called directly, and logs its throughput when it completes."""
+
+    def __init__(self, description):
+        self._description = description
+        self._lock = Lock()
+        self._start = None
+        self.bytes = 0
+
+    def __call__(self, bytes_amount):
+        with self._lock:
+            self.bytes += bytes_amount
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            return
+        seconds = perf_counter() - self._start
+        rate = self.bytes / seconds if seconds > 0 else 0
+        logger.debug(
+            f'{self._description}: {self.bytes} bytes in {seconds:.2f}s '
+            f'({rate / (1024 * 1024):.1f} MiB/s)'
+        )
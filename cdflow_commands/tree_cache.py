@@ -0,0 +1,120 @@
+import json
+import os
+from hashlib import sha256
+from os import path
+from shutil import rmtree
+
+from cdflow_commands.cache import file_lock, tree_size, write_atomic
+from cdflow_commands.link import LINK_METHODS, TreeLinker
+from cdflow_commands.logger import logger
+
+
+def entry_name(*parts):
+    return sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+class TreeCache:
+    """Directory trees that are linked into working directories on use.
+
+    Trees are cloned copy-on-write where the filesystem supports it and
+    hardlinked otherwise, and the least recently used entries are evicted
+    once the cache grows beyond max_size bytes. Each entry has a lock file:
+    readers hold a shared lock, while populating and evicting an entry takes
+    an exclusive one.
+    """
+
+    def __init__(self, directory, max_size, must_copy=None):
+        self._directory = directory
+        self._max_size = max_size
+        self._must_copy = must_copy
+
+    def _path(self, entry, extension=''):
+        return path.join(self._directory, f'{entry}{extension}')
+
+    def _link(self, entry, destination, methods):
+        os.utime(self._path(entry, '.json'))
+        linker = TreeLinker(methods, must_copy=self._must_copy)
+        linker.link_tree(self._path(entry), destination)
+        logger.debug(
+            f'Linked {linker.bytes_linked} bytes and copied '
+            f'{linker.bytes_copied} bytes from {self._directory}'
+        )
+
+    def _try_link(self, entry, destination, methods):
+        if not path.isfile(self._path(entry, '.json')):
+            return False
+        self._link(entry, destination, methods)
+        return True
+
+    def _populate(self, entry, populate, metadata):
+        temp_path = self._path(entry, f'.tmp-{os.getpid()}')
+        rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+        try:
+            populate(temp_path)
+            rmtree(self._path(entry), ignore_errors=True)
+            os.rename(temp_path, self._path(entry))
+        finally:
+            rmtree(temp_path, ignore_errors=True)
+        write_atomic(self._path(entry, '.json'), json.dumps(dict(
+            metadata, size=tree_size(self._path(entry)),
+        )).encode('utf-8'))
+
+    def link(self, entry, destination, methods=LINK_METHODS):
+        """Link a cached tree into destination, returning whether it was
+        cached."""
+        with file_lock(self._path(entry, '.lock'), shared=True):
+            return self._try_link(entry, destination, methods)
+
+    def materialise(
+        self, entry, destination, populate, metadata, methods=LINK_METHODS,
+    ):
+        """Link the tree into destination with the first of methods that
+        works, calling populate(directory) to create it in the cache first
+        if it isn't cached."""
+        if self.link(entry, destination, methods):
+            return True
+        with file_lock(self._path(entry, '.lock')):
+            if not self._try_link(entry, destination, methods):
+                self._populate(entry, populate, metadata)
+                self._link(entry, destination, methods)
+        return False
+
+    def store(self, entry, populate, metadata):
+        with file_lock(self._path(entry, '.lock')):
+            if not path.isfile(self._path(entry, '.json')):
+                self._populate(entry, populate, metadata)
+
+    def _entries_by_last_use(self):
+        entries = []
+        for filename in os.listdir(self._directory):
+            if not filename.endswith('.json'):
+                continue
+            metadata_path = path.join(self._directory, filename)
+            try:
+                with open(metadata_path) as f:
+                    size = json.load(f)['size']
+                last_used = path.getmtime(metadata_path)
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append((last_used, filename[:-len('.json')], size))
+        return sorted(entries)
+
+    def _evict_entry(self, entry):
+        try:
+            with file_lock(self._path(entry, '.lock'), blocking=False):
+                os.remove(self._path(entry, '.json'))
+                rmtree(self._path(entry), ignore_errors=True)
+        except BlockingIOError:
+            return False
+        logger.debug(f'Evicted {entry} from {self._directory}')
+        return True
+
+    def evict(self):
+        entries = self._entries_by_last_use()
+        total = sum(size for _, _, size in entries)
+        for _, entry, size in entries:
+            if total <= self._max_size:
+                break
+            if self._evict_entry(entry):
+                total -= size
@@ -1,11 +1,165 @@
 import os
 import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from shutil import copyfileobj
+from tempfile import SpooledTemporaryFile
+
+DEFAULT_COMPRESSION_LEVEL = 6
+MAX_WORKERS = os.cpu_count() or 1
+CHUNK_SIZE = 1024 * 1024
+# Compressed members larger than CHUNK_SIZE are spooled to temporary files
+# while they wait to be written, and compression runs ahead of writing by up
+# to this many bytes of input. Every member counts for at least
+# MIN_MEMBER_BYTES, so that empty files and directories are bounded too.
+MAX_PENDING_BYTES = 64 * CHUNK_SIZE
+MIN_MEMBER_BYTES = 4096
+
+# Formats that are already compressed, which DEFLATE can't shrink further.
+STORED_EXTENSIONS = {
+    '.7z', '.br', '.bz2', '.gif', '.gz', '.jar', '.jpeg', '.jpg', '.lz4',
+    '.mp4', '.png', '.tgz', '.war', '.webp', '.whl', '.woff', '.woff2',
+    '.xz', '.zip', '.zst',
+}
+
+_compression_level = DEFAULT_COMPRESSION_LEVEL
+
+
+def set_compression_level(compression_level):
+    global _compression_level
+    _compression_level = compression_level
+
+
+def get_compression_level():
+    return _compression_level
+
+
+def _walk(base_dir):
+    for dirpath, dirnames, filenames in os.walk(base_dir, followlinks=True):
+        for name in sorted(dirnames):
+            yield os.path.normpath(os.path.join(dirpath, name))
+        for name in filenames:
+            yield os.path.normpath(os.path.join(dirpath, name))
+
+
+def _archive_paths(base_dir):
+    path = os.path.normpath(base_dir)
+    if path != os.curdir:
+        yield path
+    for path in _walk(base_dir):
+        if os.path.isdir(path) or os.path.isfile(path):
+            yield path
+
+
+def _copy(source, destination, compressor=None):
+    """Copy source to destination in chunks, deflating it with compressor if
+    given, and return the CRC and size of source."""
+    crc = size = 0
+    for chunk in iter(partial(source.read, CHUNK_SIZE), b''):
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+        destination.write(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        destination.write(compressor.flush())
+    return crc, size
+
+
+def _compressor(path, compression_level):
+    if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+        return None
+    return zlib.compressobj(
+        compression_level, zlib.DEFLATED, -zlib.MAX_WBITS,
+    )
+
+
+def _compress_file(zinfo, path, compression_level, data):
+    compressor = _compressor(path, compression_level)
+    with open(path, 'rb') as f:
+        zinfo.CRC, zinfo.file_size = _copy(f, data, compressor)
+        if compressor and data.tell() < zinfo.file_size:
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+        elif compressor:
+            # It didn't shrink, so it's stored as it is instead.
+            f.seek(0)
+            data.seek(0)
+            data.truncate()
+            _copy(f, data)
+
+
+def _compress_member(path, compression_level):
+    zinfo = zipfile.ZipInfo.from_file(path, path)
+    zinfo.compress_type = zipfile.ZIP_STORED
+    data = SpooledTemporaryFile(max_size=CHUNK_SIZE)
+    if zinfo.is_dir():
+        zinfo.CRC = zinfo.file_size = 0
+    else:
+        _compress_file(zinfo, path, compression_level, data)
+    zinfo.compress_size = data.tell()
+    data.seek(0)
+    return zinfo, data
+
+
+def _write_compressed(zf, zinfo, data):
+    # ZipFile can only write members it compresses itself, so compressed
+    # members are appended directly and registered for the central
+    # directory written when the archive is closed.
+    zinfo.header_offset = zf.fp.tell()
+    zf.fp.write(zinfo.FileHeader())
+    with data:
+        copyfileobj(data, zf.fp, CHUNK_SIZE)
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
+    zf.start_dir = zf.fp.tell()
+    zf._didModify = True
+
+
+def _pending_bytes(path):
+    if os.path.isfile(path):
+        return max(os.path.getsize(path), MIN_MEMBER_BYTES)
+    return MIN_MEMBER_BYTES
+
+
+def _compressed_members(paths, compression_level):
+    # Compression runs ahead of writing by at most MAX_PENDING_BYTES (or one
+    # member larger than that), and members are written in order.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        pending = deque()
+        pending_bytes = 0
+        for path in paths:
+            member_bytes = _pending_bytes(path)
+            while pending and \
+                    pending_bytes + member_bytes > MAX_PENDING_BYTES:
+                written_bytes, member = pending.popleft()
+                pending_bytes -= written_bytes
+                yield member.result()
+            pending.append((member_bytes, executor.submit(
+                _compress_member, path, compression_level,
+            )))
+            pending_bytes += member_bytes
+        while pending:
+            yield pending.popleft()[1].result()
+
+
+def _write_archive(zip_filename, base_dir, logger):
+    with zipfile.ZipFile(zip_filename, "w") as zf:
+        for zinfo, data in _compressed_members(
+            _archive_paths(base_dir), _compression_level,
+        ):
+            _write_compressed(zf, zinfo, data)
+            if logger is not None:
+                logger.info("adding '%s'", zinfo.filename)
 
 
 def _make_zipfile(base_name, base_dir, verbose=0, dry_run=0, logger=None): # noqa C901
     """Create a zip file from all the files under 'base_dir'.
     The output zip file will be named 'base_name' + ".zip".  Returns the
     name of the output zip file.
+
+    Unlike shutil's version, symlinks to directories are followed, members
+    are compressed in parallel at the level set with set_compression_level,
+    and already-compressed files are stored as they are.
     """
 
     zip_filename = base_name + ".zip"
@@ -22,26 +176,6 @@ def _make_zipfile(base_name, base_dir, verbose=0, dry_run=0, logger=None): # noq
                     zip_filename, base_dir)
 
     if not dry_run:
-        with zipfile.ZipFile(zip_filename, "w",
-                             compression=zipfile.ZIP_DEFLATED) as zf:
-            path = os.path.normpath(base_dir)
-            if path != os.curdir:
-                zf.write(path, path)
-                if logger is not None:
-                    logger.info("adding '%s'", path)
-            for dirpath, dirnames, filenames in os.walk(
-                base_dir, followlinks=True
-            ):
-                for name in sorted(dirnames):
-                    path = os.path.normpath(os.path.join(dirpath, name))
-                    zf.write(path, path)
-                    if logger is not None:
-                        logger.info("adding '%s'", path)
-                for name in filenames:
-                    path = os.path.normpath(os.path.join(dirpath, name))
-                    if os.path.isfile(path):
-                        zf.write(path, path)
-                        if logger is not None:
-                            logger.info("adding '%s'", path)
+        _write_archive(zip_filename, base_dir, logger)
 
     return zip_filename
@@ -16,3 +16,5 @@ docker run \
         "$@"
 
 docker run --rm cdflow-commands.test flake8 --max-complexity=5
+
+docker run --rm cdflow-commands.test python -m benchmarks.import_time
@@ -1,4 +1,42 @@
+import os
+
 import hypothesis
 import hypothesis.database
+import pytest
+from mock import patch
+
+from cdflow_commands import plugin_cache, release_cache, terraform_cache
+from cdflow_commands.constants import CACHE_BASE_PATH_ENV_VAR
 
 hypothesis.settings(database=hypothesis.database.ExampleDatabase(':memory:'))
+
+
+@pytest.fixture(autouse=True)
+def isolated_environment():
+    # The CLI exports assumed role credentials and region to the environment
+    # for terraform, which must not leak into later tests.
+    with patch.dict(os.environ):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_BASE_PATH_ENV_VAR, str(tmp_path / 'cache'))
+
+
+@pytest.fixture(autouse=True)
+def release_cache_disabled(monkeypatch):
+    monkeypatch.setattr(release_cache, 'DEFAULT_MAX_SIZE_MB', 0)
+    monkeypatch.setattr(release_cache, '_max_size_mb', 0)
+
+
+@pytest.fixture(autouse=True)
+def terraform_cache_disabled(monkeypatch):
+    monkeypatch.setattr(terraform_cache, 'DEFAULT_MAX_SIZE_MB', 0)
+    monkeypatch.setattr(terraform_cache, '_max_size_mb', 0)
+
+
+@pytest.fixture(autouse=True)
+def plugin_cache_disabled(monkeypatch):
+    monkeypatch.setattr(plugin_cache, 'DEFAULT_MAX_SIZE_MB', 0)
+    monkeypatch.setattr(plugin_cache, '_max_size_mb', 0)
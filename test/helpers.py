@@ -0,0 +1,31 @@
+import os
+from stat import S_IMODE
+
+
+def write(filepath, content, mode=0o644):
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, 'wb' if isinstance(content, bytes) else 'w') as f:
+        f.write(content)
+    os.chmod(filepath, mode)
+
+
+def read(filepath):
+    with open(filepath) as f:
+        return f.read()
+
+
+def snapshot(directory):
+    """The mode and content of everything under directory, by relative
+    path, with None as the content of directories."""
+    tree = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for name in dirnames + filenames:
+            filepath = os.path.join(dirpath, name)
+            content = None
+            if not os.path.isdir(filepath):
+                with open(filepath, 'rb') as f:
+                    content = f.read()
+            tree[os.path.relpath(filepath, directory)] = (
+                S_IMODE(os.stat(filepath).st_mode), content,
+            )
+    return tree
@@ -3,6 +3,7 @@ import json
 from base64 import b64encode
 from string import ascii_letters, digits
 from subprocess import CalledProcessError
+from threading import Event
 
 from botocore.exceptions import ClientError
 from cdflow_commands.exceptions import UserFacingError
@@ -35,6 +36,24 @@ class TestRelease(unittest.TestCase):
             }]
         }
 
+    def _set_images_in_ecr(self, *commit_tags, versions=True):
+        # Images are in ECR under every version, unless versions is unset,
+        # but only under the given commit tags.
+        def batch_get_image(registryId, repositoryName, imageIds):
+            tag = imageIds[0]['imageTag']
+            if tag not in commit_tags and (
+                tag.startswith('commit-') or not versions
+            ):
+                return {'images': [], 'failures': [
+                    {'imageId': imageIds[0], 'failureCode': 'ImageNotFound'},
+                ]}
+            return {'images': [{
+                'imageManifest': '{"schemaVersion": 2}',
+                'imageManifestMediaType':
+                    'application/vnd.docker.distribution.manifest.v2+json',
+            }]}
+        self._ecr_client.batch_get_image.side_effect = batch_get_image
+
     def setUp(self):
         boto_session = Mock()
         self._ecr_client = Mock()
@@ -49,6 +68,8 @@ class TestRelease(unittest.TestCase):
 
         self._version = '1.2.3'
         self._release.version = self._version
+        self._release._commit = 'abc123'
+        self._set_images_in_ecr()
 
         self._region = 'dummy-region'
         self._account_id = 'dummy-account-id'
@@ -70,6 +91,7 @@ class TestRelease(unittest.TestCase):
             'terraform-backend-s3-dynamodb-table': 'tflocks-table'
         }, 'a-team')
 
+        self._account_scheme = account_scheme
         self._plugin = ReleasePlugin(self._release, account_scheme)
 
     @given(fixed_dictionaries({
@@ -205,7 +227,7 @@ class TestRelease(unittest.TestCase):
             alphabet=IDENTIFIER_ALPHABET, min_size=8, max_size=16
         )
     }))
-    def test_build_with_version_pushes_to_ecr_repo_with_latest_tag(
+    def test_build_with_version_tags_pushed_image_as_latest_in_ecr(
         self, fixtures
     ):
         # Given
@@ -239,18 +261,252 @@ class TestRelease(unittest.TestCase):
                 self._version
             )
 
-            latest_image_name = '{}.dkr.ecr.{}.amazonaws.com/{}:{}'.format(
-                self._account_id, self._region, self._component_name,
-                'latest'
-            )
-
             check_call.assert_any_call([
-                'docker', 'tag', image_name, latest_image_name
+                'docker', 'push', image_name
             ])
+            assert not any(
+                args[0][:2] == ['docker', 'tag']
+                for args, _ in check_call.call_args_list
+            )
 
-            check_call.assert_any_call([
-                'docker', 'push', latest_image_name
-            ])
+            self._ecr_client.batch_get_image.assert_called_with(
+                registryId=self._account_id,
+                repositoryName=self._component_name,
+                imageIds=[{'imageTag': self._version}],
+            )
+            self._ecr_client.put_image.assert_any_call(
+                registryId=self._account_id,
+                repositoryName=self._component_name,
+                imageManifest='{"schemaVersion": 2}',
+                imageManifestMediaType=(
+                    'application/vnd.docker.distribution.manifest.v2+json'
+                ),
+                imageTag='latest',
+            )
+
+    def test_build_cache_is_imported_and_exported_through_ecr(self):
+        # Given
+        plugin = ReleasePlugin(
+            self._release, self._account_scheme, build_cache=True,
+        )
+        image_repository = '{}.dkr.ecr.{}.amazonaws.com/{}'.format(
+            self._account_id, self._region, self._component_name,
+        )
+        cache = f'type=registry,ref={image_repository}:buildcache'
+
+        with patch('cdflow_commands.plugins.ecs.check_call') as check_call:
+            # When
+            plugin.create()
+
+        # Then
+        commands = [args[0] for args, _ in check_call.call_args_list]
+        build = [
+            'docker', 'buildx', 'build',
+            '--cache-from', cache,
+            '--cache-to',
+            f'{cache},mode=max,image-manifest=true,oci-mediatypes=true',
+            '--load',
+            '-t', f'{image_repository}:{self._version}', '.'
+        ]
+        assert build in commands
+        login = next(
+            command for command in commands if command[:2] == [
+                'docker', 'login',
+            ]
+        )
+        assert commands.index(login) < commands.index(build)
+
+    def test_build_cache_without_buildx_is_a_user_error(self):
+        # Given
+        plugin = ReleasePlugin(
+            self._release, self._account_scheme, build_cache=True,
+        )
+
+        def check_call(command, **kwargs):
+            if command[:3] == ['docker', 'buildx', 'version']:
+                raise CalledProcessError(1, command)
+
+        with patch(
+            'cdflow_commands.plugins.ecs.check_call', side_effect=check_call,
+        ) as mock_check_call:
+            # When / Then
+            with self.assertRaises(UserFacingError):
+                plugin.create()
+
+        commands = [args[0] for args, _ in mock_check_call.call_args_list]
+        assert commands == [['docker', 'buildx', 'version']]
+
+    def test_build_cache_without_docker_is_a_user_error(self):
+        # Given
+        plugin = ReleasePlugin(
+            self._release, self._account_scheme, build_cache=True,
+        )
+
+        with patch(
+            'cdflow_commands.plugins.ecs.check_call',
+            side_effect=FileNotFoundError('docker'),
+        ):
+            # When / Then
+            with self.assertRaises(UserFacingError):
+                plugin.create()
+
+    def test_build_cache_is_not_used_without_a_version(self):
+        # Given
+        self._release.version = None
+        plugin = ReleasePlugin(
+            self._release, self._account_scheme, build_cache=True,
+        )
+
+        with patch('cdflow_commands.plugins.ecs.check_call') as check_call:
+            # When
+            plugin.create()
+
+        # Then
+        check_call.assert_any_call([
+            'docker', 'build', '-t', '{}.dkr.ecr.{}.amazonaws.com/{}:dev'
+            .format(self._account_id, self._region, self._component_name),
+            '.',
+        ])
+        self._ecr_client.get_authorization_token.assert_not_called()
+
+    def test_ecr_is_prepared_while_the_image_builds(self):
+        # Given
+        logged_in = Event()
+
+        def check_call(command):
+            if command[:2] == ['docker', 'login']:
+                logged_in.set()
+            elif command[:2] == ['docker', 'build']:
+                # The build only finishes once ECR login has happened.
+                assert logged_in.wait(timeout=5)
+
+        with patch(
+            'cdflow_commands.plugins.ecs.check_call', side_effect=check_call,
+        ):
+            # When
+            self._plugin.create()
+
+        # Then
+        self._ecr_client.describe_repositories.assert_called_once()
+        self._ecr_client.put_image.assert_called()
+
+    def test_error_preparing_ecr_is_raised_after_the_build(self):
+        # Given
+        self._ecr_client.describe_repositories.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDeniedException'}},
+            'DescribeRepositories',
+        )
+
+        with patch('cdflow_commands.plugins.ecs.check_call') as check_call:
+            # When / Then
+            with self.assertRaises(ClientError):
+                self._plugin.create()
+
+        commands = [args[0] for args, _ in check_call.call_args_list]
+        assert any(command[:2] == ['docker', 'build'] for command in commands)
+        assert not any(
+            command[:2] == ['docker', 'push'] for command in commands
+        )
+
+    def test_image_for_commit_in_ecr_is_retagged_without_building(self):
+        # Given
+        self._set_images_in_ecr('commit-abc123')
+
+        with patch('cdflow_commands.plugins.ecs.check_call') as check_call:
+            # When
+            plugin_data = self._plugin.create()
+
+        # Then
+        check_call.assert_not_called()
+        assert plugin_data == {
+            'image_id': '{}.dkr.ecr.{}.amazonaws.com/{}:{}'.format(
+                self._account_id, self._region, self._component_name,
+                self._version,
+            ),
+        }
+        assert [
+            kwargs['imageTag']
+            for _, kwargs in self._ecr_client.put_image.call_args_list
+        ] == [self._version, 'latest']
+
+    @patch('cdflow_commands.plugins.ecs.path')
+    def test_image_for_commit_is_rebuilt_when_there_is_a_build_hook(
+        self, os_path,
+    ):
+        # Given
+        self._set_images_in_ecr('commit-abc123')
+        os_path.exists.side_effect = lambda path: path == './on-docker-build'
+        os_path.abspath.return_value = '/dummy/path/on-docker-build'
+
+        with patch('cdflow_commands.plugins.ecs.check_call') as check_call:
+            # When
+            self._plugin.create()
+
+        # Then
+        commands = [args[0] for args, _ in check_call.call_args_list]
+        assert any(command[:2] == ['docker', 'build'] for command in commands)
+        assert [
+            '/dummy/path/on-docker-build',
+            '{}.dkr.ecr.{}.amazonaws.com/{}:{}'.format(
+                self._account_id, self._region, self._component_name,
+                self._version,
+            ),
+        ] in commands
+
+    def test_built_image_is_tagged_with_commit(self):
+        with patch('cdflow_commands.plugins.ecs.check_call'):
+            # When
+            self._plugin.create()
+
+        # Then
+        assert [
+            kwargs['imageTag']
+            for _, kwargs in self._ecr_client.put_image.call_args_list
+        ] == ['latest', 'commit-abc123']
+
+    def test_commit_lookup_tolerates_missing_repository(self):
+        # Given
+        self._ecr_client.batch_get_image.side_effect = [
+            ClientError(
+                {'Error': {'Code': 'RepositoryNotFoundException'}},
+                'BatchGetImage',
+            ),
+            {'images': [{'imageManifest': '{}'}]},
+        ]
+
+        with patch('cdflow_commands.plugins.ecs.check_call') as check_call:
+            # When
+            self._plugin.create()
+
+        # Then
+        check_call.assert_any_call([
+            'docker', 'push', '{}.dkr.ecr.{}.amazonaws.com/{}:{}'.format(
+                self._account_id, self._region, self._component_name,
+                self._version,
+            ),
+        ])
+
+    def test_latest_tag_already_on_image_is_not_an_error(self):
+        # Given
+        self._ecr_client.put_image.side_effect = ClientError(
+            {'Error': {'Code': 'ImageAlreadyExistsException'}}, 'PutImage',
+        )
+
+        with patch('cdflow_commands.plugins.ecs.check_call'):
+            # When
+            self._plugin.create()
+
+        # Then
+        assert self._ecr_client.put_image.call_count == 2
+
+    def test_missing_pushed_image_is_a_user_error(self):
+        # Given
+        self._set_images_in_ecr(versions=False)
+
+        with patch('cdflow_commands.plugins.ecs.check_call'):
+            # When / Then
+            with self.assertRaises(UserFacingError):
+                self._plugin.create()
 
     @given(text(alphabet=IDENTIFIER_ALPHABET, min_size=8, max_size=16))
     def test_ecr_repo_created_when_it_does_not_exist(self, component_name):
@@ -1,17 +1,30 @@
 import unittest
 
-from mock import Mock, patch, MagicMock
+import boto3
+from botocore.exceptions import ClientError
+from mock import Mock, patch, MagicMock, ANY
+from moto import mock_s3
 
+from cdflow_commands import transfer
 from cdflow_commands.account import AccountScheme
 from cdflow_commands.plugins.aws_lambda import ReleasePlugin
 from cdflow_commands.release import Release
 
 
+def empty_bucket_s3_client():
+    s3_client = Mock()
+    s3_client.head_object.side_effect = ClientError(
+        {'Error': {'Code': '404'}}, 'HeadObject',
+    )
+    s3_client.get_paginator.return_value.paginate.return_value = []
+    return s3_client
+
+
 class TestLambdaReleasePlugin(unittest.TestCase):
 
     def setUp(self):
         boto_session = Mock()
-        self._ecr_client = Mock()
+        self._ecr_client = empty_bucket_s3_client()
         boto_session.client.return_value = self._ecr_client
         self._release = MagicMock(spec=Release)
         self._release.multi_region = False
@@ -52,10 +65,9 @@ class TestLambdaReleasePlugin(unittest.TestCase):
 
         self._plugin = ReleasePlugin(self._release, self._account_scheme)
 
-    @patch('cdflow_commands.plugins.aws_lambda.os')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
     def test_release_returns_release_data(
-        self, zip_file, mock_os
+        self, ZipStream
     ):
 
         plugin_data = self._plugin.create()
@@ -68,39 +80,35 @@ class TestLambdaReleasePlugin(unittest.TestCase):
             ),
         }
 
-    @patch('cdflow_commands.plugins.aws_lambda.os')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
-    def test_release_creates_zip_from_directory(self, zip_file, mock_os):
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
+    def test_release_zips_directory_as_it_is_uploaded(self, ZipStream):
         self._plugin.create()
-        zip_file.assert_called_once_with(
-            '{}.zip'.format(self._source_dir), 'w'
-        )
+        ZipStream.assert_called_once_with(self._source_dir, 6)
 
-    @patch('cdflow_commands.plugins.aws_lambda.os')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
     def test_release_pushes_to_s3(
-        self, zip_file, mock_os
+        self, ZipStream
     ):
-        boto_s3_client = Mock()
+        boto_s3_client = empty_bucket_s3_client()
         self._release.boto_session.client.return_value = boto_s3_client
         self._plugin.create()
-        boto_s3_client.upload_file.assert_called_once_with(
-            zip_file().__enter__().filename,
+        boto_s3_client.upload_fileobj.assert_called_once_with(
+            ZipStream.return_value,
             'dummy-lambda-bucket',
             '{}/{}/{}-{}.zip'.format(
                 self._release._team, self._component_name,
                 self._component_name, self._version,
-            )
+            ),
+            ExtraArgs=ANY, Config=ANY, Callback=ANY,
         )
 
-    @patch('cdflow_commands.plugins.aws_lambda.os')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
     def test_release_pushes_to_multiple_s3_regions(
-        self, zip_file, mock_os
+        self, ZipStream
     ):
         # Given
-        boto_s3_client_region1 = Mock()
-        boto_s3_client_region2 = Mock()
+        boto_s3_client_region1 = empty_bucket_s3_client()
+        boto_s3_client_region2 = empty_bucket_s3_client()
         self._release.boto_session.client.side_effect = \
             lambda service, region_name: boto_s3_client_region1 \
             if region_name == 'test-region1' else boto_s3_client_region2
@@ -127,35 +135,259 @@ class TestLambdaReleasePlugin(unittest.TestCase):
         self._release.boto_session.client.assert_any_call(
             's3', region_name='test-region2'
         )
-        boto_s3_client_region1.upload_file.assert_any_call(
-            zip_file().__enter__().filename,
+        boto_s3_client_region1.upload_fileobj.assert_any_call(
+            ZipStream.return_value,
             'dummy-lambda-bucket',
             '{}/{}/{}-{}.zip'.format(
                 self._release._team, self._component_name,
                 self._component_name, self._version,
-            )
+            ),
+            ExtraArgs=ANY, Config=ANY, Callback=ANY,
         )
-        boto_s3_client_region2.upload_file.assert_any_call(
-            zip_file().__enter__().filename,
+        key = '{}/{}/{}-{}.zip'.format(
+            self._release._team, self._component_name,
+            self._component_name, self._version,
+        )
+        boto_s3_client_region2.upload_fileobj.assert_not_called()
+        boto_s3_client_region2.copy.assert_called_once_with(
+            {'Bucket': 'dummy-lambda-bucket', 'Key': key},
             'dummy-lambda-bucket2',
-            '{}/{}/{}-{}.zip'.format(
-                self._release._team, self._component_name,
-                self._component_name, self._version,
+            key,
+            ExtraArgs={
+                'Metadata': {'cdflow_package_sha256': ANY},
+                'MetadataDirective': 'REPLACE',
+            },
+            SourceClient=boto_s3_client_region1,
+            Config=ANY,
+        )
+
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
+    def test_release_is_uploaded_to_default_region_and_copied(
+        self, ZipStream
+    ):
+        # Given
+        s3_clients = {
+            region: empty_bucket_s3_client()
+            for region in ('test-region1', 'test-region2', 'dummy-region')
+        }
+        self._release.boto_session.client.side_effect = \
+            lambda service, region_name: s3_clients[region_name]
+        self._release.multi_region = True
+        buckets = {
+            'test-region1': 'dummy-lambda-bucket',
+            'test-region2': 'dummy-lambda-bucket2',
+            'dummy-region': 'dummy-lambda-bucket3',
+        }
+        self._account_scheme.lambda_buckets = buckets
+
+        # When
+        plugin_data = ReleasePlugin(
+            self._release, self._account_scheme
+        ).create()
+
+        # Then
+        for region, bucket in buckets.items():
+            assert plugin_data[f's3_bucket.{region}'] == bucket
+        s3_clients['dummy-region'].upload_fileobj.assert_called_once_with(
+            ANY, 'dummy-lambda-bucket3', plugin_data['s3_key'],
+            ExtraArgs=ANY, Config=ANY, Callback=ANY,
+        )
+        for region in ('test-region1', 'test-region2'):
+            s3_clients[region].upload_fileobj.assert_not_called()
+            s3_clients[region].copy.assert_called_once_with(
+                {
+                    'Bucket': 'dummy-lambda-bucket3',
+                    'Key': plugin_data['s3_key'],
+                },
+                buckets[region],
+                plugin_data['s3_key'],
+                ExtraArgs={
+                    'Metadata': {'cdflow_package_sha256': ANY},
+                    'MetadataDirective': 'REPLACE',
+                },
+                SourceClient=s3_clients['dummy-region'],
+                Config=ANY,
             )
+
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
+    def test_release_closes_package_after_push(self, ZipStream):
+        self._plugin.create()
+        ZipStream.return_value.close.assert_called_once_with()
+
+    @patch('cdflow_commands.plugins.aws_lambda.package_hash')
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
+    def test_unchanged_package_is_copied_from_latest_version(
+        self, ZipStream, package_hash
+    ):
+        # Given
+        package_hash.return_value = 'hash'
+        previous_key = 'a-team/dummy-component/dummy-component-1.2.2.zip'
+        self._ecr_client.get_paginator.return_value.paginate.return_value = [
+            {'Contents': [
+                {'Key': previous_key, 'LastModified': 2},
+                {
+                    'Key': 'a-team/dummy-component/dummy-component-1.2.1.zip',
+                    'LastModified': 1,
+                },
+            ]},
+        ]
+        self._ecr_client.head_object.side_effect = lambda Bucket, Key: (
+            {'Metadata': {'cdflow_package_sha256': 'hash'}}
+            if Key == previous_key else {'Metadata': {}}
+        )
+
+        # When
+        plugin_data = self._plugin.create()
+
+        # Then
+        self._ecr_client.upload_fileobj.assert_not_called()
+        self._ecr_client.copy.assert_called_once_with(
+            {'Bucket': 'dummy-lambda-bucket', 'Key': previous_key},
+            'dummy-lambda-bucket', plugin_data['s3_key'],
+            ExtraArgs={
+                'Metadata': {'cdflow_package_sha256': 'hash'},
+                'MetadataDirective': 'REPLACE',
+            },
+            Config=ANY,
         )
 
-    @patch('cdflow_commands.plugins.aws_lambda.os')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
-    def test_release_cleans_up_zip_after_push(self, zip_file, mock_os):
+    @patch('cdflow_commands.plugins.aws_lambda.package_hash')
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
+    def test_package_already_uploaded_is_not_uploaded_again(
+        self, ZipStream, package_hash
+    ):
+        # Given
+        package_hash.return_value = 'hash'
+        self._ecr_client.head_object.side_effect = None
+        self._ecr_client.head_object.return_value = {
+            'Metadata': {'cdflow_package_sha256': 'hash'},
+        }
+
+        # When
         self._plugin.create()
-        mock_os.remove.assert_called_once_with(zip_file().__enter__().filename)
+
+        # Then
+        self._ecr_client.upload_fileobj.assert_not_called()
+        self._ecr_client.copy.assert_not_called()
+
+    @patch('cdflow_commands.plugins.aws_lambda.package_hash')
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
+    def test_changed_package_is_uploaded_with_its_hash(
+        self, ZipStream, package_hash
+    ):
+        # Given
+        package_hash.return_value = 'hash'
+
+        # When
+        plugin_data = self._plugin.create()
+
+        # Then
+        self._ecr_client.upload_fileobj.assert_called_once_with(
+            ZipStream.return_value, 'dummy-lambda-bucket',
+            plugin_data['s3_key'],
+            ExtraArgs={'Metadata': {'cdflow_package_sha256': 'hash'}},
+            Config=ANY, Callback=ANY,
+        )
+
+
+@patch.object(transfer, 'part_size', lambda: 5 * 1024 * 1024)
+@patch('cdflow_commands.plugins.aws_lambda.package_hash')
+class TestLambdaReleasePluginLargePackages(unittest.TestCase):
+
+    def setUp(self):
+        self._mock_s3 = mock_s3()
+        self._mock_s3.start()
+        self._release = MagicMock(spec=Release)
+        self._release.multi_region = False
+        self._release._team = 'a-team'
+        self._release.component_name = 'dummy-component'
+        self._release.version = '1.2.3'
+        self._release.boto_session = boto3.session.Session(
+            region_name='us-east-1',
+        )
+        self._s3_client = self._release.boto_session.client('s3')
+        self._account_scheme = AccountScheme.create({
+            'accounts': {'dummy': {'id': 'dummy-account-id', 'role': 'dummy'}},
+            'release-account': 'dummy',
+            'default-region': 'us-east-1',
+            'release-bucket': 'dummy',
+            'lambda-bucket': 'dummy-lambda-bucket',
+            'environments': {'live': 'dummy'},
+            'terraform-backend-s3-bucket': 'tfstate-bucket',
+            'terraform-backend-s3-dynamodb-table': 'tflocks-table',
+        }, 'a-team')
+
+    def tearDown(self):
+        self._mock_s3.stop()
+
+    def put_package(self, bucket, key, package_hash):
+        self._s3_client.put_object(
+            Bucket=bucket, Key=key, Body=b'0' * (6 * 1024 * 1024),
+            Metadata={'cdflow_package_sha256': package_hash},
+        )
+
+    def stored_hash(self, bucket, key):
+        return self._s3_client.head_object(
+            Bucket=bucket, Key=key,
+        )['Metadata'].get('cdflow_package_sha256')
+
+    def test_package_copied_in_parts_keeps_its_hash(self, package_hash):
+        # Given
+        package_hash.return_value = 'hash'
+        self._s3_client.create_bucket(Bucket='dummy-lambda-bucket')
+        self.put_package(
+            'dummy-lambda-bucket',
+            'a-team/dummy-component/dummy-component-1.2.2.zip', 'hash',
+        )
+
+        # When
+        plugin_data = ReleasePlugin(
+            self._release, self._account_scheme,
+        ).create()
+
+        # Then
+        assert self.stored_hash(
+            'dummy-lambda-bucket', plugin_data['s3_key'],
+        ) == 'hash'
+
+    def test_package_copied_to_regions_in_parts_keeps_its_hash(
+        self, package_hash,
+    ):
+        # Given
+        package_hash.return_value = 'hash'
+        self._release.multi_region = True
+        self._account_scheme.lambda_buckets = {
+            'us-east-1': 'dummy-lambda-bucket',
+            'eu-west-1': 'dummy-lambda-bucket2',
+        }
+        self._s3_client.create_bucket(Bucket='dummy-lambda-bucket')
+        self._release.boto_session.client(
+            's3', region_name='eu-west-1',
+        ).create_bucket(
+            Bucket='dummy-lambda-bucket2',
+            CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'},
+        )
+        self.put_package(
+            'dummy-lambda-bucket',
+            'a-team/dummy-component/dummy-component-1.2.3.zip', 'hash',
+        )
+
+        # When
+        plugin_data = ReleasePlugin(
+            self._release, self._account_scheme,
+        ).create()
+
+        # Then
+        assert self.stored_hash(
+            'dummy-lambda-bucket2', plugin_data['s3_key'],
+        ) == 'hash'
 
 
 class TestLambdaReleasePluginClassicMetadataHandling(unittest.TestCase):
 
     def setUp(self):
         boto_session = Mock()
-        self._ecr_client = Mock()
+        self._ecr_client = empty_bucket_s3_client()
         boto_session.client.return_value = self._ecr_client
         self._release = MagicMock(spec=Release)
         self._release.multi_region = False
@@ -195,10 +427,9 @@ class TestLambdaReleasePluginClassicMetadataHandling(unittest.TestCase):
 
         self._plugin = ReleasePlugin(self._release, self._account_scheme)
 
-    @patch('cdflow_commands.plugins.aws_lambda.os')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
     def test_release_returns_release_data(
-        self, zip_file, mock_os
+        self, ZipStream
     ):
 
         plugin_data = self._plugin.create()
@@ -210,38 +441,34 @@ class TestLambdaReleasePluginClassicMetadataHandling(unittest.TestCase):
             ),
         }
 
-    @patch('cdflow_commands.plugins.aws_lambda.os')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
-    def test_release_creates_zip_from_directory(self, zip_file, mock_os):
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
+    def test_release_zips_directory_as_it_is_uploaded(self, ZipStream):
         self._plugin.create()
-        zip_file.assert_called_once_with(
-            '{}.zip'.format(self._source_dir), 'w'
-        )
+        ZipStream.assert_called_once_with(self._source_dir, 6)
 
-    @patch('cdflow_commands.plugins.aws_lambda.os')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
     def test_release_pushes_to_s3(
-        self, zip_file, mock_os
+        self, ZipStream
     ):
-        boto_s3_client = Mock()
+        boto_s3_client = empty_bucket_s3_client()
         self._release.boto_session.client.return_value = boto_s3_client
         self._plugin.create()
-        boto_s3_client.upload_file.assert_called_once_with(
-            zip_file().__enter__().filename,
+        boto_s3_client.upload_fileobj.assert_called_once_with(
+            ZipStream.return_value,
             'dummy-lambda-bucket',
             '{}/{}-{}.zip'.format(
                 self._component_name, self._component_name, self._version
-            )
+            ),
+            ExtraArgs=ANY, Config=ANY, Callback=ANY,
         )
 
-    @patch('cdflow_commands.plugins.aws_lambda.os')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
     def test_release_pushes_to_multiple_s3_regions(
-        self, zip_file, mock_os
+        self, ZipStream
     ):
         # Given
-        boto_s3_client_region1 = Mock()
-        boto_s3_client_region2 = Mock()
+        boto_s3_client_region1 = empty_bucket_s3_client()
+        boto_s3_client_region2 = empty_bucket_s3_client()
         self._release.boto_session.client.side_effect = \
             lambda service, region_name: boto_s3_client_region1 \
             if region_name == 'test-region1' else boto_s3_client_region2
@@ -267,23 +494,31 @@ class TestLambdaReleasePluginClassicMetadataHandling(unittest.TestCase):
         self._release.boto_session.client.assert_any_call(
             's3', region_name='test-region2'
         )
-        boto_s3_client_region1.upload_file.assert_any_call(
-            zip_file().__enter__().filename,
+        boto_s3_client_region1.upload_fileobj.assert_any_call(
+            ZipStream.return_value,
             'dummy-lambda-bucket',
             '{}/{}-{}.zip'.format(
                 self._component_name, self._component_name, self._version
-            )
+            ),
+            ExtraArgs=ANY, Config=ANY, Callback=ANY,
+        )
+        key = '{}/{}-{}.zip'.format(
+            self._component_name, self._component_name, self._version
         )
-        boto_s3_client_region2.upload_file.assert_any_call(
-            zip_file().__enter__().filename,
+        boto_s3_client_region2.upload_fileobj.assert_not_called()
+        boto_s3_client_region2.copy.assert_called_once_with(
+            {'Bucket': 'dummy-lambda-bucket', 'Key': key},
             'dummy-lambda-bucket2',
-            '{}/{}-{}.zip'.format(
-                self._component_name, self._component_name, self._version
-            )
+            key,
+            ExtraArgs={
+                'Metadata': {'cdflow_package_sha256': ANY},
+                'MetadataDirective': 'REPLACE',
+            },
+            SourceClient=boto_s3_client_region1,
+            Config=ANY,
         )
 
-    @patch('cdflow_commands.plugins.aws_lambda.os')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
-    def test_release_cleans_up_zip_after_push(self, zip_file, mock_os):
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
+    def test_release_closes_package_after_push(self, ZipStream):
         self._plugin.create()
-        mock_os.remove.assert_called_once_with(zip_file().__enter__().filename)
+        ZipStream.return_value.close.assert_called_once_with()
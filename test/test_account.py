@@ -307,3 +307,61 @@ class TestAccountScheme(unittest.TestCase):
                 assert account.region == 'test-region-1'
             if account.alias == 'release':
                 assert account.region == 'region-override'
+
+    def test_deployable_account_regions(self):
+        raw_scheme = {
+            'accounts': {
+                'dev': {'id': '1111111111', 'role': 'admin-role'},
+                'prod': {
+                    'id': '2222222222',
+                    'role': 'admin-role',
+                    'region': 'region-override',
+                },
+                'release': {'id': '1234567890', 'role': 'test-role'},
+            },
+            'environments': {'live': 'prod', '*': 'dev'},
+            'release-account': 'release',
+            'release-bucket': 'release-bucket',
+            'default-region': 'test-region-1',
+            'terraform-backend-s3-bucket': 'backend-bucket',
+            'terraform-backend-s3-dynamodb-table': 'backend-table',
+        }
+
+        account_scheme = AccountScheme.create(raw_scheme, 'test-team')
+
+        assert account_scheme.deployable_account_regions == {
+            ('dev', 'test-region-1'), ('prod', 'region-override'),
+        }
+
+    def test_release_bucket_for_region(self):
+        raw_scheme = {
+            'accounts': {
+                'release': {'id': '1234567890', 'role': 'test-role'},
+            },
+            'environments': {},
+            'release-account': 'release',
+            'release-bucket': 'release-bucket',
+            'default-region': 'eu-west-1',
+            'terraform-backend-s3-bucket': 'backend-bucket',
+            'terraform-backend-s3-dynamodb-table': 'backend-table',
+            'release-buckets': {
+                'eu-west-1': 'release-bucket',
+                'us-east-1': 'release-bucket-us-east-1',
+                'ap-southeast-2': 'release-bucket-ap-southeast-2',
+            },
+        }
+
+        account_scheme = AccountScheme.create(raw_scheme, 'test-team')
+
+        assert account_scheme.release_replica_buckets == {
+            'us-east-1': 'release-bucket-us-east-1',
+            'ap-southeast-2': 'release-bucket-ap-southeast-2',
+        }
+        assert account_scheme.release_bucket_for_region('us-east-1') == \
+            ('release-bucket-us-east-1', 'us-east-1')
+        assert account_scheme.release_bucket_for_region('us-west-2') == \
+            ('release-bucket-us-east-1', 'us-east-1')
+        assert account_scheme.release_bucket_for_region('eu-central-1') == \
+            ('release-bucket', 'eu-west-1')
+        assert account_scheme.release_bucket_for_region('sa-east-1') == \
+            ('release-bucket', 'eu-west-1')
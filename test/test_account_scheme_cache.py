@@ -0,0 +1,91 @@
+import json
+import unittest
+from tempfile import TemporaryDirectory
+
+from botocore.exceptions import ClientError
+from mock import Mock
+
+from cdflow_commands.account_scheme_cache import AccountSchemeCache
+
+SCHEME = {'release-account': 'foodev', 'release-bucket': 'releases'}
+
+
+def s3_resource_returning(scheme, etag='"abc"'):
+    s3_resource = Mock()
+    body = Mock()
+    body.read.return_value = json.dumps(scheme)
+    s3_resource.Object.return_value.get.return_value = {
+        'Body': body, 'ETag': etag,
+    }
+    return s3_resource
+
+
+class TestAccountSchemeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_scheme_is_fetched_and_cached(self):
+        # Given
+        cache = AccountSchemeCache(self.temp_dir.name, ttl=60)
+        s3_resource = s3_resource_returning(SCHEME)
+
+        # When
+        first = cache.fetch(s3_resource, 'bucket', 'key')
+        second = cache.fetch(s3_resource, 'bucket', 'key')
+
+        # Then
+        assert first == second == SCHEME
+        s3_resource.Object.assert_called_once_with('bucket', 'key')
+        s3_resource.Object.return_value.get.assert_called_once_with()
+
+    def test_expired_entry_is_revalidated_with_etag(self):
+        # Given
+        cache = AccountSchemeCache(self.temp_dir.name, ttl=0)
+        cache.fetch(s3_resource_returning(SCHEME), 'bucket', 'key')
+        s3_resource = Mock()
+        s3_resource.Object.return_value.get.side_effect = ClientError(
+            {'Error': {'Code': '304'}}, 'GetObject',
+        )
+
+        # When
+        scheme = cache.fetch(s3_resource, 'bucket', 'key')
+
+        # Then
+        assert scheme == SCHEME
+        s3_resource.Object.return_value.get.assert_called_once_with(
+            IfNoneMatch='"abc"'
+        )
+
+    def test_modified_scheme_replaces_cached_entry(self):
+        # Given
+        cache = AccountSchemeCache(self.temp_dir.name, ttl=0)
+        cache.fetch(s3_resource_returning(SCHEME), 'bucket', 'key')
+        new_scheme = dict(SCHEME, **{'release-bucket': 'new-releases'})
+
+        # When
+        scheme = cache.fetch(
+            s3_resource_returning(new_scheme, '"def"'), 'bucket', 'key',
+        )
+
+        # Then
+        assert scheme == new_scheme
+        cache = AccountSchemeCache(self.temp_dir.name, ttl=60)
+        assert cache.fetch(Mock(), 'bucket', 'key') == new_scheme
+
+    def test_other_errors_are_raised(self):
+        # Given
+        cache = AccountSchemeCache(self.temp_dir.name, ttl=0)
+        cache.fetch(s3_resource_returning(SCHEME), 'bucket', 'key')
+        s3_resource = Mock()
+        s3_resource.Object.return_value.get.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDenied'}}, 'GetObject',
+        )
+
+        # Then
+        self.assertRaises(
+            ClientError, cache.fetch, s3_resource, 'bucket', 'key',
+        )
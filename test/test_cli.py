@@ -3,13 +3,13 @@ import unittest
 from mock import patch, Mock, MagicMock, ANY
 
 from cdflow_commands.account import AccountScheme, Account
-from cdflow_commands import cli
+from cdflow_commands import cli, transfer
 from cdflow_commands.exceptions import UnknownProjectTypeError, UserFacingError
 
 
 @patch('cdflow_commands.cli.rmtree')
 @patch('cdflow_commands.cli.sys')
-@patch('cdflow_commands.cli.load_manifest')
+@patch('cdflow_commands.config.load_manifest')
 class TestVerboseLogging(unittest.TestCase):
 
     def test_verbose_flag_in_arguments(self, load_manifest, _1, _2):
@@ -45,7 +45,7 @@ class TestVerboseLogging(unittest.TestCase):
 
 @patch('cdflow_commands.cli.rmtree')
 @patch('cdflow_commands.cli.sys')
-@patch('cdflow_commands.cli.load_manifest')
+@patch('cdflow_commands.config.load_manifest')
 class TestUserFacingErrorThrown(unittest.TestCase):
 
     def test_non_zero_exit(self, load_manifest, mock_sys, _):
@@ -100,11 +100,11 @@ class TestCliBuildPlugin(unittest.TestCase):
     @patch('cdflow_commands.cli.check_output')
     @patch('cdflow_commands.cli.rmtree')
     @patch('cdflow_commands.cli.sys')
-    @patch('cdflow_commands.cli.load_manifest')
-    @patch('cdflow_commands.cli.build_account_scheme_s3')
-    @patch('cdflow_commands.cli.assume_role')
-    @patch('cdflow_commands.cli.Release')
-    @patch('cdflow_commands.cli.get_component_name')
+    @patch('cdflow_commands.config.load_manifest')
+    @patch('cdflow_commands.config.build_account_scheme_s3')
+    @patch('cdflow_commands.config.assume_role')
+    @patch('cdflow_commands.release.Release')
+    @patch('cdflow_commands.config.get_component_name')
     def test_unsupported_project_type(
         self, get_component_name, Release, assume_role,
         build_account_scheme_s3, load_manifest, sys, rmtree, check_output,
@@ -136,11 +136,11 @@ class TestCliBuildPlugin(unittest.TestCase):
 class TestRoles(unittest.TestCase):
 
     @patch('cdflow_commands.config.check_output')
-    @patch('cdflow_commands.cli.load_manifest')
+    @patch('cdflow_commands.config.load_manifest')
     @patch('cdflow_commands.cli.run_release')
-    @patch('cdflow_commands.cli.assume_role')
-    @patch('cdflow_commands.cli.build_account_scheme_s3')
-    @patch('cdflow_commands.cli.Session')
+    @patch('cdflow_commands.config.assume_role')
+    @patch('cdflow_commands.config.build_account_scheme_s3')
+    @patch('boto3.session.Session')
     def test_release_assumes_release_account_role(
         self, Session, build_account_scheme_s3, assume_role, run_release,
         load_manifest, check_output,
@@ -156,7 +156,9 @@ class TestRoles(unittest.TestCase):
         account_scheme.release_account.role = 'test-role'
         account_scheme.release_account.region_name = 'eu-west-13'
         account_scheme.default_region = 'eu-west-12'
+        account_scheme.s3_transfer = {}
         build_account_scheme_s3.return_value = (account_scheme, None)
+        load_manifest.return_value.s3_transfer = {}
         check_output.return_value = 'git@github.com:org/component.git\n'\
             .encode('utf-8')
 
@@ -175,10 +177,10 @@ class TestRoles(unittest.TestCase):
             ANY
         )
 
-    @patch('cdflow_commands.cli.fetch_release')
+    @patch('cdflow_commands.release.fetch_release')
     @patch('cdflow_commands.cli.run_deploy')
-    @patch('cdflow_commands.cli.assume_role')
-    @patch('cdflow_commands.cli.build_account_scheme_file')
+    @patch('cdflow_commands.config.assume_role')
+    @patch('cdflow_commands.config.build_account_scheme_file')
     def test_deploy_assumes_infrastructure_account_role(
         self, build_account_scheme_file, assume_role, run_deploy,
         fetch_release
@@ -211,19 +213,23 @@ class TestRoles(unittest.TestCase):
         )
 
         # Then
-        account_scheme.account_for_environment.assert_called_once_with('ci')
+        account_scheme.account_for_environment.assert_called_with('ci')
         assume_role.assert_called_once_with(
             root_session, infrastructure_account,
         )
+        fetch_release.assert_called_once_with(
+            release_account_session, account_scheme, ANY, 'dummy', '1',
+            'eu-west-13',
+        )
         run_deploy.assert_called_once_with(
             ANY, account_scheme, release_account_session,
             infrastructure_account_session, ANY, ANY, ANY, ANY
         )
 
-    @patch('cdflow_commands.cli.fetch_release')
+    @patch('cdflow_commands.release.fetch_release')
     @patch('cdflow_commands.cli.run_deploy')
-    @patch('cdflow_commands.cli.assume_role')
-    @patch('cdflow_commands.cli.build_account_scheme_file')
+    @patch('cdflow_commands.config.assume_role')
+    @patch('cdflow_commands.config.build_account_scheme_file')
     def test_deploy_classic_metadata_handling(
         self, build_account_scheme_file, assume_role, run_deploy,
         fetch_release
@@ -256,10 +262,14 @@ class TestRoles(unittest.TestCase):
         )
 
         # Then
-        account_scheme.account_for_environment.assert_called_once_with('ci')
+        account_scheme.account_for_environment.assert_called_with('ci')
         assume_role.assert_called_once_with(
             root_session, infrastructure_account,
         )
+        fetch_release.assert_called_once_with(
+            release_account_session, account_scheme, ANY, 'dummy', '1',
+            'eu-west-13',
+        )
         run_deploy.assert_called_once_with(
             ANY, account_scheme, infrastructure_account_session,
             infrastructure_account_session, ANY, ANY, ANY, ANY
@@ -268,10 +278,10 @@ class TestRoles(unittest.TestCase):
 
 class TestAccountSchemeHandling(unittest.TestCase):
 
-    @patch('cdflow_commands.cli.assume_role')
-    @patch('cdflow_commands.cli.fetch_release')
+    @patch('cdflow_commands.config.assume_role')
+    @patch('cdflow_commands.release.fetch_release')
     @patch('cdflow_commands.cli.run_deploy')
-    @patch('cdflow_commands.cli.build_account_scheme_file')
+    @patch('cdflow_commands.config.build_account_scheme_file')
     def test_deploy_uses_account_scheme_from_release(
         self, build_account_scheme_file, run_deploy, fetch_release, _1
     ):
@@ -302,9 +312,9 @@ class TestAccountSchemeHandling(unittest.TestCase):
 
 class TestSecretsFromInfraAccount(unittest.TestCase):
 
-    @patch('cdflow_commands.cli.Deploy')
-    @patch('cdflow_commands.cli.terraform_state')
-    @patch('cdflow_commands.cli.get_secrets')
+    @patch('cdflow_commands.deploy.Deploy')
+    @patch('cdflow_commands.state.terraform_state')
+    @patch('cdflow_commands.secrets.get_secrets')
     def test_secrets_in_deploy_account(self, get_secrets, _, _1):
         # Given
         deploy_session = Mock()
@@ -327,16 +337,16 @@ class TestSecretsFromInfraAccount(unittest.TestCase):
 
 class TestMigrateState(unittest.TestCase):
 
-    @patch('cdflow_commands.cli.Session')
-    @patch('cdflow_commands.cli.migrate_state')
+    @patch('boto3.session.Session')
+    @patch('cdflow_commands.state.migrate_state')
     @patch('cdflow_commands.cli.check_output')
     @patch('cdflow_commands.cli.rmtree')
     @patch('cdflow_commands.cli.sys')
-    @patch('cdflow_commands.cli.load_manifest')
-    @patch('cdflow_commands.cli.build_account_scheme_s3')
-    @patch('cdflow_commands.cli.assume_role')
+    @patch('cdflow_commands.config.load_manifest')
+    @patch('cdflow_commands.config.build_account_scheme_s3')
+    @patch('cdflow_commands.config.assume_role')
     @patch('cdflow_commands.cli.run_release')
-    @patch('cdflow_commands.cli.get_component_name')
+    @patch('cdflow_commands.config.get_component_name')
     def test_migrate_state_function_is_called(
         self, get_component_name, run_release, assume_role,
         build_account_scheme_s3, load_manifest, sys, rmtree, check_output,
@@ -369,16 +379,16 @@ class TestMigrateState(unittest.TestCase):
             get_component_name.return_value,
         )
 
-    @patch('cdflow_commands.cli.Session')
-    @patch('cdflow_commands.cli.migrate_state')
+    @patch('boto3.session.Session')
+    @patch('cdflow_commands.state.migrate_state')
     @patch('cdflow_commands.cli.check_output')
     @patch('cdflow_commands.cli.rmtree')
     @patch('cdflow_commands.cli.sys')
-    @patch('cdflow_commands.cli.load_manifest')
-    @patch('cdflow_commands.cli.build_account_scheme_s3')
-    @patch('cdflow_commands.cli.assume_role')
+    @patch('cdflow_commands.config.load_manifest')
+    @patch('cdflow_commands.config.build_account_scheme_s3')
+    @patch('cdflow_commands.config.assume_role')
     @patch('cdflow_commands.cli.run_release')
-    @patch('cdflow_commands.cli.get_component_name')
+    @patch('cdflow_commands.config.get_component_name')
     def test_component_flag_means_migrate_state_function_is_not_called(
         self, get_component_name, run_release, assume_role,
         build_account_scheme_s3, load_manifest, sys, rmtree, check_output,
@@ -410,16 +420,16 @@ class TestMigrateState(unittest.TestCase):
 
         migrate_state.assert_not_called()
 
-    @patch('cdflow_commands.cli.Session')
-    @patch('cdflow_commands.cli.migrate_state')
+    @patch('boto3.session.Session')
+    @patch('cdflow_commands.state.migrate_state')
     @patch('cdflow_commands.cli.check_output')
     @patch('cdflow_commands.cli.rmtree')
     @patch('cdflow_commands.cli.sys')
-    @patch('cdflow_commands.cli.load_manifest')
-    @patch('cdflow_commands.cli.build_account_scheme_s3')
-    @patch('cdflow_commands.cli.assume_role')
+    @patch('cdflow_commands.config.load_manifest')
+    @patch('cdflow_commands.config.build_account_scheme_s3')
+    @patch('cdflow_commands.config.assume_role')
     @patch('cdflow_commands.cli.run_release')
-    @patch('cdflow_commands.cli.get_component_name')
+    @patch('cdflow_commands.config.get_component_name')
     def test_component_flag_passed_but_no_upgrade_handled(
         self, get_component_name, run_release, assume_role,
         build_account_scheme_s3, load_manifest, sys, rmtree, check_output,
@@ -444,3 +454,135 @@ class TestMigrateState(unittest.TestCase):
         ])
 
         migrate_state.assert_not_called()
+
+
+class TestMultipleEnvironments(unittest.TestCase):
+
+    def setUp(self):
+        self.account_scheme = Mock()
+        self.account_scheme.environments = ['aslive', 'ci', 'live', 'qa']
+
+    def test_single_environment(self):
+        assert cli.resolve_environments('ci', self.account_scheme) == ['ci']
+
+    def test_comma_separated_environments(self):
+        assert cli.resolve_environments(
+            'ci,qa,ci', self.account_scheme,
+        ) == ['ci', 'qa']
+
+    def test_environment_glob(self):
+        assert cli.resolve_environments(
+            '*live,ci', self.account_scheme,
+        ) == ['aslive', 'live', 'ci']
+
+    def test_glob_without_matches_is_an_error(self):
+        self.assertRaises(
+            UserFacingError, cli.resolve_environments, 'dev*',
+            self.account_scheme,
+        )
+
+    @patch('cdflow_commands.parallel.run_in_parallel')
+    @patch('cdflow_commands.cli.link.TreeLinker')
+    @patch('cdflow_commands.config.assume_role')
+    @patch('cdflow_commands.cli.run_deploy')
+    @patch('cdflow_commands.config.build_account_scheme_file')
+    def test_deploys_each_environment_from_own_working_copy(
+        self, build_account_scheme_file, run_deploy, assume_role, TreeLinker,
+        run_in_parallel,
+    ):
+        # Given
+        account_scheme = build_account_scheme_file.return_value
+        account_scheme.environments = ['ci', 'qa']
+        account_scheme.classic_metadata_handling = False
+        run_in_parallel.side_effect = lambda tasks, max_workers: [
+            task() for _, task in tasks
+        ] and []
+        args = {
+            'deploy': True, 'destroy': False, '<environment>': 'ci,qa',
+            '--max-parallel': '2', '--plan-only': False,
+        }
+
+        # When
+        cli.run_non_release_command_on_release(
+            args, '/tmp/release/c-1', Mock(), 'c', Mock(), Mock(),
+        )
+
+        # Then
+        run_in_parallel.assert_called_once_with(ANY, 2)
+        TreeLinker.assert_called_with(
+            must_copy=cli.release_cache.must_copy,
+        )
+        TreeLinker.return_value.link_tree.assert_any_call(
+            '/tmp/release/c-1', '/tmp/release/c-1-ci',
+        )
+        TreeLinker.return_value.link_tree.assert_any_call(
+            '/tmp/release/c-1', '/tmp/release/c-1-qa',
+        )
+        deployed = [
+            (call[0][0], call[0][6]) for call in run_deploy.call_args_list
+        ]
+        assert deployed == [
+            ('/tmp/release/c-1-ci', 'ci'), ('/tmp/release/c-1-qa', 'qa'),
+        ]
+
+    @patch('cdflow_commands.parallel.run_in_parallel')
+    @patch('cdflow_commands.cli.link.TreeLinker')
+    @patch('cdflow_commands.config.assume_role')
+    @patch('cdflow_commands.cli.run_deploy')
+    @patch('cdflow_commands.config.build_account_scheme_file')
+    def test_failed_environments_are_reported(
+        self, build_account_scheme_file, run_deploy, assume_role, TreeLinker,
+        run_in_parallel,
+    ):
+        # Given
+        build_account_scheme_file.return_value.environments = ['ci', 'qa']
+        run_in_parallel.return_value = ['qa']
+        args = {
+            'deploy': True, 'destroy': False, '<environment>': 'ci,qa',
+            '--max-parallel': None, '--plan-only': False,
+        }
+
+        # When / Then
+        with self.assertRaises(UserFacingError) as context:
+            cli.run_non_release_command_on_release(
+                args, '/tmp/release/c-1', Mock(), 'c', Mock(), Mock(),
+            )
+        assert 'qa' in str(context.exception)
+        run_in_parallel.assert_called_once_with(ANY, cli.DEFAULT_MAX_PARALLEL)
+
+
+class TestCompressionLevel(unittest.TestCase):
+
+    def test_compression_level_defaults(self):
+        assert cli.compression_level({'--compression-level': None}) == 6
+
+    def test_compression_level_is_parsed(self):
+        assert cli.compression_level({'--compression-level': '0'}) == 0
+
+    def test_compression_level_out_of_range_is_rejected(self):
+        with self.assertRaises(UserFacingError):
+            cli.compression_level({'--compression-level': '10'})
+
+
+class TestConfigureTransfers(unittest.TestCase):
+
+    def tearDown(self):
+        transfer.configure()
+
+    def test_cli_options_override_cdflow_yml_and_account_scheme(self):
+        # Given
+        account_scheme = Mock()
+        account_scheme.s3_transfer = {
+            'part-size-mb': 16, 'max-concurrency': 4,
+        }
+        manifest = Mock()
+        manifest.s3_transfer = {'max-concurrency': 20}
+
+        # When
+        cli.configure_transfers({
+            '--s3-part-size': '32', '--s3-max-concurrency': None,
+        }, manifest, account_scheme)
+
+        # Then
+        assert transfer.part_size() == 32 * 1024 * 1024
+        assert transfer.max_concurrency() == 20
@@ -0,0 +1,82 @@
+import unittest
+from threading import Barrier, Thread
+
+from mock import Mock
+
+from cdflow_commands import clients
+
+
+class TestClientPool(unittest.TestCase):
+
+    def test_clients_are_shared_per_session_service_and_region(self):
+        # Given
+        session = Mock()
+        session.client.side_effect = lambda *args, **kwargs: Mock()
+
+        # When
+        s3 = clients.client(session, 's3')
+        s3_again = clients.client(session, 's3')
+        s3_regional = clients.client(session, 's3', region_name='eu-west-1')
+        ecr = clients.client(session, 'ecr')
+
+        # Then
+        assert s3 is s3_again
+        assert s3 is not s3_regional
+        assert s3 is not ecr
+        assert session.client.call_count == 3
+        session.client.assert_any_call('s3')
+        session.client.assert_any_call('s3', region_name='eu-west-1')
+
+    def test_clients_are_not_shared_between_sessions(self):
+        # Given
+        session_a = Mock()
+        session_b = Mock()
+
+        # When
+        client_a = clients.client(session_a, 's3')
+        client_b = clients.client(session_b, 's3')
+
+        # Then
+        assert client_a is session_a.client.return_value
+        assert client_b is session_b.client.return_value
+
+    def test_resources_are_not_shared_between_threads(self):
+        # Given
+        session = Mock()
+        session.resource.side_effect = lambda *args, **kwargs: Mock()
+        resources = []
+        barrier = Barrier(2)
+
+        def get_resource():
+            first = clients.resource(session, 's3')
+            second = clients.resource(session, 's3')
+            barrier.wait()
+            resources.extend((first, second))
+
+        # When
+        threads = [Thread(target=get_resource) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Then
+        assert resources[0] is resources[1]
+        assert resources[2] is resources[3]
+        assert session.resource.call_count == 2
+        assert resources[0] is not resources[2]
+
+    def test_stats_count_built_clients(self):
+        # Given
+        before = clients.stats()
+        session = Mock()
+
+        # When
+        clients.client(session, 's3')
+        clients.client(session, 's3')
+        clients.resource(session, 's3')
+
+        # Then
+        after = clients.stats()
+        assert after.built == before.built + 2
+        assert after.seconds >= before.seconds
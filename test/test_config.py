@@ -82,6 +82,7 @@ class TestLoadManifest(unittest.TestCase):
         assert manifest.type == fixtures['type']
         assert manifest.tfstate_filename == 'terraform.tfstate'
         assert not manifest.multi_region
+        assert manifest.s3_transfer == {}
 
     def test_tfstate_filename(self):
         # Given
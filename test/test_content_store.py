@@ -0,0 +1,214 @@
+import json
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import boto3
+from mock import patch
+from moto import mock_s3
+
+from cdflow_commands import transfer
+from cdflow_commands.content_store import (
+    InvalidManifestError, build_manifest, copy_tree, download_tree,
+    upload_tree,
+)
+from test.helpers import snapshot, write
+
+BUCKET = 'release-bucket'
+BLOB_PREFIX = 'team/component/blobs/'
+
+
+class TestContentStore(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_s3 = mock_s3()
+        self.mock_s3.start()
+        self.s3_client = boto3.session.Session(
+            region_name='us-east-1',
+        ).client('s3')
+        self.s3_client.create_bucket(Bucket=BUCKET)
+        self.temp_dir = TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, 'root')
+        release = os.path.join(self.root, 'component-1')
+        write(os.path.join(release, 'infra', 'main.tf'), b'resource {}\n' * 50)
+        write(os.path.join(release, 'config', 'live.json'), b'{}')
+        write(os.path.join(release, 'config', 'ci.json'), b'{}')
+        write(
+            os.path.join(release, '.terraform', 'plugins', 'provider'),
+            os.urandom(1000), 0o755,
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        self.mock_s3.stop()
+
+    def upload(self, version):
+        manifest, blobs = build_manifest(
+            self.root, f'component-{version}', {'cdflow_image_digest': 'x'},
+        )
+        upload_tree(
+            self.s3_client, BUCKET, BLOB_PREFIX,
+            f'team/component/component-{version}.manifest.json',
+            manifest, blobs, 6,
+        )
+
+    def stored_blobs(self):
+        return [
+            item['Key'] for item in self.s3_client.list_objects_v2(
+                Bucket=BUCKET, Prefix=BLOB_PREFIX,
+            ).get('Contents', [])
+        ]
+
+    def test_tree_is_rebuilt_from_manifest(self):
+        # Given
+        self.upload('1')
+        destination = os.path.join(self.temp_dir.name, 'destination')
+        os.makedirs(destination)
+
+        # When
+        download_tree(
+            self.s3_client, BUCKET, BLOB_PREFIX,
+            'team/component/component-1.manifest.json', destination,
+        )
+
+        # Then
+        assert snapshot(destination) == snapshot(self.root)
+
+    def test_identical_files_are_stored_once(self):
+        # When
+        self.upload('1')
+
+        # Then
+        assert len(self.stored_blobs()) == 3
+
+    def test_only_new_blobs_are_uploaded(self):
+        # Given
+        self.upload('1')
+        os.rename(
+            os.path.join(self.root, 'component-1'),
+            os.path.join(self.root, 'component-2'),
+        )
+        write(
+            os.path.join(self.root, 'component-2', 'infra', 'main.tf'),
+            b'resource {} # changed',
+        )
+
+        # When
+        self.upload('2')
+
+        # Then
+        assert len(self.stored_blobs()) == 4
+
+    def test_compressible_blobs_are_gzipped(self):
+        # Given
+        self.upload('1')
+        manifest = json.loads(self.s3_client.get_object(
+            Bucket=BUCKET, Key='team/component/component-1.manifest.json',
+        )['Body'].read())
+        digests = {
+            entry['path']: entry.get('sha256')
+            for entry in manifest['entries']
+        }
+
+        # When
+        main_tf, provider = (
+            self.s3_client.head_object(
+                Bucket=BUCKET, Key=BLOB_PREFIX + digests[relative_path],
+            )['Metadata']['cdflow-encoding']
+            for relative_path in (
+                'component-1/infra/main.tf',
+                'component-1/.terraform/plugins/provider',
+            )
+        )
+
+        # Then
+        assert main_tf == 'gzip'
+        assert provider == 'identity'
+        assert manifest['metadata'] == {'cdflow_image_digest': 'x'}
+
+    def test_tree_is_copied_to_another_bucket(self):
+        # Given
+        self.upload('1')
+        manifest_key = 'team/component/component-1.manifest.json'
+        manifest = json.loads(self.s3_client.get_object(
+            Bucket=BUCKET, Key=manifest_key,
+        )['Body'].read())
+        self.s3_client.create_bucket(Bucket='regional-bucket')
+        destination = os.path.join(self.temp_dir.name, 'destination')
+        os.makedirs(destination)
+
+        # When
+        copy_tree(
+            BUCKET, self.s3_client, 'regional-bucket', BLOB_PREFIX,
+            manifest_key, manifest,
+        )
+
+        # Then
+        download_tree(
+            self.s3_client, 'regional-bucket', BLOB_PREFIX, manifest_key,
+            destination,
+        )
+        assert snapshot(destination) == snapshot(self.root)
+
+    @patch.object(transfer, 'part_size', lambda: 5 * 1024 * 1024)
+    def test_blobs_larger_than_a_part_are_transferred_in_parts(self):
+        # Given
+        release = os.path.join(self.root, 'component-1')
+        write(os.path.join(release, 'image.png'), os.urandom(11 * 1024 * 1024))
+        write(
+            os.path.join(release, 'infra', 'large.tf'),
+            os.urandom(6 * 1024 * 1024).hex().encode('utf-8'),
+        )
+        self.upload('1')
+        destination = os.path.join(self.temp_dir.name, 'destination')
+        os.makedirs(destination)
+
+        # When
+        download_tree(
+            self.s3_client, BUCKET, BLOB_PREFIX,
+            'team/component/component-1.manifest.json', destination,
+        )
+
+        # Then
+        assert snapshot(destination) == snapshot(self.root)
+
+    def test_blobs_that_do_not_match_their_hash_are_rejected(self):
+        # Given
+        self.upload('1')
+        manifest = json.loads(self.s3_client.get_object(
+            Bucket=BUCKET, Key='team/component/component-1.manifest.json',
+        )['Body'].read())
+        digest = next(
+            entry['sha256'] for entry in manifest['entries']
+            if entry['path'] == 'component-1/infra/main.tf'
+        )
+        self.s3_client.put_object(
+            Bucket=BUCKET, Key=BLOB_PREFIX + digest, Body=b'tampered',
+            Metadata={'cdflow-encoding': 'identity'},
+        )
+        destination = os.path.join(self.temp_dir.name, 'destination')
+        os.makedirs(destination)
+
+        # Then
+        with self.assertRaises(InvalidManifestError):
+            download_tree(
+                self.s3_client, BUCKET, BLOB_PREFIX,
+                'team/component/component-1.manifest.json', destination,
+            )
+
+    def test_paths_outside_destination_are_rejected(self):
+        # Given
+        self.s3_client.put_object(
+            Bucket=BUCKET, Key='manifest.json', Body=json.dumps({
+                'format': 1, 'metadata': {}, 'entries': [
+                    {'path': '../outside', 'mode': 0o644},
+                ],
+            }),
+        )
+
+        # Then
+        with self.assertRaises(InvalidManifestError):
+            download_tree(
+                self.s3_client, BUCKET, BLOB_PREFIX, 'manifest.json',
+                os.path.join(self.temp_dir.name, 'destination'),
+            )
@@ -0,0 +1,132 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from os import listdir
+from tempfile import TemporaryDirectory
+
+from mock import Mock, patch
+
+from cdflow_commands import config, credential_cache
+from cdflow_commands.account import Account
+from cdflow_commands.credential_cache import CredentialCache
+
+
+def credentials(expires_in):
+    return {
+        'AccessKeyId': 'dummy-access-key-id',
+        'SecretAccessKey': 'dummy-secret-access-key',
+        'SessionToken': 'dummy-session-token',
+        'Expiration': datetime.now(timezone.utc) + expires_in,
+    }
+
+
+def root_session(access_key='root-access-key'):
+    session = Mock()
+    session.get_credentials.return_value.access_key = access_key
+    return session
+
+
+class TestCredentialCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.cache = CredentialCache(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_credentials_are_reused_until_expiry(self):
+        # Given
+        assume = Mock(return_value=credentials(timedelta(hours=1)))
+        session = root_session()
+
+        # When
+        first = self.cache.get_or_assume(session, 'arn:role/a', assume)
+        second = self.cache.get_or_assume(session, 'arn:role/a', assume)
+
+        # Then
+        assume.assert_called_once_with()
+        assert first['SessionToken'] == second['SessionToken']
+        assert first['Expiration'] == second['Expiration']
+
+    def test_credentials_near_expiry_are_not_reused(self):
+        # Given
+        assume = Mock(return_value=credentials(timedelta(minutes=10)))
+        session = root_session()
+
+        # When
+        self.cache.get_or_assume(session, 'arn:role/a', assume)
+        self.cache.get_or_assume(session, 'arn:role/a', assume)
+
+        # Then
+        assert assume.call_count == 2
+        assert not [f for f in listdir(self.temp_dir.name) if 'json' in f]
+
+    def test_cache_is_keyed_by_caller_and_role(self):
+        # Given
+        assume = Mock(return_value=credentials(timedelta(hours=1)))
+
+        # When
+        self.cache.get_or_assume(root_session('a'), 'arn:role/a', assume)
+        self.cache.get_or_assume(root_session('b'), 'arn:role/a', assume)
+        self.cache.get_or_assume(root_session('a'), 'arn:role/b', assume)
+        self.cache.get_or_assume(root_session('a'), 'arn:role/a', assume)
+
+        # Then
+        assert assume.call_count == 3
+
+    def test_corrupt_cache_entry_is_ignored(self):
+        # Given
+        assume = Mock(return_value=credentials(timedelta(hours=1)))
+        session = root_session()
+        self.cache.get_or_assume(session, 'arn:role/a', assume)
+        for filename in listdir(self.temp_dir.name):
+            if filename.endswith('.json'):
+                with open(f'{self.temp_dir.name}/{filename}', 'w') as f:
+                    f.write('{not json')
+
+        # When
+        self.cache.get_or_assume(session, 'arn:role/a', assume)
+
+        # Then
+        assert assume.call_count == 2
+
+
+@patch('cdflow_commands.config.Session')
+class TestAssumeRoleCaching(unittest.TestCase):
+
+    def setUp(self):
+        self.account = Account('alias', '123456789', 'role', 'eu-west-12')
+        self.root_session = root_session()
+        self.sts = self.root_session.client.return_value
+        self.sts.get_caller_identity.return_value = {
+            'UserId': 'foo', 'Arn': 'arn:aws:iam::123456789:user/foo',
+        }
+        self.sts.assume_role.return_value = {
+            'Credentials': credentials(timedelta(hours=4)),
+        }
+
+    def tearDown(self):
+        credential_cache.set_enabled(True)
+
+    def test_role_is_only_assumed_once(self, Session):
+        # When
+        config.assume_role(self.root_session, self.account)
+        config.assume_role(self.root_session, self.account)
+
+        # Then
+        self.sts.assume_role.assert_called_once()
+        Session.assert_called_with(
+            'dummy-access-key-id', 'dummy-secret-access-key',
+            'dummy-session-token', 'eu-west-12',
+        )
+
+    def test_cache_can_be_disabled(self, Session):
+        # Given
+        credential_cache.set_enabled(False)
+
+        # When
+        config.assume_role(self.root_session, self.account)
+        config.assume_role(self.root_session, self.account)
+
+        # Then
+        assert self.sts.assume_role.call_count == 2
@@ -0,0 +1,139 @@
+import os
+import unittest
+from io import BytesIO
+from tempfile import TemporaryDirectory
+
+from mock import patch
+
+from cdflow_commands import download
+from cdflow_commands.download import DownloadProgress, download_file
+
+
+class FakeS3Client:
+
+    def __init__(self, content, etag='"etag"'):
+        self.content = content
+        self.etag = etag
+        self.ranges = []
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': len(self.content), 'ETag': self.etag}
+
+    def get_object(self, Bucket, Key, Range, IfMatch):
+        assert IfMatch == self.etag
+        start, end = map(int, Range[len('bytes='):].split('-'))
+        self.ranges.append((start, end))
+        return {'Body': BytesIO(self.content[start:end + 1])}
+
+
+@patch.object(download, 'CHUNK_SIZE', 3)
+@patch.object(download, 'part_size', lambda: 10)
+class TestDownloadFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.destination = os.path.join(self.temp_dir.name, 'release.zip')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_destination(self):
+        with open(self.destination, 'rb') as f:
+            return f.read()
+
+    def test_object_is_downloaded_in_ranged_parts(self):
+        # Given
+        s3_client = FakeS3Client(bytes(range(256)) * 3 + b'tail')
+
+        # When
+        download_file(s3_client, 'bucket', 'key', self.destination)
+
+        # Then
+        assert self.read_destination() == s3_client.content
+        assert sorted(s3_client.ranges)[:2] == [(0, 9), (10, 19)]
+        assert sorted(s3_client.ranges)[-1] == (770, 771)
+        assert os.listdir(self.temp_dir.name) == ['release.zip']
+
+    def test_progress_is_removed_before_part_file_is_renamed(self):
+        # Given
+        s3_client = FakeS3Client(b'0123456789')
+
+        # When
+        with patch('cdflow_commands.download.os.replace') as replace:
+            replace.side_effect = lambda source, destination: self.assertFalse(
+                os.path.exists(f'{self.destination}.progress')
+            )
+            download_file(s3_client, 'bucket', 'key', self.destination)
+
+        # Then
+        replace.assert_called_once_with(
+            f'{self.destination}.part', self.destination,
+        )
+
+    def test_empty_object(self):
+        # Given
+        s3_client = FakeS3Client(b'')
+
+        # When
+        download_file(s3_client, 'bucket', 'key', self.destination)
+
+        # Then
+        assert self.read_destination() == b''
+        assert s3_client.ranges == []
+
+    def test_interrupted_download_is_resumed(self):
+        # Given
+        content = b'0123456789abcdefghijABCDEFGHIJ'
+        progress = DownloadProgress(
+            f'{self.destination}.progress', '"etag"', len(content), 10,
+        )
+        progress.start()
+        progress.mark_completed(1)
+        with open(f'{self.destination}.part', 'wb') as f:
+            f.write(b'\0' * 10 + content[10:20] + b'\0' * 10)
+        s3_client = FakeS3Client(content)
+
+        # When
+        download_file(s3_client, 'bucket', 'key', self.destination)
+
+        # Then
+        assert self.read_destination() == content
+        assert sorted(s3_client.ranges) == [(0, 9), (20, 29)]
+
+    def test_download_restarts_if_object_changed(self):
+        # Given
+        content = b'0123456789abcdefghij'
+        progress = DownloadProgress(
+            f'{self.destination}.progress', '"old-etag"', len(content), 10,
+        )
+        progress.start()
+        progress.mark_completed(0)
+        with open(f'{self.destination}.part', 'wb') as f:
+            f.write(b'x' * 20)
+        s3_client = FakeS3Client(content, etag='"new-etag"')
+
+        # When
+        download_file(s3_client, 'bucket', 'key', self.destination)
+
+        # Then
+        assert self.read_destination() == content
+        assert sorted(s3_client.ranges) == [(0, 9), (10, 19)]
+
+    def test_download_restarts_if_part_size_changed(self):
+        # Given
+        content = b'0123456789abcdefghij'
+        progress = DownloadProgress(
+            f'{self.destination}.progress', '"etag"', len(content), 5,
+        )
+        progress.start()
+        progress.mark_completed(0)
+        with open(f'{self.destination}.part', 'wb') as f:
+            f.write(b'x' * 20)
+        s3_client = FakeS3Client(content)
+
+        # When
+        download_file(s3_client, 'bucket', 'key', self.destination)
+
+        # Then
+        assert self.read_destination() == content
+        assert sorted(s3_client.ranges) == [(0, 9), (10, 19)]
@@ -0,0 +1,103 @@
+import os
+import unittest
+from stat import S_IFDIR, S_IFREG
+from tempfile import TemporaryDirectory
+from zipfile import ZipFile, ZipInfo
+
+from mock import patch
+
+from cdflow_commands import extract
+from cdflow_commands.extract import extract_archive
+from test.helpers import snapshot
+
+
+def add_file(archive, name, content, mode):
+    zipinfo = ZipInfo(name)
+    zipinfo.external_attr = (S_IFREG | mode) << 16
+    archive.writestr(zipinfo, content)
+
+
+def add_directory(archive, name, mode):
+    zipinfo = ZipInfo(f'{name}/')
+    zipinfo.external_attr = (S_IFDIR | mode) << 16
+    archive.writestr(zipinfo, b'')
+
+
+def extract_sequentially(release_archive, destination):
+    # What fetch_release did before extraction was parallelised.
+    for zipinfo in release_archive.infolist():
+        extracted_file_path = release_archive.extract(
+            zipinfo.filename, destination,
+        )
+        os.chmod(extracted_file_path, zipinfo.external_attr >> 16)
+
+
+@patch.object(extract, 'MIN_FILES_PER_WORKER', 2)
+class TestExtractArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.archive_path = os.path.join(self.temp_dir.name, 'release.zip')
+        with ZipFile(self.archive_path, 'w') as archive:
+            add_directory(archive, 'infra', 0o755)
+            add_file(archive, 'infra/main.tf', b'resource {}', 0o644)
+            add_directory(archive, 'secret', 0o700)
+            add_file(archive, 'secret/key', b'key', 0o600)
+            add_file(archive, '.terraform/plugins/provider', b'elf', 0o755)
+            for index in range(20):
+                add_file(
+                    archive, f'config/{index}.json', b'{}' * index, 0o644,
+                )
+            add_file(archive, 'release.json', b'{}', 0o444)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def destination(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_tree_matches_sequential_extraction(self):
+        # Given
+        with ZipFile(self.archive_path) as archive:
+            extract_sequentially(archive, self.destination('sequential'))
+
+        # When
+        with ZipFile(self.archive_path) as archive:
+            extract_archive(archive, self.destination('parallel'))
+
+        # Then
+        expected = snapshot(self.destination('sequential'))
+        assert snapshot(self.destination('parallel')) == expected
+        assert expected['.terraform/plugins/provider'] == (0o755, b'elf')
+        assert expected['secret'] == (0o700, None)
+
+    def test_single_worker_matches_sequential_extraction(self):
+        # Given
+        with ZipFile(self.archive_path) as archive:
+            extract_sequentially(archive, self.destination('sequential'))
+
+        # When
+        with ZipFile(self.archive_path) as archive, \
+                patch('cdflow_commands.extract.ThreadPoolExecutor') as pool:
+            extract_archive(
+                archive, self.destination('parallel'), max_workers=1,
+            )
+
+        # Then
+        assert snapshot(self.destination('parallel')) == \
+            snapshot(self.destination('sequential'))
+        pool.assert_not_called()
+
+    def test_member_names_cannot_escape_destination(self):
+        # Given
+        with ZipFile(self.archive_path, 'w') as archive:
+            add_file(archive, '../../outside', b'x', 0o644)
+            add_file(archive, '/absolute', b'y', 0o644)
+
+        # When
+        with ZipFile(self.archive_path) as archive:
+            extract_archive(archive, self.destination('release'))
+
+        # Then
+        assert sorted(os.listdir(self.destination('release'))) == \
+            ['absolute', 'outside']
@@ -0,0 +1,37 @@
+import sys
+import unittest
+from subprocess import PIPE, run
+
+HEAVY_MODULES = (
+    'boto3', 'botocore', 'credstash', 'yaml', 'cdflow_commands.config',
+    'cdflow_commands.deploy', 'cdflow_commands.destroy',
+    'cdflow_commands.release', 'cdflow_commands.state',
+    'cdflow_commands.plugins.ecs', 'cdflow_commands.plugins.aws_lambda',
+    'cdflow_commands.secrets', 'multiprocessing',
+)
+
+
+def import_times(module):
+    process = run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        stdout=PIPE, stderr=PIPE, check=True,
+    )
+    times = {}
+    for line in process.stderr.decode('utf-8').splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_cli_does_not_import_command_dependencies(self):
+        # When
+        times = import_times('cdflow_commands.cli')
+
+        # Then
+        imported = [module for module in HEAVY_MODULES if module in times]
+        assert imported == [], f'{imported} imported at startup'
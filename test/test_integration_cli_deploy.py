@@ -17,6 +17,7 @@ from mock import ANY, MagicMock, Mock, patch
 BotoCreds = namedtuple('BotoCreds', ['access_key', 'secret_key', 'token'])
 
 
+@patch('cdflow_commands.release.download_file')
 @patch('cdflow_commands.secrets.credstash')
 @patch('cdflow_commands.release.os')
 @patch('cdflow_commands.release.ZipFile')
@@ -27,22 +28,21 @@ BotoCreds = namedtuple('BotoCreds', ['access_key', 'secret_key', 'token'])
 @patch('cdflow_commands.deploy.time')
 @patch('cdflow_commands.deploy.NamedTemporaryFile')
 @patch('cdflow_commands.cli.rmtree')
-@patch('cdflow_commands.cli.Session')
+@patch('boto3.session.Session')
 @patch('cdflow_commands.config.Session')
 @patch('cdflow_commands.config.open')
 @patch('cdflow_commands.config.check_output')
 @patch('cdflow_commands.state.NamedTemporaryFile')
-@patch('cdflow_commands.state.check_output')
 @patch('cdflow_commands.state.check_call')
 @patch('cdflow_commands.state.atexit')
 class TestDeployCLI(unittest.TestCase):
 
     def setup_mocks(
-        self, atexit, check_call_state, check_output_state,
+        self, atexit, check_call_state,
         NamedTemporaryFile_state, check_output, _open, Session_from_config,
         Session_from_cli, rmtree, NamedTemporaryFile_deploy, time,
         check_call_deploy, popen_call, mock_os_deploy, TemporaryDirectory,
-        ZipFile, mock_os_release, credstash,
+        ZipFile, mock_os_release, credstash, _download_file,
     ):
         mock_metadata_file = MagicMock(spec=TextIOWrapper)
         metadata = {
@@ -138,6 +138,7 @@ class TestDeployCLI(unittest.TestCase):
         mock_s3_client.get_bucket_location.return_value = {
             'LocationConstraint': mock_assumed_session.region_name,
         }
+        mock_s3_client.list_objects_v2.return_value = {}
 
         mock_assumed_session.client.side_effect = (
             mock_s3_client, mock_db_client,
@@ -170,8 +171,6 @@ class TestDeployCLI(unittest.TestCase):
         process_mock.configure_mock(**attrs)
         popen_call.return_value = process_mock
 
-        check_output_state.return_value = '* default'.encode('utf-8')
-
         return (
             check_call_state, check_call_deploy, popen_call,
             TemporaryDirectory, mock_assumed_session,
@@ -204,6 +203,7 @@ class TestDeployCLI(unittest.TestCase):
                 join(workdir, INFRASTRUCTURE_DEFINITIONS_PATH),
             ],
             cwd=workdir,
+            env=ANY,
         )
 
         popen_call.assert_any_call(
@@ -224,7 +224,8 @@ class TestDeployCLI(unittest.TestCase):
                 'AWS_ACCESS_KEY_ID': aws_access_key_id,
                 'AWS_SECRET_ACCESS_KEY': aws_secret_access_key,
                 'AWS_SESSION_TOKEN': aws_session_token,
-                'AWS_DEFAULT_REGION': mock_assumed_session.region_name
+                'AWS_DEFAULT_REGION': mock_assumed_session.region_name,
+                'TF_WORKSPACE': 'live',
             },
             stdout=PIPE, stderr=PIPE
         )
@@ -240,6 +241,7 @@ class TestDeployCLI(unittest.TestCase):
                 'AWS_SECRET_ACCESS_KEY': aws_secret_access_key,
                 'AWS_SESSION_TOKEN': aws_session_token,
                 'AWS_DEFAULT_REGION': mock_assumed_session.region_name,
+                'TF_WORKSPACE': 'live',
             },
             cwd=workdir,
         )
@@ -282,6 +284,7 @@ class TestDeployCLI(unittest.TestCase):
                 'AWS_SECRET_ACCESS_KEY': aws_secret_access_key,
                 'AWS_SESSION_TOKEN': aws_session_token,
                 'AWS_DEFAULT_REGION': mock_assumed_session.region_name,
+                'TF_WORKSPACE': 'live',
             },
             stdout=PIPE, stderr=PIPE
         )
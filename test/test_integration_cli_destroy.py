@@ -17,8 +17,9 @@ from mock import ANY, MagicMock, Mock, patch
 BotoCreds = namedtuple('BotoCreds', ['access_key', 'secret_key', 'token'])
 
 
+@patch('cdflow_commands.release.download_file')
 @patch('cdflow_commands.secrets.credstash')
-@patch('cdflow_commands.cli.find_latest_release_version')
+@patch('cdflow_commands.release.find_latest_release_version')
 @patch('cdflow_commands.release.os')
 @patch('cdflow_commands.release.ZipFile')
 @patch('cdflow_commands.release.TemporaryDirectory')
@@ -28,22 +29,22 @@ BotoCreds = namedtuple('BotoCreds', ['access_key', 'secret_key', 'token'])
 @patch('cdflow_commands.destroy.time')
 @patch('cdflow_commands.destroy.NamedTemporaryFile')
 @patch('cdflow_commands.cli.rmtree')
-@patch('cdflow_commands.cli.Session')
+@patch('boto3.session.Session')
 @patch('cdflow_commands.config.Session')
 @patch('cdflow_commands.config.open')
 @patch('cdflow_commands.config.check_output')
 @patch('cdflow_commands.state.NamedTemporaryFile')
-@patch('cdflow_commands.state.check_output')
 @patch('cdflow_commands.state.check_call')
 @patch('cdflow_commands.state.atexit')
 class TestDestroyCLI(unittest.TestCase):
 
     def setup_mocks(
-        self, atexit, check_call_state, check_output_state,
+        self, atexit, check_call_state,
         NamedTemporaryFile_state, check_output, _open, Session_from_config,
         Session_from_cli, rmtree, NamedTemporaryFile_destroy, time,
         check_call_destroy, popen_call, mock_os_destroy, TemporaryDirectory,
         ZipFile, mock_os_release, mock_find_latest_release_version, credstash,
+        _download_file,
     ):
         mock_metadata_file = MagicMock(spec=TextIOWrapper)
         metadata = {
@@ -139,6 +140,7 @@ class TestDestroyCLI(unittest.TestCase):
         mock_s3_client.get_bucket_location.return_value = {
             'LocationConstraint': mock_assumed_session.region_name,
         }
+        mock_s3_client.list_objects_v2.return_value = {}
 
         mock_assumed_session.client.side_effect = (
             mock_s3_client, mock_db_client,
@@ -173,8 +175,6 @@ class TestDestroyCLI(unittest.TestCase):
         process_mock.configure_mock(**attrs)
         popen_call.return_value = process_mock
 
-        check_output_state.return_value = '* default'.encode('utf-8')
-
         return (
             check_call_state, check_call_destroy, popen_call,
             TemporaryDirectory, mock_assumed_session,
@@ -207,6 +207,7 @@ class TestDestroyCLI(unittest.TestCase):
                 join(workdir, INFRASTRUCTURE_DEFINITIONS_PATH),
             ],
             cwd=workdir,
+            env=ANY,
         )
 
         popen_call.assert_any_call(
@@ -228,7 +229,8 @@ class TestDestroyCLI(unittest.TestCase):
                 'AWS_ACCESS_KEY_ID': aws_access_key_id,
                 'AWS_SECRET_ACCESS_KEY': aws_secret_access_key,
                 'AWS_SESSION_TOKEN': aws_session_token,
-                'AWS_DEFAULT_REGION': mock_assumed_session.region_name
+                'AWS_DEFAULT_REGION': mock_assumed_session.region_name,
+                'TF_WORKSPACE': 'live',
             },
             stdout=PIPE, stderr=PIPE
         )
@@ -244,6 +246,7 @@ class TestDestroyCLI(unittest.TestCase):
                 'AWS_SECRET_ACCESS_KEY': aws_secret_access_key,
                 'AWS_SESSION_TOKEN': aws_session_token,
                 'AWS_DEFAULT_REGION': mock_assumed_session.region_name,
+                'TF_WORKSPACE': 'live',
             },
             cwd=workdir,
         )
@@ -287,6 +290,7 @@ class TestDestroyCLI(unittest.TestCase):
                 'AWS_SECRET_ACCESS_KEY': aws_secret_access_key,
                 'AWS_SESSION_TOKEN': aws_session_token,
                 'AWS_DEFAULT_REGION': mock_assumed_session.region_name,
+                'TF_WORKSPACE': 'live',
             },
             stdout=PIPE, stderr=PIPE
         )
@@ -4,20 +4,20 @@ from datetime import datetime
 from io import TextIOWrapper
 
 from cdflow_commands import cli
-from mock import MagicMock, Mock, mock_open, patch
+from mock import MagicMock, Mock, mock_open, patch, ANY
 import yaml
 
 
 @patch('cdflow_commands.release._copy_platform_config')
 @patch('cdflow_commands.cli.check_output')
 @patch('cdflow_commands.release.os')
-@patch('cdflow_commands.release.copytree')
+@patch('cdflow_commands.release.TreeLinker')
 @patch('cdflow_commands.release.check_call')
 @patch('cdflow_commands.release.make_archive')
 @patch('cdflow_commands.release.open', new_callable=mock_open, create=True)
 @patch('cdflow_commands.cli.os')
 @patch('cdflow_commands.cli.rmtree')
-@patch('cdflow_commands.cli.Session')
+@patch('boto3.session.Session')
 @patch('cdflow_commands.config.Session')
 @patch('cdflow_commands.config.open', new_callable=mock_open, create=True)
 @patch('cdflow_commands.config.check_output')
@@ -27,7 +27,7 @@ class TestReleaseCLI(unittest.TestCase):
     def test_release_is_configured_and_created(
         self, check_call, check_output, mock_open, Session_from_config,
         Session_from_cli, rmtree, mock_os, mock_open_release, make_archive,
-        check_call_release, copytree, mock_os_release, check_output_cli, _
+        check_call_release, TreeLinker, mock_os_release, check_output_cli, _
     ):
         mock_metadata_file = MagicMock(spec=TextIOWrapper)
         metadata = {
@@ -69,6 +69,11 @@ class TestReleaseCLI(unittest.TestCase):
         mock_root_session.resource.return_value = mock_s3_resource
 
         mock_ecr_client = Mock()
+        # Only the image pushed by this release is in ECR.
+        mock_ecr_client.batch_get_image.side_effect = \
+            lambda registryId, repositoryName, imageIds: {'images': [
+                {'imageManifest': '{}'},
+            ] if imageIds[0]['imageTag'] == '1.2.3' else []}
         mock_ecr_client.get_authorization_token.return_value = {
             'authorizationData': [
                 {
@@ -153,12 +158,13 @@ class TestReleaseCLI(unittest.TestCase):
             .upload_file.assert_called_once_with(
                 make_archive.return_value,
                 ExtraArgs={'Metadata': {'cdflow_image_digest': 'hash'}},
+                Config=ANY, Callback=ANY,
             )
 
     def test_release_uses_component_name_from_origin(
         self, check_call, check_output, mock_open, Session_from_config,
         Session_from_cli, rmtree, mock_os, mock_open_release, make_archive,
-        check_call_release, copytree, mock_os_release, check_output_cli, _
+        check_call_release, TreeLinker, mock_os_release, check_output_cli, _
     ):
         mock_metadata_file = MagicMock(spec=TextIOWrapper)
         metadata = {
@@ -200,6 +206,11 @@ class TestReleaseCLI(unittest.TestCase):
         mock_root_session.resource.return_value = mock_s3_resource
 
         mock_ecr_client = Mock()
+        # Only the image pushed by this release is in ECR.
+        mock_ecr_client.batch_get_image.side_effect = \
+            lambda registryId, repositoryName, imageIds: {'images': [
+                {'imageManifest': '{}'},
+            ] if imageIds[0]['imageTag'] == '1.2.3' else []}
         mock_ecr_client.get_authorization_token.return_value = {
             'authorizationData': [
                 {
@@ -278,4 +289,5 @@ class TestReleaseCLI(unittest.TestCase):
             .upload_file.assert_called_once_with(
                 make_archive.return_value,
                 ExtraArgs={'Metadata': {'cdflow_image_digest': 'hash'}},
+                Config=ANY, Callback=ANY,
             )
@@ -3,7 +3,7 @@ import unittest
 from datetime import datetime
 from io import TextIOWrapper
 
-from mock import MagicMock, Mock, mock_open, patch
+from mock import MagicMock, Mock, mock_open, patch, ANY
 import yaml
 
 from cdflow_commands import cli
@@ -13,21 +13,21 @@ class TestReleaseCLI(unittest.TestCase):
 
     @patch('cdflow_commands.release._copy_platform_config')
     @patch('cdflow_commands.release.os')
-    @patch('cdflow_commands.release.copytree')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.check_call')
     @patch('cdflow_commands.release.make_archive')
     @patch('cdflow_commands.release.open', new_callable=mock_open, create=True)
     @patch('cdflow_commands.cli.check_output')
     @patch('cdflow_commands.cli.os')
     @patch('cdflow_commands.cli.rmtree')
-    @patch('cdflow_commands.cli.Session')
+    @patch('boto3.session.Session')
     @patch('cdflow_commands.config.Session')
     @patch('cdflow_commands.config.open', new_callable=mock_open, create=True)
     @patch('cdflow_commands.config.check_output')
     def test_release_is_a_no_op(
         self, check_output, mock_open, Session_from_config, Session_from_cli,
         rmtree, mock_os, check_output_cli, mock_open_release, make_archive,
-        check_call_release, copytree, mock_os_release, _
+        check_call_release, TreeLinker, mock_os_release, _
     ):
         mock_metadata_file = MagicMock(spec=TextIOWrapper)
         metadata = {
@@ -114,4 +114,5 @@ class TestReleaseCLI(unittest.TestCase):
             return_value.upload_file.assert_called_once_with(
                 make_archive.return_value,
                 ExtraArgs={'Metadata': {'cdflow_image_digest': 'hash'}},
+                Config=ANY, Callback=ANY,
             )
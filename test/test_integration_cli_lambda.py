@@ -3,7 +3,8 @@ import json
 from io import TextIOWrapper
 from datetime import datetime
 
-from mock import Mock, MagicMock, patch, mock_open
+from botocore.exceptions import ClientError
+from mock import Mock, MagicMock, patch, mock_open, ANY
 import yaml
 
 from cdflow_commands import cli
@@ -13,24 +14,23 @@ class TestReleaseCLI(unittest.TestCase):
 
     @patch('cdflow_commands.release._copy_platform_config')
     @patch('cdflow_commands.cli.check_output')
-    @patch('cdflow_commands.plugins.aws_lambda.ZipFile')
-    @patch('cdflow_commands.plugins.aws_lambda.os')
+    @patch('cdflow_commands.plugins.aws_lambda.ZipStream')
     @patch('cdflow_commands.release.os')
-    @patch('cdflow_commands.release.copytree')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.check_call')
     @patch('cdflow_commands.release.make_archive')
     @patch('cdflow_commands.release.open', new_callable=mock_open, create=True)
     @patch('cdflow_commands.cli.os')
     @patch('cdflow_commands.cli.rmtree')
-    @patch('cdflow_commands.cli.Session')
+    @patch('boto3.session.Session')
     @patch('cdflow_commands.config.Session')
     @patch('cdflow_commands.config.open', new_callable=mock_open, create=True)
     @patch('cdflow_commands.config.check_output')
     def test_release_package_is_created(
         self, check_output, mock_open_config, Session_from_config,
         Session_from_cli, rmtree, mock_os, mock_open_release, make_archive,
-        check_call, copytree, mock_os_release, mock_os_lambda,
-        ZipFile, check_output_cli, _
+        check_call, TreeLinker, mock_os_release, ZipStream, check_output_cli,
+        _
     ):
         # Given
         mock_metadata_file = MagicMock(spec=TextIOWrapper)
@@ -78,6 +78,10 @@ class TestReleaseCLI(unittest.TestCase):
         Session_from_cli.return_value = mock_root_session
 
         mock_s3_client = Mock()
+        mock_s3_client.head_object.side_effect = ClientError(
+            {'Error': {'Code': '404'}}, 'HeadObject',
+        )
+        mock_s3_client.get_paginator.return_value.paginate.return_value = []
         mock_s3_client.list_buckets.return_value = {
             'Buckets': [],
             'Owner': {
@@ -126,10 +130,11 @@ class TestReleaseCLI(unittest.TestCase):
         ])
 
         # Then
-        mock_s3_client.upload_file.assert_called_once_with(
-            ZipFile.return_value.__enter__.return_value.filename,
+        mock_s3_client.upload_fileobj.assert_called_once_with(
+            ZipStream.return_value,
             'dummy-lambda-bucket',
-            'dummy-component/dummy-component-6.1.7.zip'
+            'dummy-component/dummy-component-6.1.7.zip',
+            ExtraArgs=ANY, Config=ANY, Callback=ANY,
         )
 
         mock_session.resource.return_value.Object.assert_called_once_with(
@@ -141,4 +146,5 @@ class TestReleaseCLI(unittest.TestCase):
             .upload_file.assert_called_once_with(
                 make_archive.return_value,
                 ExtraArgs={'Metadata': {'cdflow_image_digest': 'hash'}},
+                Config=ANY, Callback=ANY,
             )
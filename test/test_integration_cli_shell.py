@@ -1,3 +1,4 @@
+import os
 import unittest
 from unittest.mock import Mock, patch, MagicMock, ANY
 from io import TextIOWrapper
@@ -19,22 +20,21 @@ class creds:
 class TestCliShell(unittest.TestCase):
 
     @patch('cdflow_commands.cli.copy')
-    @patch('cdflow_commands.cli.copytree')
+    @patch('cdflow_commands.cli.link.TreeLinker')
     @patch('cdflow_commands.state.check_call')
     @patch('cdflow_commands.config.open')
-    @patch('cdflow_commands.cli.Session')
+    @patch('boto3.session.Session')
     @patch('cdflow_commands.config.Session')
     @patch('cdflow_commands.config.check_output')
     @patch('cdflow_commands.cli.os.getcwd')
     @patch('cdflow_commands.cli.os.chdir')
     @patch('cdflow_commands.state.NamedTemporaryFile')
-    @patch('cdflow_commands.state.check_output')
     @patch('cdflow_commands.state.atexit')
     @patch('cdflow_commands.cli.pty')
     def test_enters_shell(
-        self, pty, atexit, check_output_state, NamedTemporaryFile_state, chdir,
+        self, pty, atexit, NamedTemporaryFile_state, chdir,
         cli_getcwd, config_check_output, Session_from_config, Session_from_cli,
-        _open, check_call_state, copytree, copy
+        _open, check_call_state, TreeLinker, copy
     ):
         cli_getcwd.return_value = '/tmp/'
 
@@ -107,7 +107,10 @@ class TestCliShell(unittest.TestCase):
         mock_root_session.resource.return_value = mock_s3_resource
         Session_from_cli.return_value = mock_root_session
 
-        check_output_state.return_value = '* default\n  live'.encode('utf-8')
+        s3_client = Session_from_config.return_value.client.return_value
+        s3_client.list_objects_v2.return_value = {'Contents': [
+            {'Key': 'your-team/my-component/live/terraform.tfstate'},
+        ]}
 
         cli.run(['shell', 'live', '-v'])
 
@@ -119,15 +122,12 @@ class TestCliShell(unittest.TestCase):
                 ANY,
             ],
             cwd=ANY,
+            env=ANY,
         )
 
-        check_call_state.assert_any_call(
-            [
-                'terraform', 'workspace', 'select', 'live',
-                ANY,
-            ],
-            cwd=ANY,
-        )
+        check_call_state.assert_called_once()
+        assert check_call_state.call_args[1]['env']['TF_WORKSPACE'] == 'live'
+        assert os.environ['TF_WORKSPACE'] == 'live'
 
         pty.spawn.assert_called_once()
 
@@ -137,18 +137,18 @@ class TestCliShell(unittest.TestCase):
             RoleSessionName=ANY,
         )
 
+    @patch('cdflow_commands.release.download_file')
     @patch('cdflow_commands.cli.move')
     @patch('cdflow_commands.cli.copy')
-    @patch('cdflow_commands.cli.copytree')
+    @patch('cdflow_commands.cli.link.TreeLinker')
     @patch('cdflow_commands.state.check_call')
     @patch('cdflow_commands.config.open')
-    @patch('cdflow_commands.cli.Session')
+    @patch('boto3.session.Session')
     @patch('cdflow_commands.config.Session')
     @patch('cdflow_commands.config.check_output')
     @patch('cdflow_commands.cli.os.getcwd')
     @patch('cdflow_commands.cli.os.chdir')
     @patch('cdflow_commands.state.NamedTemporaryFile')
-    @patch('cdflow_commands.state.check_output')
     @patch('cdflow_commands.cli.pty')
     @patch('cdflow_commands.release.time')
     @patch('cdflow_commands.release.ZipFile')
@@ -156,9 +156,9 @@ class TestCliShell(unittest.TestCase):
     @patch('cdflow_commands.state.atexit')
     def test_finds_release_and_enters_shell(
         self, atexit, TemporaryDirectory, ZipFile, time, pty,
-        check_output_state, NamedTemporaryFile_state, cli_chdir, cli_getcwd,
+        NamedTemporaryFile_state, cli_chdir, cli_getcwd,
         config_check_output, Session_from_config, Session_from_cli, _open,
-        check_call_state, copytree, copy, move,
+        check_call_state, TreeLinker, copy, move, _download_file,
     ):
 
         cli_getcwd.return_value = '/tmp/my-component-1.2.3'
@@ -234,7 +234,10 @@ class TestCliShell(unittest.TestCase):
         mock_root_session.resource.return_value = mock_s3_resource
         Session_from_cli.return_value = mock_root_session
 
-        check_output_state.return_value = '* default\n  live'.encode('utf-8')
+        s3_client = Session_from_config.return_value.client.return_value
+        s3_client.list_objects_v2.return_value = {'Contents': [
+            {'Key': 'your-team/my-component/live/terraform.tfstate'},
+        ]}
 
         cli.run(['shell', 'live', '1.2.3'])
 
@@ -246,15 +249,12 @@ class TestCliShell(unittest.TestCase):
                 ANY,
             ],
             cwd=ANY,
+            env=ANY,
         )
 
-        check_call_state.assert_any_call(
-            [
-                'terraform', 'workspace', 'select', 'live',
-                ANY,
-            ],
-            cwd=ANY,
-        )
+        check_call_state.assert_called_once()
+        assert check_call_state.call_args[1]['env']['TF_WORKSPACE'] == 'live'
+        assert os.environ['TF_WORKSPACE'] == 'live'
 
         pty.spawn.assert_called_once()
 
@@ -0,0 +1,94 @@
+import errno
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from cdflow_commands.link import TreeLinker, copy, hardlink
+
+
+def unsupported(source, destination):
+    raise OSError(errno.EOPNOTSUPP, 'not supported')
+
+
+class TestTreeLinker(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.source = os.path.join(self.temp_dir.name, 'source')
+        self.destination = os.path.join(self.temp_dir.name, 'destination')
+        os.makedirs(os.path.join(self.source, 'infra', '.terraform'))
+        self.write('infra/main.tf', 'resource {}')
+        self.write('infra/.terraform/environment', 'live')
+        os.symlink('infra', os.path.join(self.source, 'link'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, relative_path, content):
+        with open(os.path.join(self.source, relative_path), 'w') as f:
+            f.write(content)
+
+    def same_file(self, relative_path):
+        return os.path.samefile(
+            os.path.join(self.source, relative_path),
+            os.path.join(self.destination, relative_path),
+        )
+
+    def test_tree_is_hardlinked(self):
+        # Given
+        linker = TreeLinker(methods=(hardlink, copy))
+
+        # When
+        linker.link_tree(self.source, self.destination)
+
+        # Then
+        assert self.same_file('infra/main.tf')
+        assert os.readlink(os.path.join(self.destination, 'link')) == 'infra'
+        assert linker.bytes_linked == len('resource {}') + len('live')
+        assert linker.bytes_copied == 0
+
+    def test_unsupported_methods_fall_back_to_copy(self):
+        # Given
+        linker = TreeLinker(methods=(unsupported, copy))
+
+        # When
+        linker.link_tree(self.source, self.destination)
+
+        # Then
+        assert not self.same_file('infra/main.tf')
+        with open(os.path.join(self.destination, 'infra/main.tf')) as f:
+            assert f.read() == 'resource {}'
+        assert linker.bytes_copied == len('resource {}') + len('live')
+
+    def test_files_that_must_be_copied_are_not_linked(self):
+        # Given
+        linker = TreeLinker(
+            methods=(hardlink, copy),
+            must_copy=lambda relative_path: relative_path.startswith(
+                'infra/.terraform/'
+            ),
+        )
+
+        # When
+        linker.link_tree(self.source, self.destination)
+
+        # Then
+        assert self.same_file('infra/main.tf')
+        assert not self.same_file('infra/.terraform/environment')
+        assert linker.bytes_copied == len('live')
+
+    def test_symlinks_can_be_followed(self):
+        # Given
+        linker = TreeLinker(methods=(hardlink, copy))
+
+        # When
+        linker.link_tree(self.source, self.destination, follow_symlinks=True)
+
+        # Then
+        link = os.path.join(self.destination, 'link')
+        assert not os.path.islink(link)
+        assert os.path.samefile(
+            os.path.join(self.source, 'infra/main.tf'),
+            os.path.join(link, 'main.tf'),
+        )
+        assert linker.bytes_linked == 2 * (len('resource {}') + len('live'))
@@ -0,0 +1,122 @@
+import os
+import unittest
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+from mock import patch
+
+from cdflow_commands import package
+from cdflow_commands.package import ZipStream, package_hash
+from test.helpers import write
+
+
+@patch.object(package, 'CHUNK_SIZE', 64)
+class TestZipStream(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.source_dir = os.path.join(self.temp_dir.name, 'src')
+        write(
+            os.path.join(self.source_dir, 'handler.py'),
+            b'def handler(event, context):\n    pass\n' * 50,
+        )
+        write(
+            os.path.join(self.source_dir, 'bin', 'tool'), os.urandom(1000),
+            0o755,
+        )
+        write(os.path.join(self.source_dir, 'assets', 'logo.png'), b'0' * 500)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_in_parts(self, stream, size):
+        data = b''
+        for part in iter(lambda: stream.read(size), b''):
+            assert len(part) <= size
+            data += part
+        return data
+
+    def test_stream_is_a_zip_of_the_source_directory(self):
+        # When
+        data = self.read_in_parts(ZipStream(self.source_dir, 6), 100)
+
+        # Then
+        with ZipFile(BytesIO(data)) as archive:
+            assert archive.testzip() is None
+            assert archive.namelist() == [
+                'handler.py', 'assets/logo.png', 'bin/tool',
+            ]
+            assert archive.read('handler.py') == \
+                b'def handler(event, context):\n    pass\n' * 50
+            assert archive.getinfo('bin/tool').external_attr >> 16 & 0o777 \
+                == 0o755
+
+    def test_already_compressed_files_are_stored(self):
+        # When
+        data = ZipStream(self.source_dir, 6).read()
+
+        # Then
+        with ZipFile(BytesIO(data)) as archive:
+            assert archive.getinfo('handler.py').compress_type == \
+                ZIP_DEFLATED
+            assert archive.getinfo('assets/logo.png').compress_type == \
+                ZIP_STORED
+
+    def test_nothing_is_written_to_disk(self):
+        # When
+        ZipStream(self.source_dir, 6).read()
+
+        # Then
+        assert sorted(os.listdir(self.temp_dir.name)) == ['src']
+        assert sorted(os.listdir(self.source_dir)) == [
+            'assets', 'bin', 'handler.py',
+        ]
+
+    def test_same_files_make_the_same_package(self):
+        # Given
+        first = ZipStream(self.source_dir, 6).read()
+        for dirpath, _, filenames in os.walk(self.source_dir):
+            for filename in filenames:
+                os.utime(os.path.join(dirpath, filename), (0, 0))
+        os.chmod(os.path.join(self.source_dir, 'handler.py'), 0o600)
+
+        # When
+        second = ZipStream(self.source_dir, 6).read()
+
+        # Then
+        assert first == second
+
+
+class TestPackageHash(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.source_dir = self.temp_dir.name
+        write(os.path.join(self.source_dir, 'handler.py'), b'pass\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_hash_is_stable(self):
+        assert package_hash(self.source_dir) == package_hash(self.source_dir)
+
+    def test_hash_changes_with_content(self):
+        # Given
+        before = package_hash(self.source_dir)
+
+        # When
+        write(os.path.join(self.source_dir, 'handler.py'), b'pass  \n')
+
+        # Then
+        assert package_hash(self.source_dir) != before
+
+    def test_hash_changes_when_file_becomes_executable(self):
+        # Given
+        before = package_hash(self.source_dir)
+
+        # When
+        os.chmod(os.path.join(self.source_dir, 'handler.py'), 0o755)
+
+        # Then
+        assert package_hash(self.source_dir) != before
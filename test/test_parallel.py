@@ -0,0 +1,77 @@
+import os
+import sys
+import unittest
+
+from mock import patch
+
+from cdflow_commands.exceptions import UserFacingError
+from cdflow_commands.parallel import run_in_parallel
+
+
+def printing(message):
+    def task():
+        print(message)
+        os.system(f'echo {message} from a subprocess')
+    return task
+
+
+def failing():
+    raise UserFacingError('it broke')
+
+
+def crashing():
+    raise Exception('unexpected')
+
+
+class TestRunInParallel(unittest.TestCase):
+
+    def setUp(self):
+        self.outputs = {}
+
+        def capture(label, output):
+            output.seek(0)
+            self.outputs[label] = output.read().decode('utf-8')
+            output.close()
+
+        patcher = patch(
+            'cdflow_commands.parallel._print_prefixed', side_effect=capture,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_output_of_each_task_is_captured_separately(self):
+        # When
+        failed = run_in_parallel(
+            [('a', printing('hello')), ('b', printing('goodbye'))], 2,
+        )
+
+        # Then
+        assert failed == []
+        assert self.outputs == {
+            'a': 'hello\nhello from a subprocess\n',
+            'b': 'goodbye\ngoodbye from a subprocess\n',
+        }
+
+    def test_failed_tasks_are_returned(self):
+        # When
+        failed = run_in_parallel(
+            [('a', printing('hello')), ('b', failing), ('c', failing)], 1,
+        )
+
+        # Then
+        assert failed == ['b', 'c']
+
+    def test_unexpected_errors_are_printed(self):
+        # When
+        failed = run_in_parallel([('a', crashing)], 1)
+
+        # Then
+        assert failed == ['a']
+        assert 'Exception: unexpected' in self.outputs['a']
+
+    def test_task_does_not_affect_parent(self):
+        # When
+        run_in_parallel([('a', lambda: sys.modules.clear())], 1)
+
+        # Then
+        assert 'cdflow_commands.parallel' in sys.modules
@@ -0,0 +1,134 @@
+import fcntl
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from mock import patch
+
+from cdflow_commands import plugin_cache
+from cdflow_commands.plugin_cache import PluginCache, plugins
+from test.helpers import write
+
+PROVIDER_PACKAGE = os.path.join(
+    'registry.terraform.io', 'hashicorp', 'aws', '3.0.0', 'linux_amd64',
+)
+
+
+class TestPluginCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        self.working_dir = os.path.join(self.temp_dir.name, 'release')
+        os.makedirs(self.cache_dir)
+        self.cache = PluginCache(self.cache_dir, 10)
+        self.cache.open()
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def download(self, plugin, content='plugin'):
+        # What terraform init does with a plugin cache: download into the
+        # cache if missing, then link from the working directory.
+        cached = os.path.join(self.cache_dir, plugin)
+        if not os.path.exists(cached):
+            write(cached, content)
+        installed = os.path.join(
+            self.working_dir, '.terraform', 'plugins', plugin,
+        )
+        os.makedirs(os.path.dirname(installed), exist_ok=True)
+        os.symlink(cached, installed)
+
+    def test_plugins_in_both_layouts_are_found(self):
+        # Given
+        write(os.path.join(
+            self.cache_dir, 'linux_amd64', 'terraform-provider-aws_v2',
+        ), 'aws')
+        write(os.path.join(
+            self.cache_dir, PROVIDER_PACKAGE, 'terraform-provider-aws',
+        ), 'aws3')
+
+        # When
+        found = plugins(self.cache_dir)
+
+        # Then
+        assert found == {
+            os.path.join('linux_amd64', 'terraform-provider-aws_v2'): 3,
+            PROVIDER_PACKAGE: 4,
+        }
+
+    def test_hits_and_misses_are_counted(self):
+        # Given
+        with self.cache.initialising(self.working_dir):
+            self.download('linux_amd64/terraform-provider-aws_v2')
+
+        # When
+        self.working_dir = os.path.join(self.temp_dir.name, 'other')
+        with self.cache.initialising(self.working_dir):
+            self.download('linux_amd64/terraform-provider-aws_v2')
+            self.download('linux_amd64/terraform-provider-null_v2')
+
+        # Then
+        assert (self.cache.hits, self.cache.misses) == (1, 2)
+
+    def test_least_recently_used_plugins_are_evicted(self):
+        # Given
+        for name, last_used in (('old', 1), ('new', 3), ('newer', 2)):
+            plugin = os.path.join(self.cache_dir, 'linux_amd64', name)
+            write(plugin, '123456')
+            os.utime(plugin, (last_used, last_used))
+
+        # When
+        self.cache.evict()
+
+        # Then
+        assert sorted(plugins(self.cache_dir)) == ['linux_amd64/new']
+
+    def test_plugins_are_not_evicted_while_another_process_uses_them(self):
+        # Given
+        write(os.path.join(self.cache_dir, 'linux_amd64', 'a'), '123456')
+        write(os.path.join(self.cache_dir, 'linux_amd64', 'b'), '123456')
+        other_process = open(os.path.join(self.cache_dir, 'in-use.lock'))
+        fcntl.flock(other_process.fileno(), fcntl.LOCK_SH)
+
+        # When
+        try:
+            self.cache.evict()
+        finally:
+            other_process.close()
+
+        # Then
+        assert len(plugins(self.cache_dir)) == 2
+
+
+class TestActivate(unittest.TestCase):
+
+    def setUp(self):
+        plugin_cache.set_max_size_mb(10)
+        self.environ = patch.dict(os.environ)
+        self.environ.start()
+        os.environ.pop(plugin_cache.PLUGIN_CACHE_ENV_VAR, None)
+
+    def tearDown(self):
+        plugin_cache.deactivate()
+        self.environ.stop()
+
+    def test_terraform_is_pointed_at_the_cache(self):
+        # When
+        plugin_cache.activate()
+
+        # Then
+        assert os.path.isdir(os.environ[plugin_cache.PLUGIN_CACHE_ENV_VAR])
+
+    def test_plugin_cache_configured_by_user_is_left_alone(self):
+        # Given
+        os.environ[plugin_cache.PLUGIN_CACHE_ENV_VAR] = '/users/cache'
+
+        # When
+        plugin_cache.activate()
+
+        # Then
+        assert os.environ[plugin_cache.PLUGIN_CACHE_ENV_VAR] == '/users/cache'
+        with plugin_cache.initialising('/path/to/release'):
+            pass
@@ -1,22 +1,30 @@
 from contextlib import ExitStack
 import datetime
+from glob import glob
 from io import TextIOWrapper
 import json
+import os
+from shutil import move
+from tempfile import TemporaryDirectory
 from string import ascii_letters, digits
 import unittest
-from zipfile import ZipInfo
 
 from hypothesis import given, settings
 from hypothesis.strategies import dictionaries, fixed_dictionaries, lists, text
-from mock import MagicMock, Mock, patch, ANY
+from mock import MagicMock, Mock, call, patch, ANY
 from moto import mock_s3
 from freezegun import freeze_time
 import boto3
+from botocore.exceptions import ClientError
 
+from cdflow_commands import release_cache
+from cdflow_commands.cache import cache_directory
+from cdflow_commands.link import LINK_METHODS
 from cdflow_commands.release import (
     fetch_release, find_latest_release_version, Release,
 )
 from cdflow_commands.constants import ACCOUNT_SCHEME_FILE
+from test.helpers import read
 
 
 ALNUM = ascii_letters + digits
@@ -71,7 +79,7 @@ class TestReleaseArchive(unittest.TestCase):
     @patch('cdflow_commands.release.open')
     @patch('cdflow_commands.release.make_archive')
     @patch('cdflow_commands.release.check_call')
-    @patch('cdflow_commands.release.copytree')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.TemporaryDirectory')
     @patch('cdflow_commands.release.getcwd')
     @patch('cdflow_commands.release.mkdir')
@@ -83,6 +91,7 @@ class TestReleaseArchive(unittest.TestCase):
         release_plugin = Mock()
         release_plugin.create.return_value = {}
         account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
         account_scheme.raw_scheme = {}
         release = Release(
             boto_session=Mock(),
@@ -116,16 +125,13 @@ class TestReleaseArchive(unittest.TestCase):
     @patch('cdflow_commands.release.open')
     @patch('cdflow_commands.release.check_call')
     @patch('cdflow_commands.release.make_archive')
-    @patch('cdflow_commands.release.copytree')
-    @patch('cdflow_commands.release.copyfile')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.isfile')
     @patch('cdflow_commands.release.makedirs')
-    @patch('cdflow_commands.release.isdir')
-    @patch('cdflow_commands.release.listdir')
     @patch('cdflow_commands.release.TemporaryDirectory')
     def test_platform_config_added_to_release_bundle(
-        self, TemporaryDirectory, listdir, isdir, makedirs, isfile,
-        copyfile, _1, _2, _3, _4, _5
+        self, TemporaryDirectory, makedirs, isfile, TreeLinker, _1, _2, _3,
+        _4
     ):
 
         # Given
@@ -137,7 +143,11 @@ class TestReleaseArchive(unittest.TestCase):
         ]
         release_data = ["ami_id=ami-a12345", "foo=bar"]
         account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
         account_scheme.raw_scheme = {}
+        account_scheme.deployable_account_regions = {
+            ('alias1', 'region-1'), ('alias3', 'region-2'),
+        }
         release = Release(
             boto_session=Mock(),
             release_bucket=ANY,
@@ -150,67 +160,84 @@ class TestReleaseArchive(unittest.TestCase):
         )
         temp_dir = 'test-temp-dir'
         TemporaryDirectory.return_value.__enter__.return_value = temp_dir
-        dirs = {
-            "test-platform-config-path-a": ["alias1", "alias2"],
-            "test-platform-config-path-b": ["alias3"],
-            "test-platform-config-path-a/alias1": ["1.json", "2.json"],
-            "test-platform-config-path-a/alias2": ["3.json"],
-            "test-platform-config-path-b/alias3": ["4.json", "5.json"],
+        files = {
+            'test-platform-config-path-a/alias1/region-1.json',
+            'test-platform-config-path-a/alias1/region-2.json',
+            'test-platform-config-path-a/alias2/region-1.json',
+            'test-platform-config-path-b/alias3/region-2.json',
         }
-        listdir.side_effect = lambda d: dirs[d]
-        isdir.side_effect = lambda d: d in dirs
-        isfile.return_value = True
+        isfile.side_effect = lambda f: f in files
 
         # When
         release.create(release_plugin)
 
         # Then
-        copyfile.assert_any_call(
-            'test-platform-config-path-a/alias1/1.json',
-            'test-temp-dir/dummy-component-dummy-version/'
-            'platform-config/alias1/1.json',
-        )
-        copyfile.assert_any_call(
-            'test-platform-config-path-a/alias1/2.json',
-            'test-temp-dir/dummy-component-dummy-version/'
-            'platform-config/alias1/2.json',
-        )
-        copyfile.assert_any_call(
-            'test-platform-config-path-a/alias2/3.json',
-            'test-temp-dir/dummy-component-dummy-version/'
-            'platform-config/alias2/3.json',
-        )
-        copyfile.assert_any_call(
-            'test-platform-config-path-b/alias3/4.json',
-            'test-temp-dir/dummy-component-dummy-version/'
-            'platform-config/alias3/4.json',
-        )
-        copyfile.assert_any_call(
-            'test-platform-config-path-b/alias3/5.json',
-            'test-temp-dir/dummy-component-dummy-version/'
-            'platform-config/alias3/5.json',
-        )
+        assert TreeLinker.return_value.link_file.call_args_list == [
+            call(
+                'test-platform-config-path-a/alias1/region-1.json',
+                'test-temp-dir/dummy-component-dummy-version/'
+                'platform-config/alias1/region-1.json',
+            ),
+            call(
+                'test-platform-config-path-b/alias3/region-2.json',
+                'test-temp-dir/dummy-component-dummy-version/'
+                'platform-config/alias3/region-2.json',
+            ),
+        ]
         makedirs.assert_any_call(
             'test-temp-dir/dummy-component-dummy-version/'
             'platform-config/alias1',
             exist_ok=True
         )
-        makedirs.assert_any_call(
-            'test-temp-dir/dummy-component-dummy-version/'
-            'platform-config/alias2',
-            exist_ok=True
-        )
         makedirs.assert_any_call(
             'test-temp-dir/dummy-component-dummy-version/'
             'platform-config/alias3',
             exist_ok=True
         )
 
+    @patch('cdflow_commands.release.mkdir')
+    @patch('cdflow_commands.release.open')
+    @patch('cdflow_commands.release.check_call')
+    @patch('cdflow_commands.release.make_archive')
+    @patch('cdflow_commands.release.TreeLinker')
+    @patch('cdflow_commands.release.isfile')
+    @patch('cdflow_commands.release.makedirs')
+    @patch('cdflow_commands.release.TemporaryDirectory')
+    def test_later_platform_config_paths_take_precedence(
+        self, TemporaryDirectory, makedirs, isfile, TreeLinker, _1, _2, _3,
+        _4
+    ):
+
+        # Given
+        account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
+        account_scheme.raw_scheme = {}
+        account_scheme.deployable_account_regions = {('alias1', 'region-1')}
+        release = Release(
+            boto_session=Mock(), release_bucket=ANY,
+            platform_config_paths=['path-a', 'path-b'],
+            release_data=[], commit='dummy', version='dummy-version',
+            component_name='dummy-component', team='dummy-team',
+            account_scheme=account_scheme, multi_region=False,
+        )
+        TemporaryDirectory.return_value.__enter__.return_value = 'temp-dir'
+        isfile.return_value = True
+
+        # When
+        release.create(Mock(**{'create.return_value': {}}))
+
+        # Then
+        TreeLinker.return_value.link_file.assert_called_once_with(
+            'path-b/alias1/region-1.json',
+            'temp-dir/dummy-component-dummy-version/'
+            'platform-config/alias1/region-1.json',
+        )
+
     @patch('cdflow_commands.release._copy_platform_config')
     @patch('cdflow_commands.release.mkdir')
     @patch('cdflow_commands.release.check_call')
     @patch('cdflow_commands.release.make_archive')
-    @patch('cdflow_commands.release.copytree')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.open')
     @patch('cdflow_commands.release.TemporaryDirectory')
     def test_account_scheme_added_to_release_bundle(
@@ -223,6 +250,7 @@ class TestReleaseArchive(unittest.TestCase):
         platform_config_paths = ['test-platform-config-path']
         release_data = ["ami_id=ami-a12345", "foo=bar"]
         account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
         account_scheme.raw_scheme = {"test": "scheme"}
         release = Release(
             boto_session=Mock(),
@@ -267,10 +295,10 @@ class TestReleaseArchive(unittest.TestCase):
     @patch('cdflow_commands.release.check_call')
     @patch('cdflow_commands.release.make_archive')
     @patch('cdflow_commands.release.os.path')
-    @patch('cdflow_commands.release.copytree')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.TemporaryDirectory')
     def test_app_config_added_to_release_bundle(
-        self, TemporaryDirectory, copytree, patch_path, _, _1, _2, _3, _4
+        self, TemporaryDirectory, TreeLinker, patch_path, _, _1, _2, _3, _4
     ):
 
         # Given
@@ -279,6 +307,7 @@ class TestReleaseArchive(unittest.TestCase):
         platform_config_paths = ['test-platform-config-path']
         release_data = ["ami_id=ami-a12345", "foo=bar"]
         account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
         account_scheme.raw_scheme = {}
         release = Release(
             boto_session=Mock(),
@@ -299,10 +328,11 @@ class TestReleaseArchive(unittest.TestCase):
         release.create(release_plugin)
 
         # Then
-        copytree.assert_any_call(
+        TreeLinker.return_value.link_tree.assert_any_call(
             'config', '{}/{}-{}/config'.format(
                 temp_dir, 'dummy-component', 'dummy-version'
-            )
+            ),
+            follow_symlinks=True,
         )
 
     @patch('cdflow_commands.release._copy_platform_config')
@@ -311,10 +341,10 @@ class TestReleaseArchive(unittest.TestCase):
     @patch('cdflow_commands.release.check_call')
     @patch('cdflow_commands.release.make_archive')
     @patch('cdflow_commands.release.os.path')
-    @patch('cdflow_commands.release.copytree')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.TemporaryDirectory')
     def test_app_config_add_skipped_to_release_bundle_if_not_existing(
-        self, TemporaryDirectory, copytree, patch_path, _, _1, _2, _3, _4
+        self, TemporaryDirectory, TreeLinker, patch_path, _, _1, _2, _3, _4
     ):
 
         # Given
@@ -323,6 +353,7 @@ class TestReleaseArchive(unittest.TestCase):
         platform_config_paths = ['test-platform-config-path']
         release_data = ["ami_id=ami-a12345", "foo=bar"]
         account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
         account_scheme.raw_scheme = {}
         release = Release(
             boto_session=Mock(),
@@ -343,20 +374,21 @@ class TestReleaseArchive(unittest.TestCase):
         release.create(release_plugin)
 
         # Then
-        for args, kwargs in copytree.call_args_list:
+        link_tree = TreeLinker.return_value.link_tree
+        for args, kwargs in link_tree.call_args_list:
             for arg in args:
                 self.assertNotEqual('config', arg)
-        self.assertEqual(copytree.call_count, 1)
+        self.assertEqual(link_tree.call_count, 1)
 
     @patch('cdflow_commands.release._copy_platform_config')
     @patch('cdflow_commands.release.mkdir')
     @patch('cdflow_commands.release.open')
     @patch('cdflow_commands.release.check_call')
     @patch('cdflow_commands.release.make_archive')
-    @patch('cdflow_commands.release.copytree')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.TemporaryDirectory')
     def test_infra_directory_added_to_release_bundle(
-        self, TemporaryDirectory, copytree, _, _1, _2, _3, _4
+        self, TemporaryDirectory, TreeLinker, _, _1, _2, _3, _4
     ):
 
         # Given
@@ -365,6 +397,7 @@ class TestReleaseArchive(unittest.TestCase):
         platform_config_paths = 'test-platform-config-path'
         release_data = ["ami_id=ami-a12345", "foo=bar"]
         account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
         account_scheme.raw_scheme = {}
         release = Release(
             boto_session=Mock(),
@@ -383,10 +416,11 @@ class TestReleaseArchive(unittest.TestCase):
         release.create(release_plugin)
 
         # Then
-        copytree.assert_any_call(
+        TreeLinker.return_value.link_tree.assert_any_call(
             'infra', '{}/{}-{}/infra'.format(
                 temp_dir, 'dummy-component', 'dummy-version'
-            )
+            ),
+            follow_symlinks=True,
         )
 
     @given(fixed_dictionaries({
@@ -407,6 +441,7 @@ class TestReleaseArchive(unittest.TestCase):
         temp_dir = fixtures['temp_dir']
         release_data = ["1234=2345"]
         account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
         account_scheme.raw_scheme = {}
 
         release_plugin = Mock()
@@ -428,7 +463,7 @@ class TestReleaseArchive(unittest.TestCase):
         with ExitStack() as stack:
             stack.enter_context(patch('cdflow_commands.release.mkdir'))
             stack.enter_context(patch('cdflow_commands.release.check_call'))
-            stack.enter_context(patch('cdflow_commands.release.copytree'))
+            stack.enter_context(patch('cdflow_commands.release.TreeLinker'))
             stack.enter_context(patch('cdflow_commands.release.make_archive'))
             stack.enter_context(
                 patch('cdflow_commands.release._copy_platform_config')
@@ -481,7 +516,7 @@ class TestReleaseArchive(unittest.TestCase):
     @patch('cdflow_commands.release._copy_platform_config')
     @patch('cdflow_commands.release.mkdir')
     @patch('cdflow_commands.release.check_call')
-    @patch('cdflow_commands.release.copytree')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.make_archive')
     @patch('cdflow_commands.release.TemporaryDirectory')
     @patch('cdflow_commands.release.open')
@@ -497,6 +532,7 @@ class TestReleaseArchive(unittest.TestCase):
         version = 'test-version'
         component_name = 'test-component'
         account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
         account_scheme.raw_scheme = {}
         release = Release(
             boto_session=Mock(),
@@ -533,12 +569,12 @@ class TestReleaseArchive(unittest.TestCase):
     @patch('cdflow_commands.release._copy_platform_config')
     @patch('cdflow_commands.release.mkdir')
     @patch('cdflow_commands.release.check_call')
-    @patch('cdflow_commands.release.copytree')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.make_archive')
     @patch('cdflow_commands.release.TemporaryDirectory')
     @patch('cdflow_commands.release.open')
     def test_create_uploads_archive(
-        self, mock_open, TemporaryDirectory, make_archive, copytree,
+        self, mock_open, TemporaryDirectory, make_archive, TreeLinker,
         check_call, mkdir, _
     ):
         # Given
@@ -551,6 +587,7 @@ class TestReleaseArchive(unittest.TestCase):
         release_bucket = 'test-release-bucket'
         mock_session = Mock()
         account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
         account_scheme.raw_scheme = {}
         account_scheme.classic_metadata_handling = True
         team_name = 'dummy-team'
@@ -585,6 +622,7 @@ class TestReleaseArchive(unittest.TestCase):
             ExtraArgs={'Metadata': {
                 'cdflow_image_digest': 'hash',
             }},
+            Config=ANY, Callback=ANY,
         )
         Object.assert_called_once_with(
             release_bucket, f'{component_name}/{component_name}-{version}.zip',
@@ -593,12 +631,12 @@ class TestReleaseArchive(unittest.TestCase):
     @patch('cdflow_commands.release._copy_platform_config')
     @patch('cdflow_commands.release.mkdir')
     @patch('cdflow_commands.release.check_call')
-    @patch('cdflow_commands.release.copytree')
+    @patch('cdflow_commands.release.TreeLinker')
     @patch('cdflow_commands.release.make_archive')
     @patch('cdflow_commands.release.TemporaryDirectory')
     @patch('cdflow_commands.release.open')
     def test_create_uploads_archive_to_release_account(
-        self, mock_open, TemporaryDirectory, make_archive, copytree,
+        self, mock_open, TemporaryDirectory, make_archive, TreeLinker,
         check_call, mkdir, _
     ):
         # Given
@@ -611,6 +649,7 @@ class TestReleaseArchive(unittest.TestCase):
         release_bucket = 'test-release-bucket'
         mock_session = Mock()
         account_scheme = Mock()
+        account_scheme.release_replica_buckets = {}
         account_scheme.raw_scheme = {}
         account_scheme.classic_metadata_handling = False
         team_name = 'dummy-team'
@@ -645,11 +684,81 @@ class TestReleaseArchive(unittest.TestCase):
             ExtraArgs={'Metadata': {
                 'cdflow_image_digest': 'hash',
             }},
+            Config=ANY, Callback=ANY,
         )
         Object.assert_called_once_with(
             release_bucket,
             f'{team_name}/{component_name}/{component_name}-{version}.zip',
         )
+        mock_session.client.return_value.put_object.assert_called_once_with(
+            Bucket=release_bucket,
+            Key=f'{team_name}/{component_name}/latest.json',
+            Body=json.dumps({
+                'version': version,
+                'key': (
+                    f'{team_name}/{component_name}/'
+                    f'{component_name}-{version}.zip'
+                ),
+            }).encode('utf-8'),
+            ContentType='application/json',
+        )
+
+    @patch('cdflow_commands.release._copy_platform_config')
+    @patch('cdflow_commands.release.mkdir')
+    @patch('cdflow_commands.release.check_call')
+    @patch('cdflow_commands.release.TreeLinker')
+    @patch('cdflow_commands.release.make_archive')
+    @patch('cdflow_commands.release.TemporaryDirectory')
+    @patch('cdflow_commands.release.open')
+    def test_create_copies_archive_to_regional_release_buckets(
+        self, mock_open, TemporaryDirectory, make_archive, TreeLinker,
+        check_call, mkdir, _
+    ):
+        # Given
+        mock_session = Mock()
+        account_scheme = Mock()
+        account_scheme.raw_scheme = {}
+        account_scheme.classic_metadata_handling = False
+        account_scheme.release_replica_buckets = {
+            'us-east-1': 'release-bucket-us-east-1',
+            'ap-southeast-2': 'release-bucket-ap-southeast-2',
+        }
+        release = Release(
+            boto_session=mock_session, release_bucket='release-bucket',
+            platform_config_paths=[], release_data=[], commit='commit',
+            version='1', component_name='component', team='team',
+            account_scheme=account_scheme, multi_region=False,
+        )
+        TemporaryDirectory.return_value.__enter__.return_value = 'temp-dir'
+        mock_open.return_value.__enter__.return_value = MagicMock(
+            spec=TextIOWrapper,
+        )
+
+        # When
+        release.create(Mock(**{'create.return_value': {}}))
+
+        # Then
+        mock_session.client.assert_any_call('s3', region_name='us-east-1')
+        mock_session.client.assert_any_call(
+            's3', region_name='ap-southeast-2',
+        )
+        copy = mock_session.client.return_value.copy
+        for bucket in (
+            'release-bucket-us-east-1', 'release-bucket-ap-southeast-2',
+        ):
+            copy.assert_any_call(
+                {
+                    'Bucket': 'release-bucket',
+                    'Key': 'team/component/component-1.zip',
+                },
+                bucket, 'team/component/component-1.zip',
+                ExtraArgs={
+                    'Metadata': {'cdflow_image_digest': 'hash'},
+                    'MetadataDirective': 'REPLACE',
+                },
+                SourceClient=mock_session.client.return_value, Config=ANY,
+            )
+        assert copy.call_count == 2
 
 
 class TestFetchRelease(unittest.TestCase):
@@ -671,32 +780,24 @@ class TestFetchRelease(unittest.TestCase):
         version = fixtures['version']
         boto_session = Mock()
 
-        mock_object = Mock()
-        boto_session.resource.return_value.Object.return_value = mock_object
-
         with ExitStack() as stack:
             ZipFile = stack.enter_context(
                 patch('cdflow_commands.release.ZipFile')
             )
-            BytesIO = stack.enter_context(
-                patch('cdflow_commands.release.BytesIO')
+            download_file = stack.enter_context(
+                patch('cdflow_commands.release.download_file')
             )
             getcwd = stack.enter_context(
                 patch('cdflow_commands.release.getcwd')
             )
-            chmod = stack.enter_context(
-                patch('cdflow_commands.release.chmod')
+            extract_archive = stack.enter_context(
+                patch('cdflow_commands.release.extract_archive')
             )
             TemporaryDirectory = stack.enter_context(
                 patch('cdflow_commands.release.TemporaryDirectory')
             )
             time = stack.enter_context(patch('cdflow_commands.release.time'))
 
-            mock_zipinfo = MagicMock(spec=ZipInfo)
-            file_perm = 1000
-            mock_zipinfo.external_attr = file_perm << 16
-            ZipFile.return_value.infolist.return_value = [mock_zipinfo]
-
             with fetch_release(
                 boto_session, account_scheme, team_name,
                 component_name, version,
@@ -706,29 +807,22 @@ class TestFetchRelease(unittest.TestCase):
                     getcwd.return_value, time.return_value,
                 ))
 
-            boto_session.resource.return_value.Object.assert_called_once_with(
+            download_file.assert_called_once_with(
+                boto_session.client.return_value,
                 release_bucket,
                 f'{component_name}/{component_name}-{version}.zip',
+                ANY,
             )
+            download_path = download_file.call_args[0][3]
 
-            mock_object.download_fileobj.assert_called_once_with(
-                BytesIO.return_value
-            )
+            ZipFile.assert_called_once_with(download_path)
+            ZipFile.return_value.close.assert_called_once_with()
 
-            ZipFile.assert_called_once_with(BytesIO.return_value)
-
-            ZipFile.return_value.infolist.assert_called_once_with()
-
-            ZipFile.return_value.extract.assert_called_once_with(
-                mock_zipinfo.filename,
+            extract_archive.assert_called_once_with(
+                ZipFile.return_value,
                 TemporaryDirectory.return_value.__enter__.return_value,
             )
 
-            chmod.assert_called_once_with(
-                ZipFile.return_value.extract.return_value,
-                file_perm,
-            )
-
     @given(fixed_dictionaries({
         'release_bucket': text(alphabet=ALNUM),
         'version': text(alphabet=ALNUM),
@@ -746,32 +840,24 @@ class TestFetchRelease(unittest.TestCase):
         version = fixtures['version']
         boto_session = Mock()
 
-        mock_object = Mock()
-        boto_session.resource.return_value.Object.return_value = mock_object
-
         with ExitStack() as stack:
             ZipFile = stack.enter_context(
                 patch('cdflow_commands.release.ZipFile')
             )
-            BytesIO = stack.enter_context(
-                patch('cdflow_commands.release.BytesIO')
+            download_file = stack.enter_context(
+                patch('cdflow_commands.release.download_file')
             )
             getcwd = stack.enter_context(
                 patch('cdflow_commands.release.getcwd')
             )
-            chmod = stack.enter_context(
-                patch('cdflow_commands.release.chmod')
+            extract_archive = stack.enter_context(
+                patch('cdflow_commands.release.extract_archive')
             )
             TemporaryDirectory = stack.enter_context(
                 patch('cdflow_commands.release.TemporaryDirectory')
             )
             time = stack.enter_context(patch('cdflow_commands.release.time'))
 
-            mock_zipinfo = MagicMock(spec=ZipInfo)
-            file_perm = 1000
-            mock_zipinfo.external_attr = file_perm << 16
-            ZipFile.return_value.infolist.return_value = [mock_zipinfo]
-
             with fetch_release(
                 boto_session, account_scheme, team_name,
                 component_name, version,
@@ -781,28 +867,220 @@ class TestFetchRelease(unittest.TestCase):
                     getcwd.return_value, time.return_value,
                 ))
 
-            boto_session.resource.return_value.Object.assert_called_once_with(
+            download_file.assert_called_once_with(
+                boto_session.client.return_value,
                 release_bucket,
                 f'{team_name}/{component_name}/{component_name}-{version}.zip',
+                ANY,
             )
+            download_path = download_file.call_args[0][3]
+
+            ZipFile.assert_called_once_with(download_path)
+            ZipFile.return_value.close.assert_called_once_with()
 
-            mock_object.download_fileobj.assert_called_once_with(
-                BytesIO.return_value
+            extract_archive.assert_called_once_with(
+                ZipFile.return_value,
+                TemporaryDirectory.return_value.__enter__.return_value,
             )
 
-            ZipFile.assert_called_once_with(BytesIO.return_value)
+    def test_release_is_materialised_from_release_cache(self):
+        account_scheme = Mock()
+        account_scheme.classic_metadata_handling = False
+        account_scheme.release_bucket = 'release-bucket'
+        boto_session = Mock()
+        boto_session.client.return_value.head_object.return_value = {
+            'ETag': '"etag"',
+        }
 
-            ZipFile.return_value.infolist.assert_called_once_with()
+        with ExitStack() as stack:
+            release_cache = stack.enter_context(
+                patch('cdflow_commands.release.release_cache')
+            )
+            release_cache.is_enabled.return_value = True
+            download_file = stack.enter_context(
+                patch('cdflow_commands.release.download_file')
+            )
 
-            ZipFile.return_value.extract.assert_called_once_with(
-                mock_zipinfo.filename,
-                TemporaryDirectory.return_value.__enter__.return_value,
+            with fetch_release(
+                boto_session, account_scheme, 'team', 'component', '1',
+            ) as path_to_release:
+                pass
+
+            boto_session.client.return_value.head_object \
+                .assert_called_once_with(
+                    Bucket='release-bucket',
+                    Key='team/component/component-1.zip',
+                )
+            release_cache.ReleaseCache.create.return_value.materialise \
+                .assert_called_once_with(
+                    'release-bucket/team/component/component-1.zip',
+                    '"etag"', path_to_release, ANY, LINK_METHODS,
+                )
+            download_file.assert_not_called()
+
+    def test_edits_to_editable_release_do_not_reach_release_cache(self):
+        # Given
+        account_scheme = Mock()
+        account_scheme.classic_metadata_handling = False
+        account_scheme.release_bucket = 'release-bucket'
+        account_scheme.release_storage = 'archive'
+        boto_session = Mock()
+        boto_session.client.return_value.head_object.return_value = {
+            'ETag': '"etag"',
+        }
+        modules = os.path.join('.terraform', 'modules', 'modules.json')
+
+        def extract(boto_session, bucket, key, destination, region_name):
+            filepath = os.path.join(destination, 'component-1', modules)
+            os.makedirs(os.path.dirname(filepath))
+            with open(filepath, 'w') as f:
+                f.write('{}')
+
+        release_cache.set_max_size_mb(1024)
+
+        with TemporaryDirectory() as working_directory, patch(
+            'cdflow_commands.release.download_and_extract_release',
+            side_effect=extract,
+        ):
+            # When
+            with fetch_release(
+                boto_session, account_scheme, 'team', 'component', '1',
+                editable=True,
+            ) as path_to_release:
+                # As cdflow shell moves the release into its working
+                # directory, where it is edited in place.
+                move(
+                    os.path.join(path_to_release, 'component-1', '.terraform'),
+                    working_directory,
+                )
+                with open(os.path.join(working_directory, modules), 'r+') as f:
+                    f.write('[]')
+
+        # Then
+        cached = glob(os.path.join(
+            cache_directory(release_cache.CACHE_NAME), '*', 'component-1',
+            modules,
+        ))
+        assert len(cached) == 1
+        assert read(cached[0]) == '{}'
+
+    def test_content_addressed_release_is_rebuilt_from_manifest(self):
+        account_scheme = Mock()
+        account_scheme.classic_metadata_handling = False
+        account_scheme.release_bucket = 'release-bucket'
+        account_scheme.release_storage = 'content-addressed'
+        boto_session = Mock()
+        s3_client = boto_session.client.return_value
+
+        with ExitStack() as stack:
+            download_tree = stack.enter_context(
+                patch('cdflow_commands.release.download_tree')
+            )
+            download_file = stack.enter_context(
+                patch('cdflow_commands.release.download_file')
             )
 
-            chmod.assert_called_once_with(
-                ZipFile.return_value.extract.return_value,
-                file_perm,
+            with fetch_release(
+                boto_session, account_scheme, 'team', 'component', '1',
+            ) as path_to_release:
+                pass
+
+            s3_client.head_object.assert_called_once_with(
+                Bucket='release-bucket',
+                Key='team/component/component-1.manifest.json',
             )
+            download_tree.assert_called_once_with(
+                s3_client, 'release-bucket', 'team/component/blobs/',
+                'team/component/component-1.manifest.json', path_to_release,
+            )
+            download_file.assert_not_called()
+
+    def test_content_addressed_fetch_falls_back_to_archive(self):
+        account_scheme = Mock()
+        account_scheme.classic_metadata_handling = False
+        account_scheme.release_bucket = 'release-bucket'
+        account_scheme.release_storage = 'content-addressed'
+        boto_session = Mock()
+        boto_session.client.return_value.head_object.side_effect = \
+            ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+
+        with ExitStack() as stack:
+            download_tree = stack.enter_context(
+                patch('cdflow_commands.release.download_tree')
+            )
+            download_and_extract_release = stack.enter_context(
+                patch('cdflow_commands.release.download_and_extract_release')
+            )
+
+            with fetch_release(
+                boto_session, account_scheme, 'team', 'component', '1',
+            ) as path_to_release:
+                pass
+
+            download_tree.assert_not_called()
+            download_and_extract_release.assert_called_once_with(
+                boto_session, 'release-bucket',
+                'team/component/component-1.zip', path_to_release,
+                region_name=None,
+            )
+
+    def test_release_is_fetched_from_closest_release_bucket(self):
+        account_scheme = Mock()
+        account_scheme.classic_metadata_handling = False
+        account_scheme.release_bucket = 'release-bucket'
+        account_scheme.release_storage = 'archive'
+        account_scheme.release_bucket_for_region.return_value = (
+            'release-bucket-us-east-1', 'us-east-1',
+        )
+        boto_session = Mock()
+
+        with patch(
+            'cdflow_commands.release.download_and_extract_release'
+        ) as download_and_extract_release:
+            with fetch_release(
+                boto_session, account_scheme, 'team', 'component', '1',
+                'us-west-2',
+            ) as path_to_release:
+                pass
+
+        account_scheme.release_bucket_for_region.assert_called_once_with(
+            'us-west-2',
+        )
+        boto_session.client.assert_any_call('s3', region_name='us-east-1')
+        download_and_extract_release.assert_called_once_with(
+            boto_session, 'release-bucket-us-east-1',
+            'team/component/component-1.zip', path_to_release,
+            region_name='us-east-1',
+        )
+
+    def test_release_missing_from_closest_bucket_is_fetched_from_primary(
+        self,
+    ):
+        account_scheme = Mock()
+        account_scheme.classic_metadata_handling = False
+        account_scheme.release_bucket = 'release-bucket'
+        account_scheme.release_storage = 'archive'
+        account_scheme.release_bucket_for_region.return_value = (
+            'release-bucket-us-east-1', 'us-east-1',
+        )
+        boto_session = Mock()
+        boto_session.client.return_value.head_object.side_effect = \
+            ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+
+        with patch(
+            'cdflow_commands.release.download_and_extract_release'
+        ) as download_and_extract_release:
+            with fetch_release(
+                boto_session, account_scheme, 'team', 'component', '1',
+                'us-west-2',
+            ) as path_to_release:
+                pass
+
+        download_and_extract_release.assert_called_once_with(
+            boto_session, 'release-bucket',
+            'team/component/component-1.zip', path_to_release,
+            region_name=None,
+        )
 
 
 class TestFindLatestReleaseVersion(unittest.TestCase):
@@ -886,3 +1164,30 @@ class TestFindLatestReleaseVersion(unittest.TestCase):
             )
 
             assert found_version == latest_version
+
+    def test_latest_release_pointer_is_read_without_listing(self):
+        account_scheme = Mock()
+        account_scheme.classic_metadata_handling = False
+        account_scheme.release_bucket = 'bucket'
+
+        with mock_s3():
+            s3 = boto3.resource('s3')
+            bucket = s3.create_bucket(Bucket='bucket')
+            bucket.put_object(Key='team/component/component-1.zip')
+            bucket.put_object(
+                Key='team/component/latest.json',
+                Body=json.dumps({
+                    'version': '2',
+                    'key': 'team/component/component-2.zip',
+                }),
+            )
+
+            with patch(
+                'cdflow_commands.release._list_latest_release_version'
+            ) as list_latest_release_version:
+                found_version = find_latest_release_version(
+                    boto3, account_scheme, 'team', 'component',
+                )
+
+            assert found_version == '2'
+            list_latest_release_version.assert_not_called()
@@ -0,0 +1,157 @@
+import json
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from cdflow_commands.cache import file_lock
+from cdflow_commands.release_cache import ReleaseCache, must_copy
+from test.helpers import read
+
+
+def populate_with(files):
+    calls = []
+
+    def populate(directory):
+        calls.append(directory)
+        for relative_path, content in files.items():
+            filepath = os.path.join(directory, relative_path)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, 'w') as f:
+                f.write(content)
+
+    populate.calls = calls
+    return populate
+
+
+class TestReleaseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        os.makedirs(self.cache_dir)
+        self.release_cache = ReleaseCache(self.cache_dir, 1024)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def destination(self, name):
+        destination = os.path.join(self.temp_dir.name, name)
+        os.makedirs(destination)
+        return destination
+
+    def metadata_files(self):
+        return sorted(
+            filename for filename in os.listdir(self.cache_dir)
+            if filename.endswith('.json')
+        )
+
+    def test_release_is_populated_once(self):
+        # Given
+        populate = populate_with({'infra/main.tf': 'resource {}'})
+
+        # When
+        for name in ('first', 'second'):
+            self.release_cache.materialise(
+                'bucket/release.zip', '"etag"', self.destination(name),
+                populate,
+            )
+
+        # Then
+        assert len(populate.calls) == 1
+        for name in ('first', 'second'):
+            assert read(
+                os.path.join(self.temp_dir.name, name, 'infra', 'main.tf')
+            ) == 'resource {}'
+        with open(os.path.join(
+            self.cache_dir, self.metadata_files()[0],
+        )) as f:
+            assert json.load(f) == {
+                'release_key': 'bucket/release.zip',
+                'etag': '"etag"',
+                'size': len('resource {}'),
+            }
+
+    def test_changed_etag_is_a_miss(self):
+        # Given
+        old = populate_with({'file': 'old'})
+        new = populate_with({'file': 'new'})
+        self.release_cache.materialise(
+            'bucket/release.zip', '"old"', self.destination('old'), old,
+        )
+
+        # When
+        destination = self.destination('new')
+        self.release_cache.materialise(
+            'bucket/release.zip', '"new"', destination, new,
+        )
+
+        # Then
+        assert len(new.calls) == 1
+        assert read(os.path.join(destination, 'file')) == 'new'
+
+    def test_failed_population_is_not_cached(self):
+        # Given
+        def populate(directory):
+            raise Exception('download failed')
+
+        # When
+        with self.assertRaises(Exception):
+            self.release_cache.materialise(
+                'bucket/release.zip', '"etag"', self.destination('release'),
+                populate,
+            )
+
+        # Then
+        assert self.metadata_files() == []
+        assert not any(
+            os.path.isdir(os.path.join(self.cache_dir, filename))
+            for filename in os.listdir(self.cache_dir)
+        )
+
+    def test_least_recently_used_release_is_evicted(self):
+        # Given
+        release_cache = ReleaseCache(self.cache_dir, 1000)
+        for name in ('a', 'b', 'c'):
+            release_cache.materialise(
+                f'bucket/{name}.zip', '"etag"', self.destination(name),
+                populate_with({'file': name * 400}),
+            )
+
+        # Then
+        assert len(self.metadata_files()) == 2
+
+        # When
+        populate = populate_with({'file': 'a' * 400})
+        release_cache.materialise(
+            'bucket/a.zip', '"etag"', self.destination('a-again'), populate,
+        )
+        assert len(populate.calls) == 1
+
+    def test_release_in_use_is_not_evicted(self):
+        # Given
+        release_cache = ReleaseCache(self.cache_dir, 0)
+        populate = populate_with({'file': 'content'})
+        release_cache.materialise(
+            'bucket/a.zip', '"etag"', self.destination('a'), populate,
+        )
+        assert self.metadata_files() == []
+        release_cache = ReleaseCache(self.cache_dir, 1024)
+        release_cache.materialise(
+            'bucket/a.zip', '"etag"', self.destination('b'), populate,
+        )
+        entry = self.metadata_files()[0][:-len('.json')]
+
+        # When
+        with file_lock(
+            os.path.join(self.cache_dir, f'{entry}.lock'), shared=True,
+        ):
+            ReleaseCache(self.cache_dir, 0).evict()
+
+        # Then
+        assert self.metadata_files() == [f'{entry}.json']
+
+    def test_terraform_state_files_are_copied(self):
+        assert must_copy('.terraform/terraform.tfstate')
+        assert must_copy('.terraform/environment')
+        assert not must_copy('.terraform/plugins/linux_amd64/provider')
+        assert not must_copy('infra/main.tf')
@@ -5,7 +5,9 @@ from boto3.session import Session
 from botocore.exceptions import ClientError
 from cdflow_commands.secrets import get_secrets
 from hypothesis import assume, given
-from hypothesis.strategies import dictionaries, fixed_dictionaries, text
+from hypothesis.strategies import (
+    dictionaries, fixed_dictionaries, sampled_from, text
+)
 from mock import patch
 
 CALL_KWARGS = 2
@@ -31,7 +33,9 @@ class TestGetBuildSecretsFromCredstash(unittest.TestCase):
             alphabet=printable, min_size=40, max_size=40
         ),
         'session_token': text(alphabet=printable, min_size=20, max_size=20),
-        'aws_region': text(alphabet=printable, min_size=5, max_size=12),
+        'aws_region': sampled_from([
+            'eu-west-1', 'eu-central-1', 'us-east-1', 'ap-southeast-2',
+        ]),
         'env': dictionaries(
             keys=text(alphabet=printable), values=text(alphabet=printable)
         )
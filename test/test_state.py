@@ -889,10 +889,6 @@ class TestTerraformBackendConfig(unittest.TestCase):
 
             mock_file = MagicMock(spec=BufferedRandom)
             NamedTemporaryFile.return_value.__enter__.return_value = mock_file
-            check_output = stack.enter_context(
-                patch('cdflow_commands.state.check_output')
-            )
-            check_output.return_value = '* default'.encode('utf-8')
 
             state = terraform_state(
                 base_directory, sub_directory, boto_session,
@@ -937,10 +933,6 @@ class TestTerraformBackendConfig(unittest.TestCase):
             check_call = stack.enter_context(
                 patch('cdflow_commands.state.check_call')
             )
-            check_output = stack.enter_context(
-                patch('cdflow_commands.state.check_output')
-            )
-            check_output.return_value = '* default'.encode('utf-8')
 
             state = terraform_state(
                 base_directory, sub_directory, boto_session,
@@ -968,6 +960,7 @@ class TestTerraformBackendConfig(unittest.TestCase):
                 join(base_directory, sub_directory),
             ],
             cwd=base_directory,
+            env=ANY,
         )
 
     @given(terraform_backend_input)
@@ -994,10 +987,6 @@ class TestTerraformBackendConfig(unittest.TestCase):
             check_call = stack.enter_context(
                 patch('cdflow_commands.state.check_call')
             )
-            check_output = stack.enter_context(
-                patch('cdflow_commands.state.check_output')
-            )
-            check_output.return_value = '* default'.encode('utf-8')
 
             state = terraform_state(
                 base_directory, sub_directory, boto_session,
@@ -1025,6 +1014,7 @@ class TestTerraformBackendConfig(unittest.TestCase):
                 join(base_directory, sub_directory),
             ],
             cwd=base_directory,
+            env=ANY,
         )
 
     @given(terraform_backend_input)
@@ -1051,10 +1041,6 @@ class TestTerraformBackendConfig(unittest.TestCase):
             check_call = stack.enter_context(
                 patch('cdflow_commands.state.check_call')
             )
-            check_output = stack.enter_context(
-                patch('cdflow_commands.state.check_output')
-            )
-            check_output.return_value = '* default'.encode('utf-8')
 
             state = terraform_state(
                 base_directory, sub_directory, boto_session,
@@ -1063,6 +1049,13 @@ class TestTerraformBackendConfig(unittest.TestCase):
             )
             state.init()
 
+        s3_client = boto_session.client.return_value
+        s3_client.list_objects_v2.assert_called_once_with(
+            Bucket=bucket_name, Prefix=(
+                f'{team_name}/{component_name}/{environment_name}/'
+                f'{tfstate_filename}'
+            ),
+        )
         check_call.assert_any_call(
             [
                 'terraform', 'workspace',
@@ -1070,10 +1063,15 @@ class TestTerraformBackendConfig(unittest.TestCase):
                 join(base_directory, sub_directory),
             ],
             cwd=base_directory,
+            env=ANY,
         )
+        init_env = check_call.call_args_list[0][1]['env']
+        assert 'TF_WORKSPACE' not in init_env
 
     @given(terraform_backend_input)
-    def test_exiting_workspace_is_selected(self, terraform_backend_input):
+    def test_existing_workspace_is_selected_with_environment_variable(
+        self, terraform_backend_input,
+    ):
         base_directory = terraform_backend_input['base_directory']
         sub_directory = terraform_backend_input['sub_directory']
         bucket_name = terraform_backend_input['bucket_name']
@@ -1096,13 +1094,12 @@ class TestTerraformBackendConfig(unittest.TestCase):
             check_call = stack.enter_context(
                 patch('cdflow_commands.state.check_call')
             )
-            check_output = stack.enter_context(
-                patch('cdflow_commands.state.check_output')
-            )
-
-            check_output.return_value = (
-                f'* default\n  {environment_name}\n\n'.encode('utf-8')
-            )
+            boto_session.client.return_value.list_objects_v2.return_value = {
+                'Contents': [{'Key': (
+                    f'{team_name}/{component_name}/{environment_name}/'
+                    f'{tfstate_filename}'
+                )}],
+            }
 
             state = terraform_state(
                 base_directory, sub_directory, boto_session,
@@ -1111,14 +1108,10 @@ class TestTerraformBackendConfig(unittest.TestCase):
             )
             state.init()
 
-        check_call.assert_any_call(
-            [
-                'terraform', 'workspace',
-                'select', environment_name,
-                join(base_directory, sub_directory),
-            ],
-            cwd=base_directory,
-        )
+        check_call.assert_called_once()
+        (init_command,), kwargs = check_call.call_args
+        assert init_command[:2] == ['terraform', 'init']
+        assert kwargs['env']['TF_WORKSPACE'] == environment_name
 
 
 class TestMigrateState(unittest.TestCase):
@@ -0,0 +1,143 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from cdflow_commands.terraform_cache import TerraformInitCache, hash_sources
+from test.helpers import read, write
+
+
+class TestHashSources(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.infra = os.path.join(self.temp_dir.name, 'infra')
+        write(os.path.join(self.infra, 'main.tf'), 'module "a" {}')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_hash_changes_with_sources(self):
+        # Given
+        before = hash_sources(self.infra)
+
+        # When
+        write(os.path.join(self.infra, 'main.tf'), 'module "b" {}')
+
+        # Then
+        assert hash_sources(self.infra) != before
+
+    def test_hash_ignores_terraform_directory(self):
+        # Given
+        before = hash_sources(self.infra)
+
+        # When
+        write(os.path.join(self.infra, '.terraform', 'environment'), 'live')
+
+        # Then
+        assert hash_sources(self.infra) == before
+
+
+class TestTerraformInitCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        os.makedirs(self.cache_dir)
+        self.inits = []
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def base_dir(self, name, sources='module "a" {}'):
+        base_dir = os.path.join(self.temp_dir.name, name)
+        write(os.path.join(base_dir, 'infra', 'main.tf'), sources)
+        return base_dir
+
+    def run_init(self, base_dir):
+        def run_init():
+            self.inits.append(base_dir)
+            write(
+                os.path.join(base_dir, '.terraform', 'modules', 'a', 'a.tf'),
+                'resource {}',
+            )
+            write(
+                os.path.join(base_dir, 'infra', '.terraform.lock.hcl'),
+                'provider {}',
+            )
+        return run_init
+
+    def init(self, base_dir, version='Terraform v0.12.29'):
+        cache = TerraformInitCache(self.cache_dir, 1024 * 1024, version)
+        cache.init(base_dir, 'infra', self.run_init(base_dir))
+
+    def test_unchanged_sources_are_initialised_from_cache(self):
+        # Given
+        self.init(self.base_dir('first'))
+
+        # When
+        base_dir = self.base_dir('second')
+        self.init(base_dir)
+
+        # Then
+        assert len(self.inits) == 1
+        assert read(os.path.join(
+            base_dir, '.terraform', 'modules', 'a', 'a.tf',
+        )) == 'resource {}'
+        assert read(os.path.join(
+            base_dir, 'infra', '.terraform.lock.hcl',
+        )) == 'provider {}'
+        assert read(os.path.join(base_dir, 'infra', 'main.tf')) == \
+            'module "a" {}'
+
+    def test_changed_sources_are_initialised(self):
+        # Given
+        self.init(self.base_dir('first'))
+
+        # When
+        self.init(self.base_dir('second', sources='module "b" {}'))
+
+        # Then
+        assert len(self.inits) == 2
+
+    def test_new_terraform_version_is_initialised(self):
+        # Given
+        self.init(self.base_dir('first'))
+
+        # When
+        self.init(self.base_dir('second'), version='Terraform v0.13.0')
+
+        # Then
+        assert len(self.inits) == 2
+
+    def test_symlinks_into_plugin_cache_are_followed(self):
+        # Given
+        plugin = os.path.join(
+            self.temp_dir.name, 'plugins', 'aws', '3.0.0', 'linux_amd64',
+        )
+        write(os.path.join(plugin, 'terraform-provider-aws'), 'elf')
+        base_dir = self.base_dir('first')
+
+        def run_init():
+            providers = os.path.join(base_dir, '.terraform', 'providers')
+            os.makedirs(os.path.join(providers, 'aws', '3.0.0'))
+            os.symlink(
+                plugin,
+                os.path.join(providers, 'aws', '3.0.0', 'linux_amd64'),
+            )
+
+        cache = TerraformInitCache(
+            self.cache_dir, 1024 * 1024, 'Terraform v0.13.0',
+        )
+        cache.init(base_dir, 'infra', run_init)
+
+        # When
+        os.remove(os.path.join(plugin, 'terraform-provider-aws'))
+        base_dir = self.base_dir('second')
+        cache.init(base_dir, 'infra', self.run_init(base_dir))
+
+        # Then
+        assert self.inits == []
+        assert read(os.path.join(
+            base_dir, '.terraform', 'providers', 'aws', '3.0.0',
+            'linux_amd64', 'terraform-provider-aws',
+        )) == 'elf'
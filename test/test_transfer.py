@@ -0,0 +1,74 @@
+import unittest
+
+from mock import patch
+
+from cdflow_commands import transfer
+from cdflow_commands.exceptions import UserFacingError
+from cdflow_commands.transfer import TransferLog
+
+
+class TestConfigure(unittest.TestCase):
+
+    def tearDown(self):
+        transfer.configure()
+
+    def test_defaults(self):
+        # When
+        transfer.configure({}, None)
+
+        # Then
+        assert transfer.part_size() == 8 * 1024 * 1024
+        assert transfer.max_concurrency() == 10
+
+    def test_later_sources_take_precedence(self):
+        # When
+        transfer.configure(
+            {'part-size-mb': 16, 'max-concurrency': 4},
+            {'max-concurrency': 32},
+            {'part-size-mb': None},
+        )
+
+        # Then
+        assert transfer.part_size() == 16 * 1024 * 1024
+        assert transfer.max_concurrency() == 32
+
+    def test_transfer_config_uses_settings(self):
+        # Given
+        transfer.configure({'part-size-mb': 64, 'max-concurrency': 1})
+
+        # When
+        config = transfer.transfer_config()
+
+        # Then
+        assert config.multipart_threshold == 64 * 1024 * 1024
+        assert config.multipart_chunksize == 64 * 1024 * 1024
+        assert config.max_request_concurrency == 1
+        assert not config.use_threads
+
+    def test_invalid_setting_is_rejected(self):
+        with self.assertRaises(UserFacingError):
+            transfer.configure({'part-size-mb': 0})
+
+    def test_unknown_setting_is_rejected(self):
+        with self.assertRaises(UserFacingError):
+            transfer.configure({'part-size': 8})
+
+
+class TestTransferLog(unittest.TestCase):
+
+    @patch('cdflow_commands.transfer.perf_counter')
+    def test_throughput_is_logged(self, perf_counter):
+        # Given
+        perf_counter.side_effect = [10.0, 12.0]
+
+        # When
+        with self.assertLogs('cdflow_commands.logger', 'DEBUG') as logs:
+            with TransferLog('Uploaded s3://bucket/key') as log:
+                log(3 * 1024 * 1024)
+                log(1024 * 1024)
+
+        # Then
+        assert logs.output == [
+            'DEBUG:cdflow_commands.logger:Uploaded s3://bucket/key: '
+            '4194304 bytes in 2.00s (2.0 MiB/s)',
+        ]
@@ -0,0 +1,131 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+from mock import patch
+
+from cdflow_commands import zip_patch
+from cdflow_commands.zip_patch import _make_zipfile
+from test.helpers import write
+
+
+class TestMakeZipfile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        write('release/infra/main.tf', b'resource {}\n' * 100)
+        write('release/logo.png', b'\x89PNG' + b'0' * 100)
+        write('release/random.bin', os.urandom(1000))
+        write('release/empty', b'')
+        os.makedirs('release/empty-dir')
+        os.symlink('infra', 'release/link')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def make_zipfile(self):
+        return _make_zipfile(
+            os.path.join(self.temp_dir.name, 'release'), 'release',
+        )
+
+    def test_archive_contains_every_file_in_walk_order(self):
+        # When
+        with ZipFile(self.make_zipfile()) as archive:
+            names = archive.namelist()
+            contents = {name: archive.read(name) for name in names}
+            assert archive.testzip() is None
+
+        # Then
+        expected = ['release/']
+        for dirpath, dirnames, filenames in os.walk(
+            'release', followlinks=True,
+        ):
+            expected += [
+                f'{os.path.join(dirpath, name)}/' for name in sorted(dirnames)
+            ]
+            expected += [os.path.join(dirpath, name) for name in filenames]
+        assert names == expected
+        assert contents['release/link/main.tf'] == b'resource {}\n' * 100
+
+    def test_compressed_files_and_incompressible_files_are_stored(self):
+        # When
+        with ZipFile(self.make_zipfile()) as archive:
+            compress_types = {
+                zinfo.filename: zinfo.compress_type
+                for zinfo in archive.infolist()
+            }
+
+        # Then
+        assert compress_types['release/infra/main.tf'] == ZIP_DEFLATED
+        assert compress_types['release/logo.png'] == ZIP_STORED
+        assert compress_types['release/random.bin'] == ZIP_STORED
+
+    @patch.object(zip_patch, '_compression_level', 0)
+    def test_compression_level_zero_stores_everything(self):
+        # When
+        with ZipFile(self.make_zipfile()) as archive:
+            compress_types = {
+                zinfo.compress_type for zinfo in archive.infolist()
+            }
+            content = archive.read('release/infra/main.tf')
+
+        # Then
+        assert compress_types == {ZIP_STORED}
+        assert content == b'resource {}\n' * 100
+
+    def test_file_modes_are_kept(self):
+        # Given
+        os.chmod('release/infra/main.tf', 0o751)
+
+        # When
+        with ZipFile(self.make_zipfile()) as archive:
+            zinfo = archive.getinfo('release/infra/main.tf')
+
+        # Then
+        assert (zinfo.external_attr >> 16) & 0o777 == 0o751
+
+    @patch.object(zip_patch, 'CHUNK_SIZE', 64)
+    def test_files_larger_than_a_chunk_are_streamed(self):
+        # Given
+        write('release/large.tf', b'variable "x" {}\n' * 1000)
+        write('release/large.bin', os.urandom(1000))
+
+        # When
+        with ZipFile(self.make_zipfile()) as archive:
+            assert archive.testzip() is None
+            large_tf = archive.getinfo('release/large.tf')
+            large_bin = archive.getinfo('release/large.bin')
+            content = archive.read('release/large.tf')
+
+        # Then
+        assert large_tf.compress_type == ZIP_DEFLATED
+        assert large_bin.compress_type == ZIP_STORED
+        assert content == b'variable "x" {}\n' * 1000
+
+    @patch.object(zip_patch, 'MAX_PENDING_BYTES', 2 * 4096)
+    @patch.object(zip_patch, 'MIN_MEMBER_BYTES', 4096)
+    def test_compression_runs_ahead_by_a_bounded_number_of_bytes(self):
+        # Given
+        paths = [
+            'release/empty', 'release/infra/main.tf', 'release/random.bin',
+            'release/logo.png',
+        ]
+        pulled = []
+
+        def archive_paths():
+            for path in paths:
+                pulled.append(path)
+                yield path
+
+        # When
+        members = zip_patch._compressed_members(archive_paths(), 6)
+        for written, (zinfo, data) in enumerate(members, 1):
+            data.close()
+
+            # Then
+            assert len(pulled) <= written + 2
+        assert written == len(paths)